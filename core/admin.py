@@ -36,21 +36,40 @@ class WarehouseComponentAdmin(ImportExportModelAdmin, ModelAdmin):
 class InspectionPhotoInline(admin.TabularInline):
     model = InspectionPhoto
     extra = 0
+    readonly_fields = ('rendition_status',)
+
+
+class OverdueListFilter(admin.SimpleListFilter):
+    title = 'overdue'
+    parameter_name = 'overdue'
+
+    def lookups(self, request, model_admin):
+        return [('yes', 'Yes'), ('no', 'No')]
+
+    def queryset(self, request, queryset):
+        if self.value() == 'yes':
+            return queryset.filter(overdue=True)
+        if self.value() == 'no':
+            return queryset.filter(overdue=False)
+        return queryset
 
 
 @admin.register(Inspection)
 class InspectionAdmin(ModelAdmin):
     list_display = ('component', 'inspector', 'defect_type', 'severity', 'inspection_date', 
                    'is_resolved', 'is_overdue')
-    list_filter = ('severity', 'defect_type', 'is_resolved', 'inspection_date')
+    list_filter = ('severity', 'defect_type', 'is_resolved', OverdueListFilter, 'inspection_date')
+    list_select_related = ('component', 'inspector')
     search_fields = ('component__id', 'inspector__username', 'notes')
     readonly_fields = ('inspection_date',)
     inlines = [InspectionPhotoInline]
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_overdue()
+    
+    @admin.display(boolean=True, description='Overdue', ordering='overdue')
     def is_overdue(self, obj):
-        return obj.is_overdue
-    is_overdue.boolean = True
-    is_overdue.short_description = 'Overdue'
+        return obj.overdue
 
 
 @admin.register(UserProfile)
@@ -62,10 +81,10 @@ class UserProfileAdmin(ModelAdmin):
 
 @admin.register(Report)
 class ReportAdmin(ModelAdmin):
-    list_display = ('layout', 'report_type', 'generated_by', 'generated_at', 'date_from', 'date_to')
-    list_filter = ('report_type', 'generated_at')
+    list_display = ('layout', 'report_type', 'generated_by', 'generated_at', 'date_from', 'date_to', 'status')
+    list_filter = ('report_type', 'status', 'generated_at')
     search_fields = ('layout__name', 'generated_by__username')
-    readonly_fields = ('generated_at',)
+    readonly_fields = ('generated_at', 'status', 'progress', 'error', 'started_at', 'finished_at')
 
 
 @admin.register(Notification)
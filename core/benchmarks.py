@@ -0,0 +1,198 @@
+"""
+View benchmarks for run_benchmarks.
+
+Each scenario sends one kind of request through the Django test client, so
+the whole stack is exercised: URL routing, middleware, the view and its
+templates. For every scenario the benchmark records:
+
+- latency percentiles over several runs, after one warm-up run, including
+  the request's on_commit callbacks
+- the SQL queries issued by one run, and the view's @query_budget if it has one
+- the peak Python memory allocated during one run, measured with tracemalloc
+"""
+from collections import namedtuple
+from itertools import count
+import csv
+import io
+import json
+import time
+import tracemalloc
+
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from .models import WarehouseComponent
+
+Scenario = namedtuple('Scenario', ['name', 'request'])
+
+# Viewport of the canvas requests, in layout units
+VIEWPORT = (0, 0, 1600, 900)
+# Components moved by each save_layout request
+SAVE_LAYOUT_MOVES = 50
+# Rows of each imported CSV
+IMPORT_ROWS = 1000
+
+SCENARIO_NAMES = (
+    'dashboard', 'layout_editor', 'inspection', 'layout_components', 'layout_components_near', 'layout_snapshot',
+    'component_history', 'export_layout_csv', 'save_layout', 'import_layout_csv',
+)
+
+
+def _consume(response):
+    """Read a (possibly streaming) response body completely."""
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def build_scenarios(layout, component_ids):
+    """The benchmarked requests against a seeded layout."""
+    layout_id = str(layout.id)
+    sample_component = component_ids[len(component_ids) // 2]
+    moved = component_ids[:SAVE_LAYOUT_MOVES]
+    saves = count()
+    imports = count()
+
+    def save_layout(client):
+        # A different position each time, so every run writes
+        offset = next(saves) % 100
+        return client.post(
+            reverse('save_layout'),
+            json.dumps({
+                'layout_id': layout_id,
+                'added': [],
+                'updated': [{'id': component_id, 'x': offset, 'y': offset} for component_id in moved],
+                'removed': [],
+            }),
+            content_type='application/json',
+        )
+
+    def import_layout_csv(client):
+        run = next(imports)
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(['component_id', 'type', 'x', 'y', 'width', 'height', 'status'])
+        for index in range(IMPORT_ROWS):
+            writer.writerow([f'BENCH-IMPORT-{run}-{index}', 'rack', index * 10, 0, 120, 60, 'good'])
+        upload = io.BytesIO(output.getvalue().encode())
+        upload.name = 'layout.csv'
+        return client.post(reverse('import_layout_csv'), {'csv_file': upload})
+
+    bbox = ','.join(str(value) for value in VIEWPORT)
+    return [
+        Scenario('dashboard', lambda client: client.get(reverse('dashboard'), {'layout': layout_id})),
+        Scenario('layout_editor', lambda client: client.get(reverse('layout_editor'))),
+        Scenario('inspection', lambda client: client.get(reverse('inspection'))),
+        Scenario('layout_components', lambda client: client.get(
+            reverse('layout_components', args=[layout_id]), {'bbox': bbox}
+        )),
+        Scenario('layout_components_near', lambda client: client.get(
+            reverse('layout_components_near', args=[layout_id]),
+            {'point': f'{VIEWPORT[2] / 2},{VIEWPORT[3] / 2}', 'radius': 300},
+        )),
+        Scenario('layout_snapshot', lambda client: client.get(reverse('layout_snapshot', args=[layout_id]))),
+        Scenario('component_history', lambda client: client.get(
+            reverse('component_history', args=[sample_component]), HTTP_HX_REQUEST='true'
+        )),
+        Scenario('export_layout_csv', lambda client: client.get(reverse('export_layout_csv', args=[layout_id]))),
+        Scenario('save_layout', save_layout),
+        Scenario('import_layout_csv', import_layout_csv),
+    ]
+
+
+def _percentiles(values):
+    values = sorted(values)
+    last = len(values) - 1
+    return {
+        'p50': round(values[round(last * 0.50)], 3),
+        'p95': round(values[round(last * 0.95)], 3),
+        'max': round(values[last], 3),
+    }
+
+
+def run_scenario(scenario, client, runs):
+    def send():
+        # The benchmark runs inside a transaction that is rolled back, so
+        # on_commit callbacks (cache invalidation, roll-ups, events) would
+        # never run; run them as part of each request instead
+        with TestCase.captureOnCommitCallbacks(execute=True):
+            response = _consume(scenario.request(client))
+        if response.status_code >= 400:
+            raise RuntimeError(f'{scenario.name} returned HTTP {response.status_code}')
+        return response
+
+    response = send()
+    match = resolve(response.request['PATH_INFO'])
+
+    latencies = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        send()
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    with CaptureQueriesContext(connection) as queries:
+        send()
+
+    tracemalloc.start()
+    try:
+        send()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    budget = getattr(match.func, 'query_budget', None)
+    return {
+        'url_name': match.view_name,
+        'latency_ms': _percentiles(latencies),
+        'queries': len(queries.captured_queries),
+        'query_budget': budget,
+        'over_budget': budget is not None and len(queries.captured_queries) > budget,
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def run_benchmarks(user, layout, runs=20, only=None):
+    """Run every scenario (or those named in ``only``) as ``user``."""
+    component_ids = list(
+        WarehouseComponent.objects.filter(layout=layout).order_by('id').values_list('id', flat=True)
+    )
+    client = Client()
+    client.force_login(user)
+
+    results = {}
+    for scenario in build_scenarios(layout, component_ids):
+        if only and scenario.name not in only:
+            continue
+        results[scenario.name] = run_scenario(scenario, client, runs)
+    return results
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """
+    Regressions of ``results`` against a baseline produced by the same
+    command: more queries than before, going over a query budget, or p50
+    latency or peak memory more than ``tolerance`` (a fraction) above the
+    baseline.
+    """
+    regressions = []
+    for name, result in results.items():
+        if result['over_budget']:
+            regressions.append(f"{name}: {result['queries']} queries, budget is {result['query_budget']}")
+
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if result['queries'] > before['queries']:
+            regressions.append(f"{name}: {result['queries']} queries, baseline {before['queries']}")
+        if result['latency_ms']['p50'] > before['latency_ms']['p50'] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p50 {result['latency_ms']['p50']:.1f} ms, baseline {before['latency_ms']['p50']:.1f} ms"
+            )
+        if result['peak_memory_kb'] > before['peak_memory_kb'] * (1 + tolerance):
+            regressions.append(
+                f"{name}: peak memory {result['peak_memory_kb']:.0f} KiB, baseline {before['peak_memory_kb']:.0f} KiB"
+            )
+    return regressions
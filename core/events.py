@@ -0,0 +1,138 @@
+"""
+Per-layout change feed for the warehouse canvases.
+
+Writes publish small events through a broker; the server-sent events view in
+core.views streams them to every canvas showing the layout. Two kinds of
+event exist:
+
+- ``status``: ``{"component_id", "status", "revision"}`` when an inspection
+  changes a component status; clients recolour the one shape.
+- ``layout``: ``{"revision"}`` when geometry changed; clients reload.
+
+``LocalBroker`` keeps subscribers in process, which is enough for a single
+ASGI worker and for tests. Deployments with several workers point
+STATUS_EVENTS_BROKER at ``core.events.RedisBroker``.
+"""
+import asyncio
+import json
+import threading
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+class LocalBroker:
+    """In-process pub/sub. Safe to publish from sync views running in threads."""
+
+    def __init__(self, max_queue_size=1000):
+        self.max_queue_size = max_queue_size
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def publish(self, layout_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(str(layout_id), ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(self._put, queue, event)
+
+    @staticmethod
+    def _put(queue, event):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A stalled client; it resyncs from the snapshot on reconnect
+            pass
+
+    @asynccontextmanager
+    async def subscribe(self, layout_id):
+        queue = asyncio.Queue(maxsize=self.max_queue_size)
+        subscriber = (asyncio.get_running_loop(), queue)
+        key = str(layout_id)
+        with self._lock:
+            self._subscribers.setdefault(key, set()).add(subscriber)
+        try:
+            yield queue
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(key)
+                if subscribers is not None:
+                    subscribers.discard(subscriber)
+                    if not subscribers:
+                        del self._subscribers[key]
+
+
+class RedisBroker:
+    """Pub/sub over Redis channels, shared by all worker processes."""
+
+    channel_prefix = 'layout-events:'
+
+    def __init__(self, url=None):
+        import redis
+
+        self.url = url or settings.CELERY_BROKER_URL
+        self._client = redis.Redis.from_url(self.url)
+
+    def publish(self, layout_id, event):
+        self._client.publish(f'{self.channel_prefix}{layout_id}', json.dumps(event))
+
+    @asynccontextmanager
+    async def subscribe(self, layout_id):
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(f'{self.channel_prefix}{layout_id}')
+        queue = _RedisQueue(pubsub)
+        try:
+            yield queue
+        finally:
+            await pubsub.unsubscribe()
+            await pubsub.close()
+            await client.close()
+
+
+class _RedisQueue:
+    """Adapts a Redis pubsub to the ``await queue.get()`` interface."""
+
+    def __init__(self, pubsub):
+        self.pubsub = pubsub
+
+    async def get(self):
+        while True:
+            message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=None)
+            if message is not None:
+                return json.loads(message['data'])
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        _broker = import_string(settings.STATUS_EVENTS_BROKER)()
+    return _broker
+
+
+def publish_status_changes(layout_id, revision, statuses):
+    """Publish (component_id, status) pairs of a layout once the transaction commits."""
+    events = [
+        {'type': 'status', 'component_id': component_id, 'status': status, 'revision': revision}
+        for component_id, status in statuses
+    ]
+
+    def publish():
+        broker = get_broker()
+        for event in events:
+            broker.publish(layout_id, event)
+
+    transaction.on_commit(publish)
+
+
+def publish_layout_changed(layout_id, revision):
+    """Tell canvases of a layout to reload once the transaction commits."""
+    transaction.on_commit(
+        lambda: get_broker().publish(layout_id, {'type': 'layout', 'revision': revision})
+    )
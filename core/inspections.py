@@ -0,0 +1,107 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from .events import publish_status_changes
+from .models import WarehouseLayout, WarehouseComponent, Inspection
+from .stats import invalidate_dashboard_stats, adjust_urgent_items_count, is_urgent
+from .trends import record_new_inspections
+from .zones import apply_zone_status_changes
+
+
+def create_inspections(inspections, batch_size=1000):
+    """
+    Insert many inspections at once and roll their severities up into the
+    component statuses with one set-based UPDATE, inside a single transaction.
+
+    Each component ends up with the status implied by its latest inspection
+    in the batch, exactly as if the inspections had been saved one by one in
+    date order. Rows whose status would not change are not written.
+    """
+    inspections = list(inspections)
+    if not inspections:
+        return inspections
+
+    latest = {}
+    for inspection in inspections:
+        inspection.set_due_date()
+        current = latest.get(inspection.component_id)
+        if current is None or inspection.inspection_date >= current.inspection_date:
+            latest[inspection.component_id] = inspection
+
+    component_statuses = {
+        component_id: inspection.component_status
+        for component_id, inspection in latest.items()
+    }
+    statuses = {}
+    for component_id, status in component_statuses.items():
+        statuses.setdefault(status, []).append(component_id)
+
+    changed = Q()
+    for status, component_ids in statuses.items():
+        changed |= Q(pk__in=component_ids) & ~Q(status=status)
+
+    with transaction.atomic():
+        # Lock the components whose status changes and read what it was, for
+        # the zone roll-up
+        previous = {
+            component_id: (layout_id, status)
+            for component_id, layout_id, status in WarehouseComponent.objects.filter(changed)
+            .select_for_update()
+            .order_by('pk')
+            .values_list('id', 'layout_id', 'status')
+        }
+        Inspection.objects.bulk_create(inspections, batch_size=batch_size)
+        status_changed = WarehouseComponent.objects.filter(changed).update(
+            status=Case(
+                *[When(pk__in=component_ids, then=Value(status))
+                  for status, component_ids in statuses.items()],
+                default=F('status'),
+            ),
+            updated_at=timezone.now(),
+        )
+
+        layout_ids = dict(
+            WarehouseComponent.objects.filter(pk__in=latest).values_list('id', 'layout_id')
+        )
+        if status_changed:
+            WarehouseLayout.bump_revision(pk__in=set(layout_ids.values()))
+            revisions = dict(
+                WarehouseLayout.objects.filter(pk__in=set(layout_ids.values()))
+                .values_list('id', 'revision')
+            )
+            layout_statuses = {}
+            for component_id, status in component_statuses.items():
+                layout_statuses.setdefault(layout_ids[component_id], []).append((component_id, status))
+            for layout_id, statuses_in_layout in layout_statuses.items():
+                publish_status_changes(layout_id, revisions[layout_id], statuses_in_layout)
+
+            zone_changes = {}
+            for component_id, (layout_id, previous_status) in previous.items():
+                zone_changes.setdefault(layout_id, []).append(
+                    (component_id, previous_status, component_statuses[component_id])
+                )
+            for layout_id, changes in zone_changes.items():
+                apply_zone_status_changes(layout_id, changes)
+        record_new_inspections(inspections, layout_ids)
+        urgent_per_layout = Counter(
+            layout_ids[inspection.component_id]
+            for inspection in inspections
+            if is_urgent(inspection.severity, inspection.is_resolved)
+        )
+
+        def update_cached_stats():
+            if status_changed:
+                for layout_id in set(layout_ids.values()):
+                    invalidate_dashboard_stats(layout_id)
+            for layout_id, count in urgent_per_layout.items():
+                adjust_urgent_items_count(layout_id, count)
+
+        transaction.on_commit(update_cached_stats)
+
+    for inspection in inspections:
+        inspection._loaded_urgent = is_urgent(inspection.severity, inspection.is_resolved)
+
+    return inspections
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from core.models import Inspection
+from core.trends import backfill_trend_buckets
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily and weekly inspection trend buckets from the inspections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from',
+                            help='First date (YYYY-MM-DD); defaults to the oldest inspection')
+        parser.add_argument('--to', dest='date_to', help='Last date (YYYY-MM-DD); defaults to today')
+        parser.add_argument('--layout', help='Only this layout ID')
+        parser.add_argument('--chunk-days', type=int, default=90,
+                            help='Days recomputed per transaction')
+
+    def handle(self, *args, **options):
+        date_to = parse_date(options['date_to']) if options['date_to'] else timezone.localdate()
+        if options['date_from']:
+            date_from = parse_date(options['date_from'])
+        else:
+            oldest = Inspection.objects.aggregate(oldest=Min('inspection_date'))['oldest']
+            date_from = timezone.localtime(oldest).date() if oldest else date_to
+        if date_from is None or date_to is None or date_from > date_to:
+            raise CommandError('--from and --to must be dates in YYYY-MM-DD format, --from first')
+        if options['chunk_days'] < 7:
+            raise CommandError('--chunk-days must be at least 7')
+
+        # Whole weeks per chunk, so chunks never share a weekly bucket
+        chunk = timezone.timedelta(days=options['chunk_days'] // 7 * 7)
+        date_from -= timezone.timedelta(days=date_from.weekday())
+        written = 0
+        while date_from <= date_to:
+            chunk_end = min(date_from + chunk - timezone.timedelta(days=1), date_to)
+            written += backfill_trend_buckets(date_from, chunk_end, options['layout'])
+            self.stdout.write(f'Recomputed {date_from} to {chunk_end}')
+            date_from += chunk
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} trend buckets'))
@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.uploads import delete_stale_uploads
+
+
+class Command(BaseCommand):
+    help = 'Delete abandoned chunked photo uploads and their part files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-age', type=int, default=settings.PHOTO_UPLOAD_EXPIRY,
+                            help='Seconds since the last chunk after which an upload is removed')
+
+    def handle(self, *args, **options):
+        deleted = delete_stale_uploads(options['max_age'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} stale uploads'))
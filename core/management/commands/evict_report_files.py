@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.reports import evict_report_files
+
+
+class Command(BaseCommand):
+    help = 'Delete generated report PDFs by age and total size'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-age', type=int, default=settings.REPORT_FILE_MAX_AGE,
+                            help='Seconds after which a generated PDF is deleted')
+        parser.add_argument('--max-total-size', type=int, default=settings.REPORT_FILE_MAX_TOTAL_SIZE,
+                            help='Bytes the remaining PDFs may take in total')
+
+    def handle(self, *args, **options):
+        evicted = evict_report_files(options['max_age'], options['max_total_size'])
+        self.stdout.write(self.style.SUCCESS(f'Evicted {evicted} report files'))
@@ -0,0 +1,147 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+from core.models import (
+    WarehouseLayout, WarehouseComponent, Inspection, Notification,
+    ComponentType, ComponentStatus, DefectType, SeverityLevel
+)
+import random
+import time
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a realistic dataset inside a rolled-back transaction and show the '
+        'query plans and timings of the hot dashboard, header and inspection '
+        'queries with and without the model indexes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--components', type=int, default=20000,
+                            help='Number of components to seed (default: 20000)')
+        parser.add_argument('--inspections', type=int, default=100000,
+                            help='Number of inspections to seed (default: 100000)')
+        parser.add_argument('--notifications', type=int, default=50000,
+                            help='Number of notifications to seed (default: 50000)')
+        parser.add_argument('--seed', type=int, default=42,
+                            help='Random seed (default: 42)')
+        parser.add_argument('--analyze', action='store_true',
+                            help='Use EXPLAIN ANALYZE (PostgreSQL) instead of plain EXPLAIN')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                user, layout = self.seed(options)
+                queries = self.hot_queries(user, layout)
+
+                self.stdout.write(self.style.MIGRATE_HEADING('With indexes'))
+                self.explain_all(queries, options['analyze'])
+
+                self.drop_indexes()
+                self.stdout.write(self.style.MIGRATE_HEADING('Without indexes'))
+                self.explain_all(queries, options['analyze'])
+
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(self.style.SUCCESS('Done; seeded data and index changes were rolled back.'))
+
+    def seed(self, options):
+        rng = random.Random(options['seed'])
+        now = timezone.now()
+
+        user = User.objects.create(username=f'explain-{int(time.time())}')
+        layout = WarehouseLayout.objects.create(name='Explain benchmark', created_by=user)
+
+        statuses = [ComponentStatus.GOOD] * 14 + [
+            ComponentStatus.MONITOR, ComponentStatus.MONITOR,
+            ComponentStatus.FIX_4_WEEKS, ComponentStatus.IMMEDIATE,
+        ]
+        components = [
+            WarehouseComponent(
+                id=f'EXPLAIN-{i}',
+                layout=layout,
+                component_type=rng.choice(ComponentType.values),
+                x_position=(i % 200) * 140,
+                y_position=(i // 200) * 80,
+                width=120,
+                height=60,
+                status=rng.choice(statuses),
+            )
+            for i in range(options['components'])
+        ]
+        WarehouseComponent.objects.bulk_create(components, batch_size=5000)
+
+        inspections = []
+        for _ in range(options['inspections']):
+            severity = rng.choice([SeverityLevel.GREEN] * 6 + [SeverityLevel.AMBER] * 3 + [SeverityLevel.RED])
+            inspections.append(Inspection(
+                component=rng.choice(components),
+                inspector=user,
+                defect_type=rng.choice(DefectType.values),
+                severity=severity,
+                inspection_date=now - timezone.timedelta(days=rng.randint(0, 5 * 365)),
+                # Most findings get resolved eventually
+                is_resolved=rng.random() < 0.9,
+            ))
+        Inspection.objects.bulk_create(inspections, batch_size=5000)
+
+        notifications = [
+            Notification(
+                user=user,
+                inspection=rng.choice(inspections),
+                notification_type=rng.choice(['amber_reminder', 'red_alert', 'overdue']),
+                message='',
+                is_read=rng.random() < 0.95,
+            )
+            for _ in range(options['notifications'])
+        ]
+        Notification.objects.bulk_create(notifications, batch_size=5000)
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                for model in (WarehouseComponent, Inspection, Notification):
+                    cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+        self.stdout.write(
+            f'Seeded {len(components)} components, {len(inspections)} inspections '
+            f'and {len(notifications)} notifications'
+        )
+        return user, layout
+
+    def hot_queries(self, user, layout):
+        urgent = Inspection.objects.filter(
+            severity__in=[SeverityLevel.RED, SeverityLevel.AMBER], is_resolved=False
+        )
+        return [
+            ('dashboard: status counts', WarehouseComponent.objects.filter(layout=layout).values('status').annotate(count=Count('id'))),
+            ('dashboard: immediate components', WarehouseComponent.objects.filter(layout=layout, status=ComponentStatus.IMMEDIATE)),
+            ('dashboard: urgent inspections', urgent.select_related('component', 'inspector').order_by('inspection_date')[:10]),
+            ('header: urgent item count', urgent.values('id')),
+            ('inspection: recent inspections', Inspection.objects.select_related('component', 'inspector').order_by('-inspection_date')[:10]),
+            ('notifications: unread for user', Notification.objects.filter(user=user, is_read=False).order_by('-created_at')[:20]),
+        ]
+
+    def explain_all(self, queries, analyze):
+        explain_options = {'analyze': True} if analyze and connection.vendor == 'postgresql' else {}
+        for name, queryset in queries:
+            started = time.perf_counter()
+            list(queryset)
+            elapsed = (time.perf_counter() - started) * 1000
+
+            self.stdout.write(self.style.SQL_TABLE(f'{name} ({elapsed:.2f} ms)'))
+            self.stdout.write(queryset.explain(**explain_options))
+            self.stdout.write('')
+
+    def drop_indexes(self):
+        with connection.schema_editor() as schema_editor:
+            for model in (WarehouseComponent, Inspection, Notification):
+                for index in model._meta.indexes:
+                    schema_editor.remove_index(model, index)
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+from core.stats import invalidate_dashboard_stats, invalidate_urgent_items_count
+from core.synthetic import generate_dataset
+import time
+
+
+class Command(BaseCommand):
+    help = 'Generate a large seeded synthetic dataset with bulk inserts for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--layouts', type=int, default=1,
+                            help='Number of layouts (default: 1)')
+        parser.add_argument('--components', type=int, default=1000,
+                            help='Components per layout (default: 1000)')
+        parser.add_argument('--inspections', type=int, default=5,
+                            help='Inspections per component (default: 5)')
+        parser.add_argument('--photos', type=int, default=0,
+                            help='Photos per inspection (default: 0)')
+        parser.add_argument('--users', type=int, default=5,
+                            help='Number of inspectors (default: 5)')
+        parser.add_argument('--seed', type=int, default=42,
+                            help='Random seed (default: 42)')
+        parser.add_argument('--prefix', default='SYN',
+                            help='Component ID prefix; use a new one to add a second dataset (default: SYN)')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Rows per INSERT (default: 5000)')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        try:
+            with transaction.atomic():
+                result = generate_dataset(
+                    layouts=options['layouts'],
+                    components=options['components'],
+                    inspections=options['inspections'],
+                    photos=options['photos'],
+                    users=options['users'],
+                    seed=options['seed'],
+                    prefix=options['prefix'],
+                    batch_size=options['batch_size'],
+                )
+        except (ValueError, IntegrityError) as e:
+            raise CommandError(str(e))
+
+        # Bulk inserts bypass the signals that keep the cached counts current
+        for layout in result['layouts_created']:
+            invalidate_dashboard_stats(layout.id)
+            invalidate_urgent_items_count(layout.id)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {result['layouts']} layouts, {result['components']} components, "
+            f"{result['inspections']} inspections, {result['photos']} photos and "
+            f"{result['users']} users in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from core.models import WarehouseLayout
+from core.stats import invalidate_dashboard_stats
+from core.zones import layouts_without_rollup, rebuild_zone_rollup
+
+
+class Command(BaseCommand):
+    help = 'Recount the per-zone status roll-ups from the components'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--layout', action='append', default=[],
+                            help='Only this layout ID (repeatable); all layouts by default')
+        parser.add_argument('--missing', action='store_true',
+                            help='Only layouts whose roll-up was never built')
+
+    def handle(self, *args, **options):
+        layouts = layouts_without_rollup() if options['missing'] else WarehouseLayout.objects.all()
+        layouts = layouts.order_by('pk')
+        if options['layout']:
+            layouts = layouts.filter(pk__in=options['layout'])
+
+        rebuilt = 0
+        for layout_id in layouts.values_list('pk', flat=True):
+            rebuild_zone_rollup(layout_id)
+            invalidate_dashboard_stats(layout_id)
+            rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the zone roll-ups of {rebuilt} layouts'))
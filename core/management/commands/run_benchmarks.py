@@ -0,0 +1,108 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from core.benchmarks import SCENARIO_NAMES, compare_with_baseline, run_benchmarks
+from core.synthetic import generate_dataset
+import django
+import json
+import platform
+import time
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a synthetic dataset inside a rolled-back transaction, drive the main '
+        'views with the test client and record latency, query counts and peak '
+        'memory per scenario as a JSON baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--components', type=int, default=5000,
+                            help='Components in the benchmarked layout (default: 5000)')
+        parser.add_argument('--inspections', type=int, default=4,
+                            help='Inspections per component (default: 4)')
+        parser.add_argument('--photos', type=int, default=0,
+                            help='Photos per inspection (default: 0)')
+        parser.add_argument('--seed', type=int, default=42,
+                            help='Random seed (default: 42)')
+        parser.add_argument('--runs', type=int, default=20,
+                            help='Timed runs per scenario (default: 20)')
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            help='Only run this scenario; repeatable')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--compare', help='Fail if results regress against this baseline JSON file')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed latency and memory growth over the baseline, as a fraction (default: 0.25)')
+
+    def handle(self, *args, **options):
+        unknown = set(options['scenarios'] or ()) - set(SCENARIO_NAMES)
+        if unknown:
+            raise CommandError(
+                f"Unknown scenarios: {', '.join(sorted(unknown))}. Choose from {', '.join(SCENARIO_NAMES)}"
+            )
+
+        try:
+            with transaction.atomic():
+                started = time.monotonic()
+                dataset = generate_dataset(
+                    layouts=1,
+                    components=options['components'],
+                    inspections=options['inspections'],
+                    photos=options['photos'],
+                    users=1,
+                    seed=options['seed'],
+                    prefix='BENCH',
+                )
+                self.stdout.write(
+                    f"Seeded {dataset['components']} components and {dataset['inspections']} "
+                    f"inspections in {time.monotonic() - started:.1f}s"
+                )
+
+                scenarios = run_benchmarks(
+                    dataset['inspectors'][0], dataset['layouts_created'][0],
+                    runs=options['runs'], only=options['scenarios'],
+                )
+                raise Rollback
+        except Rollback:
+            pass
+
+        report = {
+            'meta': {
+                'created_at': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'components': options['components'],
+                'inspections_per_component': options['inspections'],
+                'photos_per_inspection': options['photos'],
+                'seed': options['seed'],
+                'runs': options['runs'],
+            },
+            'scenarios': scenarios,
+        }
+
+        for name, result in scenarios.items():
+            latency = result['latency_ms']
+            budget = f"/{result['query_budget']}" if result['query_budget'] is not None else ''
+            line = (
+                f"{name:<20} p50 {latency['p50']:8.1f} ms  p95 {latency['p95']:8.1f} ms  "
+                f"{result['queries']:>3}{budget} queries  {result['peak_memory_kb']:>9.0f} KiB"
+            )
+            self.stdout.write(self.style.ERROR(line) if result['over_budget'] else line)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)['scenarios']
+            regressions = compare_with_baseline(scenarios, baseline, options['tolerance'])
+            if regressions:
+                raise CommandError('Regressions against the baseline:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
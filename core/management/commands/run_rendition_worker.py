@@ -0,0 +1,62 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import multiprocessing
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.renditions import claim_photos, requeue_stale_photos
+from core.workers import init_process, run_renditions
+
+
+class Command(BaseCommand):
+    help = 'Generate downscaled renditions of uploaded inspection photos in a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=settings.PHOTO_WORKER_PROCESSES,
+                            help='Number of photos processed in parallel')
+        parser.add_argument('--poll-interval', type=float, default=settings.PHOTO_WORKER_POLL_INTERVAL,
+                            help='Seconds between queue polls when idle')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once the queue is empty instead of polling forever')
+
+    def handle(self, *args, **options):
+        processes = options['processes']
+        verbosity = options['verbosity']
+
+        requeued = requeue_stale_photos()
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'Requeued {requeued} stale photos'))
+
+        self.stdout.write(f'Rendition worker started with {processes} processes')
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_process,
+        ) as pool:
+            running = {}
+            while True:
+                # Keep one photo queued per process so none idles between jobs
+                free = 2 * processes - len(running)
+                if free:
+                    for photo_id in claim_photos(free):
+                        running[pool.submit(run_renditions, photo_id)] = photo_id
+
+                if running:
+                    done, _ = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                    for future in done:
+                        photo_id = running.pop(future)
+                        try:
+                            ok = future.result()
+                        except Exception as e:
+                            self.stdout.write(self.style.ERROR(f'Photo {photo_id} crashed: {e}'))
+                            continue
+                        if not ok:
+                            self.stdout.write(self.style.ERROR(f'Photo {photo_id} failed'))
+                        elif verbosity > 1:
+                            self.stdout.write(f'Photo {photo_id} done')
+                elif options['once']:
+                    break
+                else:
+                    time.sleep(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS('Rendition worker stopped'))
@@ -0,0 +1,64 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import multiprocessing
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.reports import claim_reports, requeue_stale_reports
+from core.workers import init_process, run_report
+
+
+class Command(BaseCommand):
+    help = 'Generate queued PDF reports in a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=settings.REPORT_WORKER_PROCESSES,
+                            help='Number of reports rendered in parallel')
+        parser.add_argument('--poll-interval', type=float, default=settings.REPORT_WORKER_POLL_INTERVAL,
+                            help='Seconds between queue polls when idle')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once the queue is empty instead of polling forever')
+
+    def handle(self, *args, **options):
+        processes = options['processes']
+
+        requeued = requeue_stale_reports()
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'Requeued {requeued} stale reports'))
+
+        self.stdout.write(f'Report worker started with {processes} processes')
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_process,
+        ) as pool:
+            running = {}
+            while True:
+                free = processes - len(running)
+                if free:
+                    for report_id in claim_reports(free):
+                        running[pool.submit(run_report, report_id)] = report_id
+
+                if running:
+                    done, _ = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self.report_finished(running.pop(future), future)
+                elif options['once']:
+                    break
+                else:
+                    time.sleep(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS('Report worker stopped'))
+
+    def report_finished(self, report_id, future):
+        try:
+            ok = future.result()
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'Report {report_id} crashed: {e}'))
+            return
+
+        if ok:
+            self.stdout.write(self.style.SUCCESS(f'Report {report_id} generated'))
+        else:
+            self.stdout.write(self.style.ERROR(f'Report {report_id} failed'))
+
@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.notifications import dispatch_notifications, schedule_notifications
+
+
+class Command(BaseCommand):
+    help = 'Create red alert, amber reminder and overdue notifications and email them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running instead of exiting after one pass (default: run once, e.g. from cron)')
+        parser.add_argument('--interval', type=float, default=settings.NOTIFICATION_SCHEDULER_INTERVAL,
+                            help='Seconds between passes with --loop')
+        parser.add_argument('--batch-size', type=int, default=settings.NOTIFICATION_BATCH_SIZE,
+                            help='Notifications inserted or emailed per batch')
+        parser.add_argument('--no-email', action='store_true',
+                            help='Create notifications without emailing them')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            created = schedule_notifications(batch_size=options['batch_size'])
+            sent = 0 if options['no_email'] else dispatch_notifications(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f'Created {created} notifications, emailed {sent} '
+                f'in {time.monotonic() - started:.1f}s'
+            ))
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -1,7 +1,9 @@
-from django.db import models
+from django.db import connections, models, router, transaction
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.urls import reverse
 from django.utils import timezone
+import hashlib
 import uuid
 
 
@@ -13,6 +15,8 @@ class WarehouseLayout(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
     is_active = models.BooleanField(default=True)
+    # Incremented whenever the geometry or status of a component changes
+    revision = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ['-updated_at']
@@ -20,6 +24,37 @@ class WarehouseLayout(models.Model):
     def __str__(self):
         return self.name
 
+    @classmethod
+    def bump_revision(cls, **filters):
+        """Increment the revision of the layouts matching filters in one UPDATE."""
+        return cls.objects.filter(**filters).update(revision=models.F('revision') + 1)
+
+
+class LayoutVersion(models.Model):
+    """
+    A saved state of a layout's component geometry (see core.versions). Most
+    versions store the delta from the previous one; periodic snapshots store
+    every component so any version is rebuilt from a short replay.
+    """
+    layout = models.ForeignKey(WarehouseLayout, on_delete=models.CASCADE, related_name='versions')
+    number = models.PositiveIntegerField()
+    is_snapshot = models.BooleanField(default=False)
+    data = models.JSONField()
+    added = models.PositiveIntegerField(default=0)
+    updated = models.PositiveIntegerField(default=0)
+    removed = models.PositiveIntegerField(default=0)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-number']
+        constraints = [
+            models.UniqueConstraint(fields=['layout', 'number'], name='layout_version_unique_number'),
+        ]
+
+    def __str__(self):
+        return f"{self.layout} v{self.number}"
+
 
 class ComponentType(models.TextChoices):
     RACK = 'rack', 'Rack'
@@ -46,8 +81,51 @@ class WarehouseComponent(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Status as loaded, so saving can move the component between roll-up columns
+    _loaded_status = None
+
     class Meta:
         ordering = ['id']
+        indexes = [
+            models.Index(fields=['layout', 'status'], name='component_layout_status_idx'),
+            # Viewport queries: range on position, rectangle read from the index
+            models.Index(
+                fields=['layout', 'x_position', 'y_position', 'width', 'height'],
+                name='component_layout_bbox_idx',
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+
+    @classmethod
+    def change_status(cls, component_id, status, updated_at):
+        """
+        Set a component's status with one UPDATE that only writes when the
+        stored status differs. Returns the stored status it replaced, which
+        the zone roll-up needs, or None when nothing was written.
+        """
+        connection = connections[router.db_for_write(cls)]
+        quote = connection.ops.quote_name
+        table = quote(cls._meta.db_table)
+        pk, status_column, updated_at_column = (
+            quote(cls._meta.get_field(name).column) for name in ('id', 'status', 'updated_at')
+        )
+        # The locked subquery reads the stored status in the same statement, so
+        # RETURNING can hand back the value the UPDATE overwrote
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {table} AS component SET {status_column} = %s, {updated_at_column} = %s '
+                f'FROM (SELECT {pk}, {status_column} FROM {table} WHERE {pk} = %s FOR UPDATE) AS previous '
+                f'WHERE component.{pk} = previous.{pk} AND previous.{status_column} <> %s '
+                f'RETURNING previous.{status_column}',
+                [status, updated_at, component_id, status],
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
 
     def __str__(self):
         return f"{self.id} ({self.get_component_type_display()})"
@@ -63,6 +141,47 @@ class WarehouseComponent(models.Model):
         return color_map.get(self.status, 'primary')
 
 
+class ZoneRollup(models.Model):
+    """
+    Component counts per status for one zone of a layout (see core.zones).
+    Zones come from the component ID scheme: the whole layout (``''``), an
+    aisle (``A1``) and a bay within it (``A1-B1``). The status columns are
+    named after the ComponentStatus values.
+    """
+    layout = models.ForeignKey(WarehouseLayout, on_delete=models.CASCADE, related_name='zone_rollups')
+    zone = models.CharField(max_length=50, blank=True)
+    # Zone one level up; null for the whole-layout row
+    parent = models.CharField(max_length=50, null=True, blank=True)
+    good = models.IntegerField(default=0)
+    monitor = models.IntegerField(default=0)
+    fix_4_weeks = models.IntegerField(default=0)
+    immediate = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['zone']
+        constraints = [
+            models.UniqueConstraint(fields=['layout', 'zone'], name='zone_rollup_unique_zone'),
+        ]
+        indexes = [
+            models.Index(fields=['layout', 'parent'], name='zone_rollup_parent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.layout} {self.zone or 'all zones'}"
+
+    @property
+    def total(self):
+        return sum(getattr(self, status) for status in ComponentStatus.values)
+
+    @property
+    def worst_status(self):
+        """The most severe status any component in the zone has, or None."""
+        for status in reversed(ComponentStatus.values):
+            if getattr(self, status):
+                return status
+        return None
+
+
 class DefectType(models.TextChoices):
     BENT_UPRIGHT = 'bent_upright', 'Bent Upright'
     DAMAGED_BEAM = 'damaged_beam', 'Damaged Beam'
@@ -79,6 +198,34 @@ class SeverityLevel(models.TextChoices):
     RED = 'red', 'Immediate threat - Fix now'
 
 
+# Component status implied by the severity of its latest inspection
+SEVERITY_COMPONENT_STATUS = {
+    SeverityLevel.RED: ComponentStatus.IMMEDIATE,
+    SeverityLevel.AMBER: ComponentStatus.FIX_4_WEEKS,
+    SeverityLevel.GREEN: ComponentStatus.MONITOR,
+}
+
+
+class InspectionQuerySet(models.QuerySet):
+    @staticmethod
+    def overdue_q(today=None):
+        """Condition matching Inspection.is_overdue, evaluated by the database."""
+        return models.Q(
+            is_resolved=False,
+            due_date__isnull=False,
+            due_date__lt=today or timezone.now().date(),
+        )
+
+    def with_overdue(self, today=None):
+        """Annotate ``overdue``, usable in filters and ordering."""
+        return self.annotate(
+            overdue=models.ExpressionWrapper(self.overdue_q(today), output_field=models.BooleanField())
+        )
+
+    def overdue(self, today=None):
+        return self.filter(self.overdue_q(today))
+
+
 class Inspection(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     component = models.ForeignKey(WarehouseComponent, on_delete=models.CASCADE, related_name='inspections')
@@ -92,46 +239,250 @@ class Inspection(models.Model):
     is_resolved = models.BooleanField(default=False)
     resolved_date = models.DateTimeField(null=True, blank=True)
     resolved_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='resolved_inspections')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = InspectionQuerySet.as_manager()
 
     class Meta:
         ordering = ['-inspection_date']
-
-    def save(self, *args, **kwargs):
+        indexes = [
+            models.Index(fields=['-inspection_date'], name='inspection_date_idx'),
+            # Also the keyset order of a component's history
+            models.Index(fields=['component', '-inspection_date', '-id'], name='inspection_component_date_idx'),
+            models.Index(
+                fields=['severity', 'is_resolved', 'inspection_date'],
+                name='inspection_severity_idx',
+            ),
+            # Unresolved red/amber items: the dashboard urgent list and header count
+            models.Index(
+                fields=['inspection_date'],
+                name='inspection_urgent_idx',
+                condition=models.Q(is_resolved=False, severity__in=['red', 'amber']),
+            ),
+            # Open items by due date: the notification scheduler
+            models.Index(
+                fields=['due_date'],
+                name='inspection_open_due_idx',
+                condition=models.Q(is_resolved=False),
+            ),
+        ]
+
+    # Whether the row counted as an urgent item when it was loaded, so saves
+    # can adjust the cached urgent item counters incrementally
+    _loaded_urgent = False
+    # Whether the last save changed the component status, and from what
+    _component_status_changed = False
+    _previous_component_status = None
+    # trend_state() when the row was loaded, so saves can move it between
+    # trend buckets; None when some of its fields were deferred
+    _loaded_trend_state = None
+
+    TREND_FIELDS = frozenset(['inspection_date', 'defect_type', 'severity', 'is_resolved', 'resolved_date'])
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_urgent = (
+            instance.severity in (SeverityLevel.RED, SeverityLevel.AMBER)
+            and not instance.is_resolved
+        )
+        if cls.TREND_FIELDS.issubset(field_names):
+            instance._loaded_trend_state = instance.trend_state()
+        return instance
+
+    def trend_state(self):
+        """
+        What this inspection adds to the trend buckets (see core.trends): its
+        date, defect type, severity and resolution time in hours, if resolved.
+        """
+        resolution_hours = None
+        if self.is_resolved and self.resolved_date:
+            resolution_hours = max((self.resolved_date - self.inspection_date).total_seconds() / 3600, 0)
+        return self.inspection_date, self.defect_type, self.severity, resolution_hours
+
+    def set_due_date(self):
         # Auto-calculate due date based on severity
         if self.severity == SeverityLevel.AMBER and not self.due_date:
             self.due_date = (self.inspection_date + timezone.timedelta(weeks=4)).date()
+
+    def save(self, *args, **kwargs):
+        self.set_due_date()
         
-        # Update component status based on severity
-        if self.severity == SeverityLevel.RED:
-            self.component.status = ComponentStatus.IMMEDIATE
-        elif self.severity == SeverityLevel.AMBER:
-            self.component.status = ComponentStatus.FIX_4_WEEKS
-        else:
-            self.component.status = ComponentStatus.MONITOR
+        # Update component status based on severity with a targeted UPDATE
+        # that only writes when the stored status actually changes
+        status = self.component_status
+        updated_at = timezone.now()
         
-        self.component.save()
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            previous_status = WarehouseComponent.change_status(self.component_id, status, updated_at)
+            self._component_status_changed = previous_status is not None
+            if self._component_status_changed:
+                self._previous_component_status = previous_status
+                WarehouseLayout.bump_revision(components__pk=self.component_id)
+                if Inspection.component.is_cached(self):
+                    self.component.status = status
+                    self.component.updated_at = updated_at
+                    self.component._loaded_status = status
+            
+            super().save(*args, **kwargs)
 
     def __str__(self):
         defect_name = self.custom_defect if self.defect_type == DefectType.CUSTOM else self.get_defect_type_display()
         return f"{self.component.id} - {defect_name} ({self.get_severity_display()})"
 
+    @property
+    def component_status(self):
+        """The component status this inspection's severity implies."""
+        return SEVERITY_COMPONENT_STATUS.get(self.severity, ComponentStatus.MONITOR)
+
     @property
     def is_overdue(self):
+        # Rows loaded through with_overdue() already carry the answer
+        if 'overdue' in self.__dict__:
+            return self.overdue
         if not self.due_date or self.is_resolved:
             return False
         return timezone.now().date() > self.due_date
 
 
+class TrendGranularity(models.TextChoices):
+    DAY = 'day', 'Day'
+    WEEK = 'week', 'Week'
+
+
+class InspectionBucket(models.Model):
+    """
+    Inspections recorded per day or week (starting Monday), layout, defect
+    type and severity, for the trend analytics in core.trends. Resolution
+    times of the bucket's resolved inspections are kept as a histogram over
+    core.trends.RESOLUTION_BIN_EDGES.
+    """
+    granularity = models.CharField(max_length=4, choices=TrendGranularity.choices)
+    start = models.DateField()
+    layout = models.ForeignKey(WarehouseLayout, on_delete=models.CASCADE, related_name='inspection_buckets')
+    defect_type = models.CharField(max_length=50, choices=DefectType.choices)
+    severity = models.CharField(max_length=10, choices=SeverityLevel.choices)
+    inspections = models.IntegerField(default=0)
+    resolved = models.IntegerField(default=0)
+    resolution_histogram = models.JSONField(default=list)
+
+    class Meta:
+        ordering = ['granularity', 'start']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['granularity', 'layout', 'start', 'defect_type', 'severity'],
+                name='inspection_bucket_unique_key',
+            ),
+        ]
+        indexes = [
+            # Site-wide trends; per-layout trends use the unique key's index
+            models.Index(fields=['granularity', 'start'], name='inspection_bucket_start_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_granularity_display()} of {self.start} ({self.defect_type}, {self.severity})"
+
+
+class RenditionStatus(models.TextChoices):
+    PENDING = 'pending', 'Pending'
+    RUNNING = 'running', 'Running'
+    DONE = 'done', 'Done'
+    FAILED = 'failed', 'Failed'
+
+
 class InspectionPhoto(models.Model):
     inspection = models.ForeignKey(Inspection, on_delete=models.CASCADE, related_name='photos')
     image = models.ImageField(upload_to='inspection_photos/')
     caption = models.CharField(max_length=255, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # Storage names of the downscaled copies by rendition name (see core.renditions)
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
+    rendition_status = models.CharField(
+        max_length=10, choices=RenditionStatus.choices, default=RenditionStatus.PENDING, editable=False
+    )
+    rendition_started_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # The rendition worker's queue
+            models.Index(
+                fields=['uploaded_at'],
+                name='photo_rendition_pending_idx',
+                condition=models.Q(rendition_status='pending'),
+            ),
+        ]
+
+    # Image name when the row was loaded, to notice a replaced image
+    _loaded_image = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        image = instance.__dict__.get('image')
+        instance._loaded_image = getattr(image, 'name', image)
+        return instance
+
+    def save(self, *args, **kwargs):
+        # A replaced image needs new renditions; the old files are removed by
+        # the worker once the new ones exist
+        if self._loaded_image is not None and self.image.name != self._loaded_image:
+            self.rendition_status = RenditionStatus.PENDING
+        super().save(*args, **kwargs)
+        self._loaded_image = self.image.name
 
     def __str__(self):
         return f"Photo for {self.inspection}"
 
+    def rendition_name(self, name):
+        """Storage name of a rendition, or of the original until it exists."""
+        if self.rendition_status == RenditionStatus.DONE and name in self.renditions:
+            return self.renditions[name]
+        return self.image.name
+
+    def rendition_url(self, name):
+        """
+        URL of a rendition. Generated renditions get a versioned URL that is
+        cached for a long time; the original fallback is not cached.
+        """
+        url = reverse('photo_rendition', args=[self.pk, name])
+        path = self.rendition_name(name)
+        if path == self.image.name:
+            return url
+        return f"{url}?v={hashlib.sha1(path.encode()).hexdigest()[:12]}"
+
+    @property
+    def report_image_path(self):
+        """Filesystem path of the image embedded in PDF reports."""
+        return self.image.storage.path(self.rendition_name('report'))
+
+
+class PhotoUpload(models.Model):
+    """
+    A chunked photo upload (see core.uploads). Bytes are appended to a part
+    file as chunks arrive; ``received`` is the offset the next chunk starts at.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    inspection = models.ForeignKey(Inspection, on_delete=models.CASCADE, related_name='photo_uploads')
+    uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    caption = models.CharField(max_length=255, blank=True)
+    size = models.PositiveBigIntegerField()
+    # SHA-256 of the whole file as hex, declared by the client up front
+    checksum = models.CharField(max_length=64)
+    received = models.PositiveBigIntegerField(default=0)
+    photo = models.OneToOneField(
+        InspectionPhoto, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Upload of {self.filename} ({self.received}/{self.size} bytes)"
+
+    @property
+    def is_complete(self):
+        return self.photo_id is not None
+
 
 class UserProfile(models.Model):
     ROLE_CHOICES = [
@@ -157,6 +508,15 @@ class UserProfile(models.Model):
         return self.role == 'inspector'
 
 
+class ReportStatus(models.TextChoices):
+    QUEUED = 'queued', 'Queued'
+    RUNNING = 'running', 'Generating'
+    DONE = 'done', 'Ready'
+    FAILED = 'failed', 'Failed'
+    # The PDF was evicted from storage (see evict_report_files)
+    EXPIRED = 'expired', 'Expired'
+
+
 class Report(models.Model):
     REPORT_TYPES = [
         ('full', 'Full Inspection Report'),
@@ -176,13 +536,40 @@ class Report(models.Model):
     include_layout = models.BooleanField(default=True)
     include_photos = models.BooleanField(default=True)
     include_inspector_details = models.BooleanField(default=False)
+    # Generation job state, driven by the run_report_worker command
+    status = models.CharField(max_length=20, choices=ReportStatus.choices, default=ReportStatus.QUEUED)
+    progress = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Identifies the report's parameters and the data it shows, so identical
+    # requests reuse the PDF (see core.reports.report_content_key)
+    content_key = models.CharField(max_length=64, blank=True, editable=False)
+    pdf_size = models.PositiveBigIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ['-generated_at']
+        indexes = [
+            # Report queue: the worker claims the oldest queued reports
+            models.Index(
+                fields=['generated_at'],
+                name='report_queued_idx',
+                condition=models.Q(status='queued'),
+            ),
+            models.Index(
+                fields=['content_key'],
+                name='report_content_key_idx',
+                condition=~models.Q(content_key=''),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.get_report_type_display()} - {self.generated_at.strftime('%Y-%m-%d %H:%M')}"
 
+    @property
+    def is_pending(self):
+        return self.status in (ReportStatus.QUEUED, ReportStatus.RUNNING)
+
 
 class Notification(models.Model):
     NOTIFICATION_TYPES = [
@@ -201,6 +588,22 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'is_read', '-created_at'], name='notification_user_unread_idx'),
+            # Notifications still to be emailed
+            models.Index(
+                fields=['created_at'],
+                name='notification_unsent_idx',
+                condition=models.Q(sent_at__isnull=True),
+            ),
+        ]
+        constraints = [
+            # A user is told about an inspection once per notification type
+            models.UniqueConstraint(
+                fields=['inspection', 'notification_type', 'user'],
+                name='notification_unique_per_inspection',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.get_notification_type_display()} for {self.user.username}"
@@ -0,0 +1,138 @@
+"""
+Notifications about open inspections, created and emailed by the
+schedule_notifications command.
+
+Each open inspection's inspector is told once per notification type, and
+an inspection can be due several types at once:
+
+- ``red_alert``: an unresolved red finding.
+- ``amber_reminder``: an amber finding due within NOTIFICATION_AMBER_REMINDER_DAYS.
+- ``overdue``: a finding past its due date (instead of the amber reminder).
+"""
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connections, models, router, transaction
+from django.db.models import Exists, OuterRef, Q, Value
+from django.utils import timezone
+
+from .models import Inspection, InspectionQuerySet, Notification, DefectType, SeverityLevel
+
+NOTIFICATION_MESSAGES = {
+    'red_alert': 'Immediate threat on {component}: {defect}. Make the area safe and fix it now.',
+    'amber_reminder': '{defect} on {component} must be fixed by {due_date}.',
+    'overdue': '{defect} on {component} was due on {due_date} and is still unresolved.',
+}
+
+
+def due_notifications(today):
+    """
+    (inspection_id, user_id, notification_type, message) for every
+    notification that is due and was not created before, in one query: a
+    union with one branch per type, so an inspection that qualifies for
+    several types (a red finding that is also overdue) gets each of them.
+    """
+    horizon = today + timedelta(days=settings.NOTIFICATION_AMBER_REMINDER_DAYS)
+    already_notified = Notification.objects.filter(
+        inspection=OuterRef('pk'),
+        user=OuterRef('inspector'),
+        notification_type=OuterRef('notification_type'),
+    )
+
+    def candidates(kind, condition):
+        return (
+            Inspection.objects.filter(condition, is_resolved=False)
+            .annotate(notification_type=Value(kind, output_field=models.CharField()))
+            .filter(~Exists(already_notified))
+            .order_by()
+            .values_list(
+                'id', 'inspector_id', 'notification_type',
+                'component_id', 'defect_type', 'custom_defect', 'due_date',
+            )
+        )
+
+    overdue = InspectionQuerySet.overdue_q(today)
+    rows = candidates('red_alert', Q(severity=SeverityLevel.RED)).union(
+        candidates('overdue', overdue),
+        # Once overdue, the overdue notice replaces the reminder
+        candidates('amber_reminder', Q(severity=SeverityLevel.AMBER, due_date__lte=horizon) & ~overdue),
+        all=True,
+    )
+
+    defect_labels = dict(DefectType.choices)
+    for inspection_id, user_id, kind, component_id, defect_type, custom_defect, due_date in rows.iterator():
+        defect = custom_defect if defect_type == DefectType.CUSTOM else defect_labels.get(defect_type, defect_type)
+        message = NOTIFICATION_MESSAGES[kind].format(
+            component=component_id, defect=defect, due_date=due_date
+        )
+        yield inspection_id, user_id, kind, message
+
+
+def _create_new_notifications(batch):
+    """
+    Insert notifications, skipping those a concurrent run already created,
+    and return how many rows were actually inserted.
+    """
+    inserted = 0
+
+    def count_inserted(execute, sql, params, many, context):
+        nonlocal inserted
+        result = execute(sql, params, many, context)
+        # INSERT ... ON CONFLICT DO NOTHING reports only the rows it inserted
+        inserted += max(context['cursor'].rowcount, 0)
+        return result
+
+    with connections[router.db_for_write(Notification)].execute_wrapper(count_inserted):
+        Notification.objects.bulk_create(batch, ignore_conflicts=True)
+    return inserted
+
+
+def schedule_notifications(today=None, batch_size=1000):
+    """Create the notifications that are due and return how many there were."""
+    today = today or timezone.localdate()
+    due = due_notifications(today)
+    created = 0
+
+    while True:
+        batch = [
+            Notification(inspection_id=inspection_id, user_id=user_id, notification_type=kind, message=message)
+            for inspection_id, user_id, kind, message in islice(due, batch_size)
+        ]
+        if not batch:
+            return created
+        created += _create_new_notifications(batch)
+
+
+def dispatch_notifications(batch_size=500):
+    """
+    Email unsent notifications in batches over one SMTP connection. Rows are
+    locked with SKIP LOCKED, so concurrent runs never send the same email.
+    Notifications of users without an email address are marked sent as well.
+    """
+    sent = 0
+    with get_connection() as connection:
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    Notification.objects.filter(sent_at__isnull=True)
+                    .select_related('user')
+                    .select_for_update(skip_locked=True, of=('self',))
+                    .order_by('created_at')[:batch_size]
+                )
+                if not batch:
+                    return sent
+
+                messages = [
+                    EmailMessage(
+                        subject=notification.get_notification_type_display(),
+                        body=notification.message,
+                        to=[notification.user.email],
+                    )
+                    for notification in batch if notification.user.email
+                ]
+                sent += connection.send_messages(messages) or 0
+                Notification.objects.filter(pk__in=[notification.pk for notification in batch]).update(
+                    sent_at=timezone.now()
+                )
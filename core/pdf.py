@@ -0,0 +1,159 @@
+"""
+Streaming concatenation of PDF files with page numbers.
+
+Report sections are rendered as separate PDFs, so CSS page counters restart
+in every section. merge_numbered_pdfs copies the pages of each section into
+one output file object by object, renumbering the objects as it goes and
+writing each one as soon as it is copied; only one section is open at a
+time and little more than the object offsets stays in memory. Every page is stamped
+with "Page N of M" in its bottom right margin.
+"""
+import copy
+
+PAGE_NUMBER_FONT = '/ReportPageNumber'
+PAGE_NUMBER_SIZE = 9
+# Bottom right corner of the page number, from the page's bottom right, in points
+PAGE_NUMBER_OFFSET = (42.5, 28)
+# Average Helvetica glyph width as a fraction of the font size, to right-align
+AVERAGE_GLYPH_WIDTH = 0.52
+
+
+class _PdfOutput:
+    def __init__(self, stream):
+        self.stream = stream
+        self.offsets = []
+        stream.write(b'%PDF-1.7\n%\xe2\xe3\xcf\xd3\n')
+
+    def reserve(self):
+        """Allocate an object number to write later."""
+        self.offsets.append(None)
+        return len(self.offsets)
+
+    def write(self, number, obj):
+        self.offsets[number - 1] = self.stream.tell()
+        self.stream.write(f'{number} 0 obj\n'.encode())
+        obj.write_to_stream(self.stream)
+        self.stream.write(b'\nendobj\n')
+
+    def finish(self, root):
+        xref = self.stream.tell()
+        self.stream.write(f'xref\n0 {len(self.offsets) + 1}\n0000000000 65535 f \n'.encode())
+        for offset in self.offsets:
+            self.stream.write(f'{offset:010d} 00000 n \n'.encode())
+        self.stream.write(
+            f'trailer\n<< /Size {len(self.offsets) + 1} /Root {root} 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode()
+        )
+
+
+def _page_number_stream(page, text):
+    from pypdf.generic import DecodedStreamObject
+
+    right, bottom = PAGE_NUMBER_OFFSET
+    x = float(page.mediabox.right) - right - len(text) * PAGE_NUMBER_SIZE * AVERAGE_GLYPH_WIDTH
+    y = float(page.mediabox.bottom) + bottom
+    stream = DecodedStreamObject()
+    stream.set_data((
+        f'Q q 0.4 g BT {PAGE_NUMBER_FONT} {PAGE_NUMBER_SIZE} Tf {x:.2f} {y:.2f} Td ({text}) Tj ET Q'
+    ).encode())
+    return stream
+
+
+def merge_numbered_pdfs(paths, output):
+    """Write the pages of the PDF files at ``paths`` to ``output``, numbered."""
+    from pypdf import PdfReader
+    from pypdf.generic import (
+        ArrayObject, DecodedStreamObject, DictionaryObject, IndirectObject, NameObject, NumberObject,
+    )
+
+    total = sum(len(PdfReader(path).pages) for path in paths)
+    pdf = _PdfOutput(output)
+    pages_number = pdf.reserve()
+    font_number = pdf.reserve()
+    pdf.write(font_number, DictionaryObject({
+        NameObject('/Type'): NameObject('/Font'),
+        NameObject('/Subtype'): NameObject('/Type1'),
+        NameObject('/BaseFont'): NameObject('/Helvetica'),
+    }))
+    # Saves the graphics state, so the stamp is not affected by the page's own
+    save_state_number = pdf.reserve()
+    save_state = DecodedStreamObject()
+    save_state.set_data(b'q')
+    pdf.write(save_state_number, save_state)
+
+    kids = []
+    for path in paths:
+        reader = PdfReader(path)
+        numbers = {}
+        pending = []
+
+        def reference(indirect):
+            key = (indirect.idnum, indirect.generation)
+            if key not in numbers:
+                numbers[key] = pdf.reserve()
+                pending.append((numbers[key], indirect))
+            return IndirectObject(numbers[key], 0, None)
+
+        def clone(obj, skip=()):
+            if isinstance(obj, IndirectObject):
+                return reference(obj)
+            if isinstance(obj, DictionaryObject):
+                # copy.copy keeps the class, and a stream's data with it
+                cloned = copy.copy(obj)
+                cloned.clear()
+                for key, value in obj.items():
+                    if key not in skip:
+                        cloned[key] = clone(value)
+                return cloned
+            if isinstance(obj, ArrayObject):
+                return ArrayObject(clone(value) for value in obj)
+            return obj
+
+        # Number the pages first, so links between them resolve to the copies
+        for page in reader.pages:
+            numbers[(page.indirect_reference.idnum, page.indirect_reference.generation)] = pdf.reserve()
+
+        for page in reader.pages:
+            page_number = numbers[(page.indirect_reference.idnum, page.indirect_reference.generation)]
+            cloned = clone(page, skip=('/Parent', '/Resources', '/Contents'))
+            cloned[NameObject('/Parent')] = IndirectObject(pages_number, 0, None)
+
+            # Direct copies of the resources and fonts, with the page number font added
+            resources = page.get('/Resources')
+            resources = resources.get_object() if resources is not None else DictionaryObject()
+            fonts = resources.get('/Font')
+            fonts = clone(fonts.get_object()) if fonts is not None else DictionaryObject()
+            fonts[NameObject(PAGE_NUMBER_FONT)] = IndirectObject(font_number, 0, None)
+            cloned[NameObject('/Resources')] = clone(resources, skip=('/Font',))
+            cloned[NameObject('/Resources')][NameObject('/Font')] = fonts
+
+            contents = page.get('/Contents')
+            if contents is None:
+                contents = []
+            elif isinstance(contents.get_object(), ArrayObject):
+                contents = [clone(stream) for stream in contents.get_object()]
+            else:
+                contents = [clone(contents)]
+            stamp_number = pdf.reserve()
+            pdf.write(stamp_number, _page_number_stream(page, f'Page {len(kids) + 1} of {total}'))
+            cloned[NameObject('/Contents')] = ArrayObject([
+                IndirectObject(save_state_number, 0, None), *contents, IndirectObject(stamp_number, 0, None),
+            ])
+
+            pdf.write(page_number, cloned)
+            kids.append(page_number)
+
+            while pending:
+                number, indirect = pending.pop()
+                pdf.write(number, clone(indirect.get_object(), skip=('/Parent',)))
+
+    pdf.write(pages_number, DictionaryObject({
+        NameObject('/Type'): NameObject('/Pages'),
+        NameObject('/Kids'): ArrayObject(IndirectObject(number, 0, None) for number in kids),
+        NameObject('/Count'): NumberObject(len(kids)),
+    }))
+    root_number = pdf.reserve()
+    pdf.write(root_number, DictionaryObject({
+        NameObject('/Type'): NameObject('/Catalog'),
+        NameObject('/Pages'): IndirectObject(pages_number, 0, None),
+    }))
+    pdf.finish(root_number)
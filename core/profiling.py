@@ -0,0 +1,205 @@
+"""
+Per-view request profiling.
+
+ProfilingMiddleware samples a fraction of requests (PROFILING_SAMPLE_RATE)
+and records, per URL name, the number of SQL queries, the time spent in SQL,
+the time spent rendering templates and the total latency. Each process keeps
+the latest PROFILING_WINDOW samples per URL name; the profiling_stats view
+summarises them as percentiles.
+
+Views declare how many queries they may issue with ``@query_budget(n)``.
+Going over the budget logs a warning, or raises QueryBudgetExceeded when
+PROFILING_ENFORCE_BUDGETS is set (as in tests, where every request is
+profiled), which fails the test that made the request. Streaming responses
+are measured until their content has been consumed.
+"""
+from collections import deque
+from contextlib import ExitStack
+import contextvars
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+METRICS = ('queries', 'sql_ms', 'template_ms', 'total_ms')
+
+_current_profile = contextvars.ContextVar('request_profile', default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_budget(max_queries):
+    """Declare the most SQL queries a view may issue, middleware included."""
+    def decorator(view_func):
+        view_func.query_budget = max_queries
+        return view_func
+    return decorator
+
+
+class RequestProfile:
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+
+    def execute(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.sql_time += time.perf_counter() - start
+
+
+def _percentiles(values):
+    values = sorted(values)
+    last = len(values) - 1
+    return {
+        'p50': values[round(last * 0.50)],
+        'p95': values[round(last * 0.95)],
+        'p99': values[round(last * 0.99)],
+        'max': values[last],
+    }
+
+
+class ProfileStats:
+    """Bounded windows of recent samples per URL name, shared by the process's threads."""
+
+    def __init__(self, window):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, sample):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+            samples.append(sample)
+
+    def summary(self):
+        with self._lock:
+            snapshot = {name: list(samples) for name, samples in self._samples.items()}
+
+        return {
+            name: {
+                'samples': len(samples),
+                **{
+                    metric: _percentiles([sample[index] for sample in samples])
+                    for index, metric in enumerate(METRICS)
+                },
+            }
+            for name, samples in sorted(snapshot.items())
+        }
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+
+
+stats = ProfileStats(settings.PROFILING_WINDOW)
+
+
+def _instrument_templates():
+    """Time template rendering; nested renders count once, with their parent."""
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, 'profiled', False):
+        return
+    render = Template.render
+
+    def profiled_render(self, context=None, request=None):
+        profile = _current_profile.get()
+        if profile is None:
+            return render(self, context, request)
+
+        profile.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return render(self, context, request)
+        finally:
+            profile.template_depth -= 1
+            if not profile.template_depth:
+                profile.template_time += time.perf_counter() - start
+
+    profiled_render.profiled = True
+    Template.render = profiled_render
+
+
+class ProfilingMiddleware:
+    """Should come first in MIDDLEWARE so its numbers cover the whole request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.enforce_budgets = settings.PROFILING_ENFORCE_BUDGETS
+        self.server_timing = settings.PROFILING_SERVER_TIMING
+        _instrument_templates()
+
+    def __call__(self, request):
+        if not self.enforce_budgets and random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+        start = time.perf_counter()
+        stack = ExitStack()
+        try:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(profile.execute))
+            response = self.get_response(request)
+        except BaseException:
+            stack.close()
+            raise
+        finally:
+            _current_profile.reset(token)
+
+        if response.streaming and not response.is_async:
+            # Streaming views run most of their queries while the response is
+            # consumed, after get_response returns: keep counting until then
+            response.streaming_content = self._profile_stream(
+                request, response.streaming_content, profile, start, stack,
+            )
+            return response
+
+        stack.close()
+        self._finish(request, response, profile, start)
+        return response
+
+    def _profile_stream(self, request, content, profile, start, stack):
+        with stack:
+            yield from content
+        self._finish(request, None, profile, start)
+
+    def _finish(self, request, response, profile, start):
+        total_time = time.perf_counter() - start
+
+        match = request.resolver_match
+        name = match.view_name if match else '<unresolved>'
+        sample = (profile.queries, profile.sql_time * 1000, profile.template_time * 1000, total_time * 1000)
+        stats.record(name, sample)
+
+        # A streamed response's headers are sent before its numbers are known
+        if self.server_timing and response is not None:
+            response['Server-Timing'] = (
+                f'sql;dur={sample[1]:.1f};desc="{profile.queries} queries", '
+                f'tpl;dur={sample[2]:.1f}, total;dur={sample[3]:.1f}'
+            )
+
+        budget = getattr(request, '_query_budget', None)
+        if budget is not None and profile.queries > budget:
+            message = f'{name} issued {profile.queries} queries, over its budget of {budget}'
+            if self.enforce_budgets:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._query_budget = getattr(view_func, 'query_budget', None)
@@ -0,0 +1,118 @@
+"""
+Downscaled copies of inspection photos.
+
+Phones upload photos of several megabytes; pages and reports only ever need a
+fraction of that. A background worker (run_rendition_worker) turns each new
+or replaced photo into the renditions below and stores them next to the
+original. Until they exist, InspectionPhoto.rendition_name() falls back to
+the original image.
+"""
+from collections import namedtuple
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+
+from .models import InspectionPhoto, RenditionStatus
+
+logger = logging.getLogger(__name__)
+
+Rendition = namedtuple('Rendition', ['size', 'format', 'quality', 'extension'])
+
+RENDITIONS = {
+    # Panel and list previews
+    'thumb': Rendition(320, 'WEBP', 75, 'webp'),
+    # Full-screen view on tablets
+    'display': Rendition(1600, 'WEBP', 80, 'webp'),
+    # PDF reports print photos at most 45mm wide: ~530px at 300dpi.
+    # JPEG because WeasyPrint embeds it without re-encoding.
+    'report': Rendition(600, 'JPEG', 80, 'jpg'),
+}
+
+RENDITION_DIR = 'inspection_photos/renditions'
+
+
+def claim_photos(limit):
+    """Move up to ``limit`` pending photos to running and return their ids."""
+    with transaction.atomic():
+        photo_ids = list(
+            InspectionPhoto.objects.filter(rendition_status=RenditionStatus.PENDING)
+            .order_by('uploaded_at')
+            .select_for_update(skip_locked=True)
+            .values_list('id', flat=True)[:limit]
+        )
+        if photo_ids:
+            InspectionPhoto.objects.filter(pk__in=photo_ids).update(
+                rendition_status=RenditionStatus.RUNNING, rendition_started_at=timezone.now()
+            )
+    return photo_ids
+
+
+def requeue_stale_photos():
+    """Put photos back in the queue whose worker died while processing them."""
+    cutoff = timezone.now() - timezone.timedelta(seconds=settings.PHOTO_RENDITION_TIMEOUT)
+    return InspectionPhoto.objects.filter(
+        rendition_status=RenditionStatus.RUNNING, rendition_started_at__lt=cutoff
+    ).update(rendition_status=RenditionStatus.PENDING)
+
+
+def render_renditions(source):
+    """
+    Yield (name, rendition, encoded bytes) for every rendition of an image
+    file. Renditions are produced from largest to smallest, each downscaled
+    from the previous one, and JPEG sources are decoded at reduced size.
+    """
+    from PIL import Image, ImageOps
+
+    renditions = sorted(RENDITIONS.items(), key=lambda item: item[1].size, reverse=True)
+    largest = renditions[0][1].size
+
+    with Image.open(source) as image:
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+
+        for name, rendition in renditions:
+            image.thumbnail((rendition.size, rendition.size), Image.Resampling.LANCZOS)
+            output = io.BytesIO()
+            image.save(output, rendition.format, quality=rendition.quality, optimize=True)
+            yield name, rendition, output.getvalue()
+
+
+def generate_renditions(photo_id):
+    """Create the renditions of a claimed photo and record them on the row."""
+    photo = InspectionPhoto.objects.get(pk=photo_id)
+    storage = photo.image.storage
+    stem = os.path.splitext(os.path.basename(photo.image.name))[0]
+    created = {}
+
+    try:
+        with photo.image.open('rb') as source:
+            for name, rendition, content in render_renditions(source):
+                created[name] = storage.save(
+                    f'{RENDITION_DIR}/{stem}-{name}.{rendition.extension}', ContentFile(content)
+                )
+
+        # The image may have been replaced meanwhile, which queued it again
+        finished = InspectionPhoto.objects.filter(
+            pk=photo_id, image=photo.image.name, rendition_status=RenditionStatus.RUNNING
+        ).update(renditions=created, rendition_status=RenditionStatus.DONE)
+    except Exception:
+        logger.exception('Error generating renditions for photo %s', photo_id)
+        InspectionPhoto.objects.filter(
+            pk=photo_id, rendition_status=RenditionStatus.RUNNING
+        ).update(rendition_status=RenditionStatus.FAILED)
+        finished = False
+
+    # Drop the previous renditions, or the new ones if they were not recorded
+    if finished:
+        obsolete = set(photo.renditions.values()) - set(created.values())
+    else:
+        obsolete = created.values()
+    for name in obsolete:
+        storage.delete(name)
+
+    return bool(finished)
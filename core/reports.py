@@ -0,0 +1,293 @@
+from datetime import datetime, time, timedelta
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import (
+    Report, ReportStatus, Inspection, InspectionPhoto, WarehouseComponent, SeverityLevel, ComponentStatus
+)
+from .pdf import merge_numbered_pdfs
+
+logger = logging.getLogger(__name__)
+
+
+def claim_reports(limit):
+    """
+    Move up to ``limit`` of the oldest queued reports to running and return
+    their ids. Rows are locked with SKIP LOCKED, so several workers can poll
+    the queue without claiming the same report twice.
+    """
+    with transaction.atomic():
+        report_ids = list(
+            Report.objects.filter(status=ReportStatus.QUEUED)
+            .order_by('generated_at')
+            .select_for_update(skip_locked=True)
+            .values_list('id', flat=True)[:limit]
+        )
+        if report_ids:
+            Report.objects.filter(pk__in=report_ids).update(
+                status=ReportStatus.RUNNING, progress=0, error='', started_at=timezone.now()
+            )
+    return report_ids
+
+
+def requeue_stale_reports():
+    """Put reports back in the queue whose worker died while generating them."""
+    cutoff = timezone.now() - timezone.timedelta(seconds=settings.REPORT_JOB_TIMEOUT)
+    return Report.objects.filter(status=ReportStatus.RUNNING, started_at__lt=cutoff).update(
+        status=ReportStatus.QUEUED, progress=0
+    )
+
+
+def set_progress(report_id, progress):
+    Report.objects.filter(pk=report_id).update(progress=progress)
+
+
+def report_period(report):
+    """The report's date range as an aware [start, end) datetime range."""
+    start = timezone.make_aware(datetime.combine(report.date_from, time.min))
+    end = timezone.make_aware(datetime.combine(report.date_to + timedelta(days=1), time.min))
+    return start, end
+
+
+def report_inspections(report):
+    """Inspections covered by a report, filtered by its layout, period and type."""
+    start, end = report_period(report)
+    # A plain range on inspection_date (rather than __date) can use its index
+    inspections = Inspection.objects.filter(
+        component__layout=report.layout,
+        inspection_date__gte=start,
+        inspection_date__lt=end,
+    )
+
+    if report.report_type == 'urgent':
+        inspections = inspections.filter(
+            severity__in=[SeverityLevel.RED, SeverityLevel.AMBER], is_resolved=False
+        )
+    elif report.report_type == 'defects':
+        inspections = inspections.exclude(severity=SeverityLevel.GREEN)
+
+    return inspections
+
+
+def layout_component_counts(layout_id):
+    return WarehouseComponent.objects.filter(layout_id=layout_id).aggregate(
+        total=Count('id'),
+        immediate=Count('id', filter=Q(status=ComponentStatus.IMMEDIATE)),
+        fix_4_weeks=Count('id', filter=Q(status=ComponentStatus.FIX_4_WEEKS)),
+    )
+
+
+def build_summary_context(report):
+    inspections = report_inspections(report)
+    return {
+        'report': report,
+        'layout': report.layout,
+        'generated_at': timezone.now(),
+        'severity_counts': dict(
+            inspections.order_by().values_list('severity').annotate(count=Count('id'))
+        ),
+        'component_counts': layout_component_counts(report.layout_id),
+    }
+
+
+# Report fields that change what a generated PDF contains
+REPORT_CONTENT_FIELDS = (
+    'layout_id', 'report_type', 'date_from', 'date_to',
+    'include_layout', 'include_photos', 'include_inspector_details',
+    # The summary prints who generated it
+    'generated_by_id',
+)
+
+
+def report_data_revision(report):
+    """
+    Fingerprint of the data a report shows: the inspections it covers, their
+    photos and the component counts of the summary. Edits outside the
+    report's period and filters leave it unchanged.
+    """
+    inspections = report_inspections(report)
+    values = inspections.aggregate(inspections=Count('id'), inspections_updated=Max('updated_at'))
+    if report.include_photos:
+        values.update(InspectionPhoto.objects.filter(inspection__in=inspections).aggregate(
+            photos=Count('id'), photos_uploaded=Max('uploaded_at')
+        ))
+    values.update(layout_component_counts(report.layout_id))
+    return json.dumps(values, sort_keys=True, default=str)
+
+
+def report_content_key(report):
+    """Hash of the report's parameters and the current revision of its data."""
+    parts = [str(getattr(report, field)) for field in REPORT_CONTENT_FIELDS]
+    parts.append(report_data_revision(report))
+    return hashlib.sha256('\x1f'.join(parts).encode()).hexdigest()
+
+
+def find_cached_report(content_key, exclude=None):
+    """
+    A generated report with the same content key, whose PDF can be shared
+    instead of rendering the same PDF again.
+    """
+    reports = Report.objects.filter(content_key=content_key, status=ReportStatus.DONE).exclude(pdf_file='')
+    if exclude is not None:
+        reports = reports.exclude(pk=exclude)
+    return reports.order_by('-generated_at').first()
+
+
+def evict_report_files(max_age, max_total_size):
+    """
+    Delete generated PDFs last used more than ``max_age`` seconds ago, then
+    the least recently used of the rest until they take at most
+    ``max_total_size`` bytes. Reports sharing an evicted PDF are marked
+    expired and no longer match new requests.
+    """
+    cutoff = timezone.now() - timezone.timedelta(seconds=max_age)
+    # One row per file: identical reports share the PDF of the first one
+    files = (
+        Report.objects.filter(status=ReportStatus.DONE).exclude(pdf_file='')
+        .order_by()
+        .values('pdf_file')
+        .annotate(last_finished=Max('finished_at'), size=Max('pdf_size'))
+        .order_by('-last_finished')
+    )
+
+    evicted = []
+    total_size = 0
+    for row in files.iterator():
+        if row['last_finished'] < cutoff:
+            evicted.append(row['pdf_file'])
+            continue
+        total_size += row['size']
+        if total_size > max_total_size:
+            evicted.append(row['pdf_file'])
+
+    storage = Report._meta.get_field('pdf_file').storage
+    for pdf_file in evicted:
+        storage.delete(pdf_file)
+    Report.objects.filter(pdf_file__in=evicted).update(
+        status=ReportStatus.EXPIRED, pdf_file='', pdf_size=0, content_key=''
+    )
+    return len(evicted)
+
+
+def iter_inspection_sections(report, section_size):
+    """
+    Yield lists of at most ``section_size`` inspections, streamed from a
+    server-side cursor. Photos are prefetched per chunk, so only one section
+    of rows and photos is in memory at a time.
+    """
+    inspections = report_inspections(report).select_related('component', 'inspector').order_by(
+        'component__id', '-inspection_date', 'id'
+    )
+    if report.include_photos:
+        inspections = inspections.prefetch_related('photos')
+
+    section = []
+    for inspection in inspections.iterator(chunk_size=section_size):
+        section.append(inspection)
+        if len(section) >= section_size:
+            yield section
+            section = []
+    if section:
+        yield section
+
+
+def render_report_pdf(report, output_path, progress=None):
+    """
+    Render a report to ``output_path`` section by section: the summary and
+    each chunk of inspections become separate small PDFs in a temporary
+    directory that are streamed into one numbered PDF at the end. Neither
+    the ORM rows, the WeasyPrint layout nor the pages of the whole report
+    are ever held in memory at once.
+    """
+    from weasyprint import HTML
+
+    base_url = str(settings.MEDIA_ROOT)
+    section_size = settings.REPORT_SECTION_SIZE
+
+    with tempfile.TemporaryDirectory(prefix='report-') as workdir:
+        section_paths = []
+
+        def write_section(template, context):
+            path = os.path.join(workdir, f'{len(section_paths):05d}.pdf')
+            HTML(string=render_to_string(template, context), base_url=base_url).write_pdf(path)
+            section_paths.append(path)
+
+        write_section('reports/summary.html', build_summary_context(report))
+
+        # Compliance certificates only carry the summary
+        if report.report_type != 'compliance':
+            total = report_inspections(report).count()
+            done = 0
+            for inspections in iter_inspection_sections(report, section_size):
+                first = done + 1
+                done += len(inspections)
+                write_section('reports/inspections.html', {
+                    'report': report,
+                    'layout': report.layout,
+                    'inspections': inspections,
+                    'section_title': f'Inspections {first}-{done} of {total}',
+                })
+                if progress and total:
+                    progress(10 + 80 * done // total)
+
+        # Page numbers are stamped while merging: each section's own CSS page
+        # counter would restart at 1
+        with open(output_path, 'wb') as output:
+            merge_numbered_pdfs(section_paths, output)
+
+
+def generate_report(report_id):
+    """Render a report to PDF, attach it and record the outcome on the row."""
+    report = Report.objects.select_related('layout', 'generated_by').get(pk=report_id)
+
+    try:
+        # Key the PDF by the data as it is now rather than when it was queued;
+        # the aggregates behind the key run here, not on the request
+        content_key = report_content_key(report)
+        cached = find_cached_report(content_key, exclude=report_id)
+        if cached is not None:
+            # Same parameters and unchanged data: share the existing PDF
+            Report.objects.filter(pk=report_id).update(
+                pdf_file=cached.pdf_file.name,
+                pdf_size=cached.pdf_size,
+                content_key=content_key,
+                status=ReportStatus.DONE,
+                progress=100,
+                finished_at=timezone.now(),
+            )
+            return True
+
+        with tempfile.TemporaryDirectory(prefix='report-') as workdir:
+            output_path = os.path.join(workdir, 'report.pdf')
+            render_report_pdf(report, output_path, progress=lambda value: set_progress(report_id, value))
+            set_progress(report_id, 95)
+
+            with open(output_path, 'rb') as output:
+                report.pdf_file.save(f'report-{report.id}.pdf', File(output), save=False)
+
+        Report.objects.filter(pk=report_id).update(
+            pdf_file=report.pdf_file.name,
+            pdf_size=report.pdf_file.size,
+            content_key=content_key,
+            status=ReportStatus.DONE,
+            progress=100,
+            finished_at=timezone.now(),
+        )
+    except Exception as e:
+        logger.exception('Error generating report %s', report_id)
+        Report.objects.filter(pk=report_id).update(
+            status=ReportStatus.FAILED, error=str(e), finished_at=timezone.now()
+        )
+        return False
+
+    return True
@@ -0,0 +1,123 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from .events import publish_layout_changed, publish_status_changes
+from .models import WarehouseLayout, WarehouseComponent, Inspection
+from .spatial import invalidate_layout_extent
+from .stats import (
+    invalidate_dashboard_stats, invalidate_urgent_items_count,
+    adjust_urgent_items_count, is_urgent
+)
+from .trends import record_trend_change
+from .zones import apply_zone_status_changes, start_zone_rollup
+
+
+# Sent (sender=WarehouseLayout) after components of a layout were written in
+# bulk, which bypasses the model signals. ``removed`` tells receivers that
+# components, and with them their inspections, were deleted. The writers
+# keep the zone roll-up current themselves, in their transaction.
+components_changed = Signal()
+
+
+# Bulk writes send components_changed instead of the model signals. The
+# post_delete receivers below make Django load every row a cascading delete
+# removes, which is what keeps the derived counts right when components or
+# inspections are deleted.
+
+@receiver(components_changed, sender=WarehouseLayout)
+def layout_components_changed(sender, layout_id, removed=False, **kwargs):
+    invalidate_dashboard_stats(layout_id)
+    invalidate_layout_extent(layout_id)
+    if removed:
+        invalidate_urgent_items_count(layout_id)
+    publish_layout_changed(layout_id, _layout_revision(layout_id))
+
+
+@receiver(post_save, sender=WarehouseLayout)
+def layout_saved(sender, instance, created, **kwargs):
+    if created:
+        start_zone_rollup(instance.id)
+
+
+@receiver(post_save, sender=WarehouseComponent)
+def component_saved(sender, instance, created, **kwargs):
+    WarehouseLayout.bump_revision(pk=instance.layout_id)
+    previous_status = None if created else instance._loaded_status
+    # Rows loaded with a deferred status have no previous status to move from
+    if created or (previous_status is not None and previous_status != instance.status):
+        apply_zone_status_changes(instance.layout_id, [(instance.id, previous_status, instance.status)])
+    instance._loaded_status = instance.status
+    invalidate_dashboard_stats(instance.layout_id)
+    invalidate_layout_extent(instance.layout_id)
+    publish_layout_changed(instance.layout_id, _layout_revision(instance.layout_id))
+
+
+@receiver(post_delete, sender=WarehouseComponent)
+def component_deleted(sender, instance, **kwargs):
+    layout_id = instance.layout_id
+    WarehouseLayout.bump_revision(pk=layout_id)
+
+    def remove_from_rollup():
+        apply_zone_status_changes(layout_id, [(instance.id, instance.status, None)])
+        invalidate_dashboard_stats(layout_id)
+        invalidate_layout_extent(layout_id)
+
+    transaction.on_commit(remove_from_rollup)
+
+
+def _layout_revision(layout_id):
+    return WarehouseLayout.objects.filter(pk=layout_id).values_list('revision', flat=True).first()
+
+
+def _inspection_layout_id(inspection):
+    if Inspection.component.is_cached(inspection):
+        return inspection.component.layout_id
+    return WarehouseComponent.objects.filter(pk=inspection.component_id).values_list(
+        'layout_id', flat=True
+    ).first()
+
+
+@receiver(post_save, sender=Inspection)
+def inspection_saved(sender, instance, created, **kwargs):
+    trend_state = instance.trend_state()
+    previous_trend_state = None if created else instance._loaded_trend_state
+    # Rows loaded with deferred fields have no previous state to move from
+    if created or (previous_trend_state is not None and previous_trend_state != trend_state):
+        record_trend_change(_inspection_layout_id(instance), previous_trend_state, trend_state)
+    instance._loaded_trend_state = trend_state
+
+    was_urgent = not created and instance._loaded_urgent
+    now_urgent = is_urgent(instance.severity, instance.is_resolved)
+    instance._loaded_urgent = now_urgent
+    delta = int(now_urgent) - int(was_urgent)
+
+    # Inspection.save updates the component status with a queryset UPDATE,
+    # so the component post_save above does not fire for it
+    if not (delta or instance._component_status_changed):
+        return
+
+    if instance._component_status_changed:
+        # One lookup for both the layout and the revision Inspection.save bumped
+        layout_id, revision = WarehouseLayout.objects.filter(
+            components__pk=instance.component_id
+        ).values_list('id', 'revision').get()
+        apply_zone_status_changes(layout_id, [
+            (instance.component_id, instance._previous_component_status, instance.component_status)
+        ])
+        invalidate_dashboard_stats(layout_id)
+        publish_status_changes(layout_id, revision, [(instance.component_id, instance.component_status)])
+    else:
+        layout_id = _inspection_layout_id(instance)
+    # A rolled back save must not leave the cached counter adjusted
+    transaction.on_commit(lambda: adjust_urgent_items_count(layout_id, delta))
+
+
+@receiver(post_delete, sender=Inspection)
+def inspection_deleted(sender, instance, **kwargs):
+    layout_id = _inspection_layout_id(instance)
+    if layout_id is None:
+        return
+    record_trend_change(layout_id, instance.trend_state(), None)
+    if instance._loaded_urgent:
+        transaction.on_commit(lambda: adjust_urgent_items_count(layout_id, -1))
@@ -0,0 +1,46 @@
+from .models import ComponentType, ComponentStatus
+from .spatial import COMPONENT_ROW_FIELDS
+
+
+SNAPSHOT_FORMAT_VERSION = 1
+
+COMPONENT_TYPE_CODES = {value: code for code, value in enumerate(ComponentType.values)}
+COMPONENT_STATUS_CODES = {value: code for code, value in enumerate(ComponentStatus.values)}
+
+
+def encode_layout_snapshot(layout, rows):
+    """
+    Encode component rows (see COMPONENT_ROW_FIELDS) as a columnar snapshot:
+    one array per field, with types and statuses as indexes into lookup
+    tables. This is far smaller than a list of objects once compressed.
+    """
+    ids, types, xs, ys, widths, heights, statuses = [], [], [], [], [], [], []
+    for component_id, component_type, x, y, width, height, status in rows:
+        ids.append(component_id)
+        types.append(COMPONENT_TYPE_CODES.get(component_type, -1))
+        xs.append(x)
+        ys.append(y)
+        widths.append(width)
+        heights.append(height)
+        statuses.append(COMPONENT_STATUS_CODES.get(status, -1))
+
+    return {
+        'version': SNAPSHOT_FORMAT_VERSION,
+        'layout_id': str(layout.id),
+        'revision': layout.revision,
+        'types': ComponentType.values,
+        'statuses': ComponentStatus.values,
+        'components': {
+            'id': ids,
+            'type': types,
+            'x': xs,
+            'y': ys,
+            'width': widths,
+            'height': heights,
+            'status': statuses,
+        },
+    }
+
+
+def layout_snapshot_rows(layout, chunk_size=2000):
+    return layout.components.values_list(*COMPONENT_ROW_FIELDS).iterator(chunk_size=chunk_size)
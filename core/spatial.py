@@ -0,0 +1,203 @@
+from collections import OrderedDict
+import math
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Max
+
+from .models import WarehouseComponent
+
+
+LAYOUT_EXTENT_KEY = 'layout_extent:{}'
+
+# Rectangles covering more grid cells than this are kept out of the grid
+MAX_CELLS_PER_COMPONENT = 64
+
+# Fields returned to the canvases, in the order of each row
+COMPONENT_ROW_FIELDS = ('id', 'component_type', 'x_position', 'y_position', 'width', 'height', 'status')
+
+
+def layout_max_component_size(layout_id):
+    """
+    Return the (max_width, max_height) of the components in a layout. A box
+    query only has to look this far left of and above the box for components
+    that reach into it, which keeps it a range scan on the position index.
+    """
+    key = LAYOUT_EXTENT_KEY.format(layout_id)
+    size = cache.get(key)
+    if size is None:
+        extent = WarehouseComponent.objects.filter(layout_id=layout_id).aggregate(
+            max_width=Max('width'), max_height=Max('height')
+        )
+        size = (extent['max_width'] or 0, extent['max_height'] or 0)
+        cache.set(key, size, settings.LAYOUT_EXTENT_CACHE_TIMEOUT)
+    return size
+
+
+def invalidate_layout_extent(layout_id):
+    cache.delete(LAYOUT_EXTENT_KEY.format(layout_id))
+
+
+def components_in_bbox(layout_id, x1, y1, x2, y2):
+    """
+    Return rows (see COMPONENT_ROW_FIELDS) for the components of a layout whose
+    rectangle intersects the box (x1, y1)-(x2, y2).
+    """
+    max_width, max_height = layout_max_component_size(layout_id)
+    return (
+        WarehouseComponent.objects
+        .filter(
+            layout_id=layout_id,
+            # Bounded ranges the (layout, x, y) index can serve...
+            x_position__gt=x1 - max_width, x_position__lt=x2,
+            y_position__gt=y1 - max_height, y_position__lt=y2,
+        )
+        # ...refined to the exact intersection test
+        .filter(x_position__gt=x1 - F('width'), y_position__gt=y1 - F('height'))
+        .order_by()
+        .values_list(*COMPONENT_ROW_FIELDS)
+    )
+
+
+class LayoutIndex:
+    """
+    Uniform grid over the component rectangles of one layout revision. Each
+    rectangle is listed in every cell it overlaps; the cell size follows the
+    typical component size, so a query only looks at a handful of cells and
+    the candidates in them.
+    """
+
+    def __init__(self, revision, rows):
+        self.revision = revision
+        self.rows = rows
+        if rows:
+            average = sum(max(row[4], row[5]) for row in rows) / len(rows)
+            self.cell_size = max(average * 2, 1.0)
+        else:
+            self.cell_size = 1.0
+
+        self.cells = {}
+        # Rectangles spanning too many cells (or with non-finite geometry)
+        # are not gridded; every query checks them directly
+        self.large = []
+        self.extent = None
+        for index, row in enumerate(rows):
+            x1, y1, x2, y2 = row[2], row[3], row[2] + row[4], row[3] + row[5]
+            if not all(math.isfinite(value) for value in (x1, y1, x2, y2)) or (
+                (x2 // self.cell_size - x1 // self.cell_size + 1)
+                * (y2 // self.cell_size - y1 // self.cell_size + 1)
+                > MAX_CELLS_PER_COMPONENT
+            ):
+                self.large.append(index)
+                continue
+            for cell in self._cells(x1, y1, x2, y2):
+                self.cells.setdefault(cell, []).append(index)
+            if self.extent is None:
+                self.extent = [x1, y1, x2, y2]
+            else:
+                extent = self.extent
+                extent[0], extent[1] = min(extent[0], x1), min(extent[1], y1)
+                extent[2], extent[3] = max(extent[2], x2), max(extent[3], y2)
+
+    def _cells(self, x1, y1, x2, y2):
+        size = self.cell_size
+        for cx in range(int(x1 // size), int(x2 // size) + 1):
+            for cy in range(int(y1 // size), int(y2 // size) + 1):
+                yield cx, cy
+
+    def _candidates(self, x1, y1, x2, y2):
+        rows = self.rows
+        for index in self.large:
+            yield rows[index]
+        if self.extent is None:
+            return
+
+        # Only the part of the box over gridded rectangles has cells to visit
+        min_x, min_y, max_x, max_y = self.extent
+        x1, y1, x2, y2 = max(x1, min_x), max(y1, min_y), min(x2, max_x), min(y2, max_y)
+        if x1 > x2 or y1 > y2:
+            return
+
+        size = self.cell_size
+        cell_count = (x2 // size - x1 // size + 1) * (y2 // size - y1 // size + 1)
+        if cell_count > len(rows):
+            # Visiting the cells would cost more than scanning every row
+            large = set(self.large)
+            for index, row in enumerate(rows):
+                if index not in large:
+                    yield row
+            return
+
+        cells = self.cells
+        seen = set()
+        for cell in self._cells(x1, y1, x2, y2):
+            for index in cells.get(cell, ()):
+                if index not in seen:
+                    seen.add(index)
+                    yield rows[index]
+
+    def at_point(self, x, y):
+        """Rows whose rectangle contains the point, edges included."""
+        return [
+            row for row in self._candidates(x, y, x, y)
+            if row[2] <= x <= row[2] + row[4] and row[3] <= y <= row[3] + row[5]
+        ]
+
+    def in_rect(self, x1, y1, x2, y2):
+        """Rows whose rectangle intersects the box, as components_in_bbox."""
+        return [
+            row for row in self._candidates(x1, y1, x2, y2)
+            if row[2] < x2 and row[2] + row[4] > x1 and row[3] < y2 and row[3] + row[5] > y1
+        ]
+
+    def within_radius(self, x, y, radius):
+        """
+        (distance, row) pairs for the rectangles within ``radius`` of the
+        point, nearest first; the distance is 0 for rectangles containing it.
+        """
+        results = []
+        for row in self._candidates(x - radius, y - radius, x + radius, y + radius):
+            dx = max(row[2] - x, 0, x - row[2] - row[4])
+            dy = max(row[3] - y, 0, y - row[3] - row[5])
+            distance = (dx * dx + dy * dy) ** 0.5
+            if distance <= radius:
+                results.append((distance, row))
+        results.sort(key=lambda result: result[0])
+        return results
+
+
+_layout_indexes = OrderedDict()
+_layout_indexes_lock = threading.Lock()
+
+
+def layout_index(layout_id, revision):
+    """
+    The LayoutIndex of a layout at ``revision``, built on first use. Every
+    write bumps the layout revision, so an index built for an older revision
+    is rebuilt; each process keeps the SPATIAL_INDEX_MAX_LAYOUTS most
+    recently used ones.
+    """
+    with _layout_indexes_lock:
+        index = _layout_indexes.get(layout_id)
+        if index is not None and index.revision == revision:
+            _layout_indexes.move_to_end(layout_id)
+            return index
+
+    rows = list(
+        WarehouseComponent.objects.filter(layout_id=layout_id)
+        .order_by()
+        .values_list(*COMPONENT_ROW_FIELDS)
+        .iterator(chunk_size=10000)
+    )
+    index = LayoutIndex(revision, rows)
+
+    with _layout_indexes_lock:
+        current = _layout_indexes.get(layout_id)
+        # A concurrent request may have built a newer one meanwhile
+        if current is None or current.revision <= revision:
+            _layout_indexes[layout_id] = index
+        _layout_indexes.move_to_end(layout_id)
+        while len(_layout_indexes) > settings.SPATIAL_INDEX_MAX_LAYOUTS:
+            _layout_indexes.popitem(last=False)
+    return index
@@ -0,0 +1,88 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Inspection, ComponentStatus, SeverityLevel
+from .zones import layout_status_counts
+
+
+DASHBOARD_STATS_KEY = 'dashboard_stats:{}'
+URGENT_ITEMS_KEY = 'urgent_items:{}'
+URGENT_SEVERITIES = (SeverityLevel.RED, SeverityLevel.AMBER)
+
+
+def _stats_key(layout_id):
+    return DASHBOARD_STATS_KEY.format(layout_id or 'all')
+
+
+def _urgent_key(layout_id):
+    return URGENT_ITEMS_KEY.format(layout_id or 'all')
+
+
+def get_dashboard_stats(layout_id=None):
+    """
+    Return component status counts for the dashboard, optionally scoped to a
+    layout. The counts are summed from the zone roll-up's whole-layout rows
+    and cached until a component or inspection in the layout changes.
+    """
+    key = _stats_key(layout_id)
+    stats = cache.get(key)
+    if stats is not None:
+        return stats
+
+    counts = layout_status_counts(layout_id)
+    stats = {
+        'total_components': sum(counts.values()),
+        'immediate_threats': counts[ComponentStatus.IMMEDIATE],
+        'fix_4_weeks': counts[ComponentStatus.FIX_4_WEEKS],
+        'monitor_only': counts[ComponentStatus.GOOD] + counts[ComponentStatus.MONITOR],
+    }
+    cache.set(key, stats, settings.DASHBOARD_STATS_CACHE_TIMEOUT)
+    return stats
+
+
+def invalidate_dashboard_stats(layout_id):
+    """Drop the cached counts for a layout and for the site-wide dashboard."""
+    cache.delete_many([_stats_key(layout_id), _stats_key(None)])
+
+
+def is_urgent(severity, is_resolved):
+    """Whether an inspection in this state counts as an urgent item."""
+    return severity in URGENT_SEVERITIES and not is_resolved
+
+
+def get_urgent_items_count(layout_id=None):
+    """
+    Return the number of unresolved red/amber inspections, site-wide or for a
+    layout. The counter lives in the cache and is adjusted incrementally as
+    inspections are created or resolved; it is only recomputed from the
+    database when the cache entry is missing or has expired.
+    """
+    key = _urgent_key(layout_id)
+    count = cache.get(key)
+    if count is not None:
+        return count
+
+    inspections = Inspection.objects.filter(severity__in=URGENT_SEVERITIES, is_resolved=False)
+    if layout_id:
+        inspections = inspections.filter(component__layout_id=layout_id)
+
+    count = inspections.count()
+    cache.add(key, count, settings.URGENT_ITEMS_CACHE_TIMEOUT)
+    return count
+
+
+def adjust_urgent_items_count(layout_id, delta):
+    """Apply a +/- delta to the layout and site-wide urgent item counters."""
+    if not delta:
+        return
+    for key in (_urgent_key(layout_id), _urgent_key(None)):
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            # Not cached yet; the next read recomputes it
+            pass
+
+
+def invalidate_urgent_items_count(layout_id):
+    """Drop the cached urgent counters, e.g. after inspections were bulk deleted."""
+    cache.delete_many([_urgent_key(layout_id), _urgent_key(None)])
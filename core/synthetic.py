@@ -0,0 +1,165 @@
+"""
+Seeded synthetic datasets for load testing (generate_synthetic_data,
+run_benchmarks).
+
+Everything is inserted with bulk_create in batches, streamed so memory stays
+flat however large the dataset is. The same seed always produces the same
+layouts, components and inspections.
+"""
+from itertools import islice
+import io
+import random
+import re
+import string
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from .models import (
+    WarehouseLayout, WarehouseComponent, Inspection, InspectionPhoto, UserProfile,
+    ComponentType, ComponentStatus, DefectType, SeverityLevel, RenditionStatus,
+    SEVERITY_COMPONENT_STATUS,
+)
+from .trends import backfill_trend_buckets
+from .zones import rebuild_zone_rollup
+
+# Racks per aisle; aisles are laid out in rows of this many racks
+RACKS_PER_AISLE = 40
+RACK_WIDTH, RACK_HEIGHT, RACK_SPACING = 120, 60, 20
+# Share of findings per severity, and of them that were resolved later
+SEVERITY_WEIGHTS = {SeverityLevel.GREEN: 6, SeverityLevel.AMBER: 3, SeverityLevel.RED: 1}
+RESOLVED_SHARE = 0.85
+
+
+def _bulk_create(model, objects, batch_size):
+    """bulk_create an iterable in batches without materialising all of it."""
+    objects = iter(objects)
+    created = 0
+    while True:
+        batch = list(islice(objects, batch_size))
+        if not batch:
+            return created
+        model.objects.bulk_create(batch, batch_size=batch_size)
+        created += len(batch)
+
+
+def _sample_photo():
+    """Store one small JPEG that all synthetic photos point at."""
+    from PIL import Image
+
+    output = io.BytesIO()
+    Image.new('RGB', (64, 48), (180, 180, 180)).save(output, 'JPEG')
+    return default_storage.save('inspection_photos/synthetic.jpg', ContentFile(output.getvalue()))
+
+
+def component_id(prefix, layout_number, aisle, bay, component_type):
+    """IDs follow the RK-A1-B1 scheme: rack type, aisle, bay; unique per prefix and layout."""
+    aisle_code = f'{string.ascii_uppercase[aisle % 26]}{aisle // 26 + 1}'
+    type_code = {ComponentType.RACK: 'RK', ComponentType.BEAM: 'BM', ComponentType.UPRIGHT: 'UP'}[component_type]
+    return f'{prefix}{layout_number}-{type_code}-{aisle_code}-B{bay + 1}'
+
+
+def generate_dataset(layouts=1, components=1000, inspections=5, photos=0, users=5,
+                     seed=42, prefix='SYN', batch_size=5000, history_days=3 * 365):
+    """
+    Create ``layouts`` layouts of ``components`` components each, with
+    ``inspections`` inspections per component spread over ``history_days``
+    and ``photos`` photos per inspection, by ``users`` inspectors. Component
+    statuses match their latest inspection. Returns counts and the created
+    users and layouts.
+    """
+    if users < 1:
+        raise ValueError('At least one user is needed to own the layouts')
+    if WarehouseComponent.objects.filter(id__regex=rf'^{re.escape(prefix)}[0-9]+-').exists():
+        raise ValueError(f'Components with the prefix {prefix} already exist; choose another prefix')
+
+    rng = random.Random(seed)
+    now = timezone.now()
+    severities = list(SEVERITY_WEIGHTS)
+    weights = list(SEVERITY_WEIGHTS.values())
+    tag = f'{prefix.lower()}-{seed}'
+    if User.objects.filter(username__startswith=f'{tag}-inspector-').exists():
+        raise ValueError(f'Inspectors for prefix {prefix} and seed {seed} already exist; choose another prefix')
+
+    inspectors = User.objects.bulk_create([
+        User(username=f'{tag}-inspector-{number}', email=f'{tag}-inspector-{number}@example.com')
+        for number in range(users)
+    ])
+    UserProfile.objects.bulk_create([
+        UserProfile(user=user, role='inspector', certification_number=f'{tag.upper()}-{number:04d}')
+        for number, user in enumerate(inspectors)
+    ])
+
+    created_layouts = WarehouseLayout.objects.bulk_create([
+        WarehouseLayout(name=f'Synthetic layout {number + 1} ({tag})', created_by=inspectors[0])
+        for number in range(layouts)
+    ])
+
+    photo_name = _sample_photo() if photos else None
+    counts = {'users': len(inspectors), 'layouts': len(created_layouts), 'components': 0, 'inspections': 0, 'photos': 0}
+
+    def flush(component_rows, inspection_rows):
+        # Components first: inspections reference them
+        counts['components'] += _bulk_create(WarehouseComponent, component_rows, batch_size)
+        counts['inspections'] += _bulk_create(Inspection, inspection_rows, batch_size)
+        counts['photos'] += _bulk_create(InspectionPhoto, (
+            InspectionPhoto(inspection=inspection, image=photo_name, rendition_status=RenditionStatus.DONE)
+            for inspection in inspection_rows for _ in range(photos)
+        ), batch_size)
+
+    for layout_number, layout in enumerate(created_layouts, 1):
+        component_rows = []
+        inspection_rows = []
+        for index in range(components):
+            aisle, bay = divmod(index, RACKS_PER_AISLE)
+            component_type = rng.choice(ComponentType.values)
+            identifier = component_id(prefix, layout_number, aisle, bay, component_type)
+
+            history = sorted(
+                now - timezone.timedelta(minutes=rng.randint(0, history_days * 24 * 60))
+                for _ in range(inspections)
+            )
+            status = ComponentStatus.GOOD
+            for position, inspection_date in enumerate(history):
+                severity = rng.choices(severities, weights)[0]
+                latest = position == len(history) - 1
+                inspection = Inspection(
+                    component_id=identifier,
+                    inspector=rng.choice(inspectors),
+                    defect_type=rng.choice(DefectType.values),
+                    custom_defect='Synthetic defect',
+                    severity=severity,
+                    notes='Generated for load testing',
+                    inspection_date=inspection_date,
+                    # Older findings were mostly dealt with
+                    is_resolved=not latest and rng.random() < RESOLVED_SHARE,
+                )
+                inspection.set_due_date()
+                inspection_rows.append(inspection)
+                if latest:
+                    status = SEVERITY_COMPONENT_STATUS[severity]
+
+            component_rows.append(WarehouseComponent(
+                id=identifier,
+                layout=layout,
+                component_type=component_type,
+                x_position=bay * (RACK_WIDTH + RACK_SPACING),
+                y_position=aisle * (RACK_HEIGHT + RACK_SPACING),
+                width=RACK_WIDTH,
+                height=RACK_HEIGHT,
+                status=status,
+            ))
+
+            if len(component_rows) >= batch_size or len(inspection_rows) >= batch_size:
+                flush(component_rows, inspection_rows)
+                component_rows, inspection_rows = [], []
+
+        flush(component_rows, inspection_rows)
+        # bulk_create bypasses the signals that keep the roll-up and the
+        # trend buckets current
+        rebuild_zone_rollup(layout.id)
+        backfill_trend_buckets((now - timezone.timedelta(days=history_days)).date(), now.date(), layout.id)
+
+    return {**counts, 'inspectors': inspectors, 'layouts_created': created_layouts}
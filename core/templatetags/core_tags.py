@@ -1,15 +1,12 @@
 from django import template
-from core.models import Inspection, SeverityLevel
+from core.stats import get_urgent_items_count
 
 register = template.Library()
 
 @register.simple_tag
-def urgent_items_count():
+def urgent_items_count(layout=None):
     """Return count of urgent inspection items (red and amber severity)."""
-    return Inspection.objects.filter(
-        severity__in=[SeverityLevel.RED, SeverityLevel.AMBER],
-        is_resolved=False
-    ).count()
+    return get_urgent_items_count(getattr(layout, 'pk', layout))
 
 @register.filter
 def get_item(dictionary, key):
@@ -45,6 +42,17 @@ def status_color(status):
     }
     return color_map.get(status, 'text-neutral-500')
 
+@register.filter
+def status_background(status):
+    """Return CSS background class for a zone tile of the given worst status."""
+    background_map = {
+        'good': 'bg-success/10',
+        'monitor': 'bg-success/10',
+        'fix_4_weeks': 'bg-warning/10',
+        'immediate': 'bg-danger/10'
+    }
+    return background_map.get(status, 'bg-neutral-50')
+
 @register.filter
 def format_defect_type(defect_type):
     """Format defect type for display."""
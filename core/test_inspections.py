@@ -0,0 +1,43 @@
+from .models import ComponentStatus, DefectType, Inspection, SeverityLevel, WarehouseComponent, ZoneRollup
+from .tests import LayoutTestCase, _component
+
+
+class InspectionComponentStatusTests(LayoutTestCase):
+    def inspect(self, component, severity):
+        return Inspection.objects.create(
+            component=component, inspector=self.user, defect_type=DefectType.CORROSION, severity=severity,
+        )
+
+    def test_status_change_is_written_and_counted(self):
+        layout = self.create_layout([_component('RK-A1-B1')])
+
+        inspection = self.inspect(layout.components.get(), SeverityLevel.RED)
+
+        layout.refresh_from_db()
+        self.assertEqual(WarehouseComponent.objects.get().status, ComponentStatus.IMMEDIATE)
+        self.assertEqual(inspection._previous_component_status, ComponentStatus.GOOD)
+        self.assertEqual(ZoneRollup.objects.get(layout=layout, zone='A1').immediate, 1)
+
+    def test_unchanged_status_is_not_written(self):
+        layout = self.create_layout([_component('RK-A1-B1')])
+        self.inspect(layout.components.get(), SeverityLevel.RED)
+        layout.refresh_from_db()
+        revision = layout.revision
+
+        inspection = self.inspect(layout.components.get(), SeverityLevel.RED)
+
+        layout.refresh_from_db()
+        self.assertFalse(inspection._component_status_changed)
+        self.assertEqual(layout.revision, revision)
+
+    def test_stale_cached_component_does_not_skip_the_update(self):
+        layout = self.create_layout([_component('RK-A1-B1')])
+        component = layout.components.get()
+        # Another request moved the component on since it was loaded
+        WarehouseComponent.objects.filter(pk=component.pk).update(status=ComponentStatus.IMMEDIATE)
+        component.status = ComponentStatus.MONITOR
+
+        inspection = self.inspect(component, SeverityLevel.GREEN)
+
+        self.assertTrue(inspection._component_status_changed)
+        self.assertEqual(WarehouseComponent.objects.get().status, ComponentStatus.MONITOR)
@@ -0,0 +1,61 @@
+from .models import ComponentStatus, WarehouseComponent
+from .tests import LayoutTestCase, _component
+
+
+class SaveLayoutTests(LayoutTestCase):
+    def test_full_component_set_is_diffed(self):
+        layout = self.create_layout([_component('RK-A1-B1'), _component('RK-A1-B2', x=20)])
+        WarehouseComponent.objects.filter(pk='RK-A1-B2').update(status=ComponentStatus.MONITOR)
+
+        result = self.save_layout(
+            layout_id=str(layout.id),
+            components=[_component('RK-A1-B2', x=30), _component('RK-A1-B3', x=40)],
+        )
+
+        self.assertEqual((result['created'], result['updated'], result['deleted']), (1, 1, 1))
+        components = {component.id: component for component in layout.components.all()}
+        self.assertEqual(sorted(components), ['RK-A1-B2', 'RK-A1-B3'])
+        self.assertEqual(components['RK-A1-B2'].x_position, 30)
+        # Updated in place, so the status (and history) of the row survives
+        self.assertEqual(components['RK-A1-B2'].status, ComponentStatus.MONITOR)
+
+    def test_unchanged_components_are_not_written(self):
+        layout = self.create_layout([_component('RK-A1-B1')])
+
+        result = self.save_layout(layout_id=str(layout.id), components=[_component('RK-A1-B1')])
+
+        self.assertEqual((result['created'], result['updated'], result['deleted']), (0, 0, 0))
+        self.assertEqual(layout.versions.count(), 1)
+
+    def test_changes_are_applied(self):
+        layout = self.create_layout([_component('RK-A1-B1'), _component('RK-A1-B2')])
+
+        result = self.save_layout(
+            layout_id=str(layout.id),
+            added=[_component('RK-A2-B1')],
+            updated=[{'id': 'RK-A1-B1', 'width': 15}],
+            removed=['RK-A1-B2'],
+        )
+
+        self.assertEqual((result['created'], result['updated'], result['deleted']), (1, 1, 1))
+        self.assertEqual(
+            sorted(layout.components.values_list('id', 'width')), [('RK-A1-B1', 15), ('RK-A2-B1', 10)]
+        )
+
+    def test_status_from_a_stale_editor_is_ignored(self):
+        layout = self.create_layout([_component('RK-A1-B1'), _component('RK-A1-B2')])
+        WarehouseComponent.objects.update(status=ComponentStatus.IMMEDIATE)
+
+        self.save_layout(
+            layout_id=str(layout.id),
+            components=[{**_component('RK-A1-B1'), 'status': ComponentStatus.GOOD}, _component('RK-A1-B2')],
+        )
+        result = self.save_layout(
+            layout_id=str(layout.id),
+            updated=[{**_component('RK-A1-B2', x=5), 'status': ComponentStatus.GOOD}],
+        )
+
+        self.assertEqual(result['updated'], 1)
+        self.assertEqual(
+            list(layout.components.values_list('status', flat=True)), [ComponentStatus.IMMEDIATE] * 2
+        )
@@ -0,0 +1,27 @@
+from django.urls import reverse
+
+from .tests import LayoutTestCase, _component
+
+
+class LayoutComponentQueryTests(LayoutTestCase):
+    def setUp(self):
+        super().setUp()
+        self.layout = self.create_layout([_component('RK-A1-B1', x=0, y=0), _component('RK-A1-B2', x=50, y=0)])
+
+    def get(self, name, **params):
+        return self.client.get(reverse(name, args=[self.layout.id]), params)
+
+    def test_viewport_returns_intersecting_components(self):
+        response = self.get('layout_components', bbox='-5,-5,20,20')
+
+        self.assertEqual([component['id'] for component in response.json()['components']], ['RK-A1-B1'])
+
+    def test_non_finite_numbers_are_rejected(self):
+        for value in ('nan', 'inf', '-inf', 'NaN'):
+            with self.subTest(value=value):
+                self.assertEqual(self.get('layout_components', bbox=f'0,0,{value},10').status_code, 400)
+                self.assertEqual(self.get('layout_components_at', point=f'{value},5').status_code, 400)
+                self.assertEqual(self.get('layout_components_in_rect', rect=f'0,{value},10,10').status_code, 400)
+                self.assertEqual(
+                    self.get('layout_components_near', point='5,5', radius=value).status_code, 400
+                )
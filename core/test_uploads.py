@@ -0,0 +1,95 @@
+import hashlib
+import io
+import json
+import shutil
+import tempfile
+
+from django.test import override_settings
+from django.urls import reverse
+
+from .models import DefectType, Inspection, PhotoUpload, SeverityLevel
+from .tests import LayoutTestCase, _component
+
+
+class PhotoUploadTests(LayoutTestCase):
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root))
+
+        layout = self.create_layout([_component('RK-A1-B1')])
+        self.inspection = Inspection.objects.create(
+            component=layout.components.get(),
+            inspector=self.user,
+            defect_type=DefectType.CORROSION,
+            severity=SeverityLevel.GREEN,
+        )
+
+    def image(self):
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 48), 'orange').save(buffer, 'PNG')
+        return buffer.getvalue()
+
+    def start(self, data):
+        response = self.client.post(
+            reverse('start_photo_upload', args=[self.inspection.id]),
+            json.dumps({'filename': 'rack.png', 'size': len(data), 'checksum': hashlib.sha256(data).hexdigest()}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.json()['upload_id']
+
+    def put(self, upload_id, data, start, end):
+        return self.client.put(
+            reverse('photo_upload', args=[upload_id]),
+            data[start:end],
+            content_type='application/octet-stream',
+            headers={'content-range': f'bytes {start}-{end - 1}/{len(data)}'},
+        )
+
+    def test_upload_resumes_from_received_offset(self):
+        data = self.image()
+        upload_id = self.start(data)
+        half = len(data) // 2
+
+        self.assertEqual(self.put(upload_id, data, 0, half).json()['received'], half)
+        # A retried chunk overlapping received bytes only adds its new bytes
+        self.assertEqual(self.put(upload_id, data, half - 10, half + 10).json()['received'], half + 10)
+        # Chunks may not skip ahead of what was received
+        self.assertEqual(self.put(upload_id, data, half + 20, len(data)).status_code, 409)
+
+        state = self.client.get(reverse('photo_upload', args=[upload_id])).json()
+        self.put(upload_id, data, state['received'], len(data))
+
+        response = self.client.post(reverse('complete_photo_upload', args=[upload_id]))
+
+        self.assertTrue(response.json()['success'])
+        photo = self.inspection.photos.get()
+        with photo.image.open('rb') as f:
+            self.assertEqual(f.read(), data)
+
+    def test_complete_rejects_checksum_mismatch(self):
+        data = self.image()
+        upload_id = self.start(data)
+        corrupted = bytes([data[0] ^ 0xFF]) + data[1:]
+        self.put(upload_id, corrupted, 0, len(corrupted))
+
+        response = self.client.post(reverse('complete_photo_upload', args=[upload_id]))
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(PhotoUpload.objects.get(pk=upload_id).received, 0)
+        self.assertFalse(self.inspection.photos.exists())
+
+    def test_complete_deletes_upload_that_is_not_an_image(self):
+        data = b'not an image at all'
+        upload_id = self.start(data)
+        self.put(upload_id, data, 0, len(data))
+
+        response = self.client.post(reverse('complete_photo_upload', args=[upload_id]))
+
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(PhotoUpload.objects.filter(pk=upload_id).exists())
+        self.assertFalse(self.inspection.photos.exists())
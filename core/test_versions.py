@@ -0,0 +1,56 @@
+from django.test import override_settings
+from django.urls import reverse
+
+from .models import ComponentType, LayoutVersion
+from .tests import LayoutTestCase, _component
+from .versions import materialize_layout_version
+
+
+class LayoutVersionTests(LayoutTestCase):
+    def test_materialise_replays_deltas(self):
+        layout = self.create_layout([_component('RK-A1-B1'), _component('RK-A1-B2')])
+        self.save_layout(layout_id=str(layout.id), updated=[{'id': 'RK-A1-B1', 'x': 5}])
+        self.save_layout(layout_id=str(layout.id), removed=['RK-A1-B2'], added=[_component('RK-A1-B3')])
+
+        self.assertEqual(sorted(materialize_layout_version(layout.id, 1)), ['RK-A1-B1', 'RK-A1-B2'])
+        self.assertEqual(materialize_layout_version(layout.id, 2)['RK-A1-B1'], [ComponentType.RACK, 5, 0, 10, 10])
+        self.assertEqual(sorted(materialize_layout_version(layout.id, 3)), ['RK-A1-B1', 'RK-A1-B3'])
+        with self.assertRaises(LayoutVersion.DoesNotExist):
+            materialize_layout_version(layout.id, 4)
+
+    @override_settings(LAYOUT_VERSION_SNAPSHOT_INTERVAL=2)
+    def test_materialise_starts_from_nearest_snapshot(self):
+        layout = self.create_layout([_component('RK-A1-B1')])
+        for x in (1, 2, 3):
+            self.save_layout(layout_id=str(layout.id), updated=[{'id': 'RK-A1-B1', 'x': x}])
+
+        self.assertEqual(
+            list(layout.versions.order_by('number').values_list('is_snapshot', flat=True)),
+            [True, False, True, False],
+        )
+        self.assertEqual(materialize_layout_version(layout.id, 4)['RK-A1-B1'][1], 3)
+
+    def test_restore_applies_differences_as_new_version(self):
+        layout = self.create_layout([_component('RK-A1-B1'), _component('RK-A1-B2')])
+        self.save_layout(
+            layout_id=str(layout.id),
+            updated=[{'id': 'RK-A1-B1', 'x': 5}],
+            removed=['RK-A1-B2'],
+        )
+
+        response = self.client.post(reverse('restore_layout_version', args=[layout.id, 1]))
+
+        result = response.json()
+        self.assertTrue(result['success'])
+        self.assertEqual((result['created'], result['updated'], result['deleted']), (1, 1, 0))
+        self.assertEqual(
+            sorted(layout.components.values_list('id', 'x_position')), [('RK-A1-B1', 0), ('RK-A1-B2', 0)]
+        )
+        self.assertEqual(layout.versions.count(), 3)
+
+    def test_restore_unknown_version_is_404(self):
+        layout = self.create_layout([_component('RK-A1-B1')])
+
+        response = self.client.post(reverse('restore_layout_version', args=[layout.id, 9]))
+
+        self.assertEqual(response.status_code, 404)
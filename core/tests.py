@@ -0,0 +1,240 @@
+import json
+import uuid
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from .models import (
+    ComponentStatus, ComponentType, DefectType, Inspection, Notification,
+    SeverityLevel, WarehouseComponent, WarehouseLayout, ZoneRollup,
+)
+from .notifications import schedule_notifications
+from .profiling import ProfilingMiddleware, QueryBudgetExceeded
+from .stats import get_dashboard_stats, get_urgent_items_count
+from .zones import rebuild_zone_rollup
+
+
+def _component(component_id, x=0, y=0, width=10, height=10):
+    return {'id': component_id, 'type': ComponentType.RACK, 'x': x, 'y': y, 'width': width, 'height': height}
+
+
+@override_settings(PROFILING_ENFORCE_BUDGETS=True, PROFILING_SERVER_TIMING=False)
+class QueryBudgetTests(TestCase):
+    def request(self, budget):
+        request = RequestFactory().get('/')
+        request._query_budget = budget
+        return request
+
+    def test_view_over_budget_fails(self):
+        def view(request):
+            User.objects.count()
+            User.objects.count()
+            return HttpResponse()
+
+        with self.assertRaises(QueryBudgetExceeded):
+            ProfilingMiddleware(view)(self.request(1))
+
+    def test_view_within_budget_passes(self):
+        def view(request):
+            User.objects.count()
+            return HttpResponse()
+
+        self.assertEqual(ProfilingMiddleware(view)(self.request(1)).status_code, 200)
+
+    def test_streamed_queries_count_towards_budget(self):
+        def content():
+            for _ in range(3):
+                yield str(User.objects.count())
+
+        response = ProfilingMiddleware(lambda request: StreamingHttpResponse(content()))(self.request(2))
+        with self.assertRaises(QueryBudgetExceeded):
+            b''.join(response.streaming_content)
+
+
+# Every request made by a view test fails when it goes over its view's query budget
+@override_settings(PROFILING_ENFORCE_BUDGETS=True)
+class LayoutTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('inspector', password='secret')
+        self.client.force_login(self.user)
+
+    def save_layout(self, **data):
+        response = self.client.post(reverse('save_layout'), json.dumps(data), content_type='application/json')
+        self.assertTrue(response.json()['success'], response.json().get('error'))
+        return response.json()
+
+    def create_layout(self, components):
+        result = self.save_layout(components=components)
+        return WarehouseLayout.objects.get(pk=result['layout_id'])
+
+
+class DashboardTests(LayoutTestCase):
+    def test_invalid_layout_is_rejected(self):
+        response = self.client.get(reverse('dashboard'), {'layout': 'not-a-uuid'})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_dashboard_reads_rollups_within_budget(self):
+        self.create_layout([_component('RK-A1-B1')])
+        WarehouseLayout.objects.create(name='Empty', created_by=self.user)
+        cache.clear()
+
+        # Budgets are enforced, so a rebuild on the read path fails the request
+        self.assertEqual(self.client.get(reverse('dashboard')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('dashboard')).context['total_components'], 1)
+
+    def test_layout_dashboard_shows_aisle_tiles(self):
+        layout = self.create_layout([_component('RK-A1-B1'), _component('RK-A2-B1')])
+        component = WarehouseComponent.objects.get(pk='RK-A1-B1')
+        component.status = ComponentStatus.IMMEDIATE
+        component.save()
+
+        for headers in ({}, {'HX-Request': 'true'}):
+            response = self.client.get(reverse('dashboard'), {'layout': str(layout.id)}, headers=headers)
+
+            self.assertEqual(response.status_code, 200)
+            self.assertContains(response, 'data-testid="tile-zone-A1"')
+            self.assertContains(response, 'data-testid="tile-zone-A2"')
+            self.assertContains(response, 'bg-danger/10')
+
+    def test_layout_dashboard_without_zones(self):
+        layout = self.create_layout([_component('DOOR')])
+
+        response = self.client.get(reverse('dashboard'), {'layout': str(layout.id)})
+
+        self.assertContains(response, 'data-testid="text-no-zones"')
+
+
+
+class LayoutRevisionTests(LayoutTestCase):
+    def test_deleting_component_bumps_revision(self):
+        layout = self.create_layout([_component('RK-A1-B1')])
+        revision, updated_at = layout.revision, layout.updated_at
+
+        WarehouseComponent.objects.get(pk='RK-A1-B1').delete()
+
+        layout.refresh_from_db()
+        self.assertGreater(layout.revision, revision)
+        self.assertEqual(layout.updated_at, updated_at)
+
+
+class InspectionBatchTests(LayoutTestCase):
+    def post_batch(self, inspections):
+        return self.client.post(
+            reverse('create_inspections_batch'), json.dumps({'inspections': inspections}),
+            content_type='application/json',
+        )
+
+    def test_inspections_must_be_a_list(self):
+        self.assertEqual(self.post_batch({'id': 'x'}).status_code, 400)
+
+    def test_overlong_fields_are_rejected_per_item(self):
+        self.create_layout([_component('RK-A1-B1')])
+        item = {
+            'component_id': 'RK-A1-B1', 'defect_type': DefectType.CUSTOM, 'severity': SeverityLevel.GREEN,
+        }
+
+        results = self.post_batch([
+            {**item, 'id': str(uuid.uuid4()), 'custom_defect': 'x' * 256},
+            {**item, 'id': str(uuid.uuid4()), 'notes': ['not', 'text']},
+            {**item, 'id': str(uuid.uuid4()), 'custom_defect': 'Cracked base plate'},
+        ]).json()['results']
+
+        self.assertEqual([result['status'] for result in results], ['error', 'error', 'created'])
+        self.assertEqual(Inspection.objects.get().custom_defect, 'Cracked base plate')
+
+
+class ScheduleNotificationsTests(LayoutTestCase):
+    def test_red_overdue_inspection_gets_both_notices_once(self):
+        layout = self.create_layout([_component('RK-A1-B1')])
+        today = date(2026, 3, 2)
+        Inspection.objects.create(
+            component=layout.components.get(),
+            inspector=self.user,
+            defect_type=DefectType.BENT_UPRIGHT,
+            severity=SeverityLevel.RED,
+            due_date=today - timedelta(days=1),
+        )
+
+        self.assertEqual(schedule_notifications(today), 2)
+        self.assertEqual(
+            sorted(Notification.objects.values_list('notification_type', flat=True)), ['overdue', 'red_alert']
+        )
+        self.assertEqual(schedule_notifications(today), 0)
+
+
+class UrgentItemsCountTests(LayoutTestCase):
+    def test_counter_follows_committed_creates_and_deletes(self):
+        layout = self.create_layout([_component('RK-A1-B1')])
+        self.assertEqual(get_urgent_items_count(layout.id), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            inspection = Inspection.objects.create(
+                component=layout.components.get(),
+                inspector=self.user,
+                defect_type=DefectType.BENT_UPRIGHT,
+                severity=SeverityLevel.RED,
+            )
+        self.assertEqual(get_urgent_items_count(layout.id), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Inspection.objects.get(pk=inspection.pk).delete()
+        self.assertEqual(get_urgent_items_count(layout.id), 0)
+
+
+class ZoneRollupTests(LayoutTestCase):
+    def counts(self, layout):
+        return {
+            row.zone: (row.parent, row.good, row.monitor, row.fix_4_weeks, row.immediate)
+            for row in ZoneRollup.objects.filter(layout=layout)
+        }
+
+    def test_layout_changes_adjust_rollup_in_place(self):
+        layout = self.create_layout([_component('RK-A1-B1'), _component('RK-A1-B2'), _component('RK-A2-B1')])
+        Inspection.objects.create(
+            component=layout.components.get(pk='RK-A1-B1'),
+            inspector=self.user,
+            defect_type=DefectType.BENT_UPRIGHT,
+            severity=SeverityLevel.RED,
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.save_layout(
+                layout_id=str(layout.id),
+                added=[_component('RK-A3-B1')],
+                removed=['RK-A2-B1'],
+            )
+
+        counts = self.counts(layout)
+        self.assertEqual(counts[''], (None, 2, 0, 0, 1))
+        self.assertEqual(counts['A1-B1'], ('A1', 0, 0, 0, 1))
+        self.assertEqual(counts['A3-B1'], ('A3', 1, 0, 0, 0))
+        self.assertNotIn('A2', counts)
+        rebuild_zone_rollup(layout.id)
+        self.assertEqual(self.counts(layout), counts)
+
+    def test_component_deleted_through_orm_leaves_rollup(self):
+        layout = self.create_layout([_component('RK-A1-B1'), _component('RK-A1-B2'), _component('RK-A1-B3')])
+        self.assertEqual(get_dashboard_stats(layout.id)['total_components'], 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            WarehouseComponent.objects.get(pk='RK-A1-B3').delete()
+
+        counts = self.counts(layout)
+        self.assertEqual(counts['A1'], ('', 2, 0, 0, 0))
+        self.assertNotIn('A1-B3', counts)
+        self.assertEqual(get_dashboard_stats(layout.id)['total_components'], 2)
+
+    def test_saved_component_moves_between_columns(self):
+        layout = self.create_layout([_component('RK-A1-B1')])
+
+        component = WarehouseComponent.objects.get(pk='RK-A1-B1')
+        component.status = ComponentStatus.MONITOR
+        component.save()
+
+        self.assertEqual(self.counts(layout)['A1'], ('', 0, 1, 0, 0))
+
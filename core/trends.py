@@ -0,0 +1,333 @@
+"""
+Inspection trend analytics over pre-aggregated buckets.
+
+Every inspection counts towards one InspectionBucket per granularity (day,
+and week starting Monday), keyed by layout, defect type and severity and
+placed by its inspection date in the local time zone. Saves keep the buckets
+current incrementally (see the Inspection post_save receiver and
+create_inspections); backfill_trend_buckets recomputes a date range from the
+inspections, e.g. after components and their history were deleted.
+
+Trend queries read only buckets, a few thousand rows even for years of
+weekly history, and compute moving averages and resolution-time
+percentiles over them with NumPy.
+"""
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, DateField, DurationField, ExpressionWrapper, F, Q
+from django.db.models.functions import TruncDay, TruncWeek
+from django.utils import timezone
+
+from .models import Inspection, InspectionBucket, TrendGranularity
+
+# Upper edges, in hours, of the resolution-time histogram bins; the last bin
+# holds everything from a year on
+RESOLUTION_BIN_EDGES = (1, 4, 8, 24, 48, 72, 168, 336, 672, 1008, 1344, 2160, 4320, 8760)
+RESOLUTION_BINS = len(RESOLUTION_BIN_EDGES) + 1
+
+GROUP_FIELDS = {
+    'defect_type': 'defect_type',
+    'severity': 'severity',
+    'layout': 'layout_id',
+}
+DEFAULT_PERCENTILES = (50, 90, 95)
+# Most periods one trend query may span: ten years of days, twenty of weeks
+MAX_PERIODS = {
+    TrendGranularity.DAY: 3660,
+    TrendGranularity.WEEK: 1044,
+}
+
+
+def bucket_start(granularity, moment):
+    """The first day of the bucket an aware datetime falls into."""
+    day = timezone.localtime(moment).date()
+    if granularity == TrendGranularity.WEEK:
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def period_count(granularity, date_from, date_to):
+    """Number of day or week periods a trend query from date_from to date_to spans."""
+    if granularity == TrendGranularity.WEEK:
+        date_from -= timedelta(days=date_from.weekday())
+        return (date_to - date_from).days // 7 + 1
+    return (date_to - date_from).days + 1
+
+
+def resolution_bin(hours):
+    return bisect_right(RESOLUTION_BIN_EDGES, hours)
+
+
+def _add_state(deltas, layout_id, state, sign):
+    inspection_date, defect_type, severity, resolution_hours = state
+    for granularity in TrendGranularity.values:
+        key = (granularity, bucket_start(granularity, inspection_date), layout_id, defect_type, severity)
+        delta = deltas[key]
+        delta['inspections'] += sign
+        if resolution_hours is not None:
+            delta['resolved'] += sign
+            delta['bins'][resolution_bin(resolution_hours)] += sign
+
+
+def _new_deltas():
+    return defaultdict(lambda: {'inspections': 0, 'resolved': 0, 'bins': defaultdict(int)})
+
+
+def _apply_deltas(deltas, create=True):
+    """
+    Add counts to their buckets, each row locked while it is changed.
+    Without ``create``, missing buckets are skipped rather than created.
+    """
+    for key in sorted(deltas):
+        delta = deltas[key]
+        if not (delta['inspections'] or delta['resolved'] or any(delta['bins'].values())):
+            continue
+        granularity, start, layout_id, defect_type, severity = key
+        lookup = {
+            'granularity': granularity, 'start': start, 'layout_id': layout_id,
+            'defect_type': defect_type, 'severity': severity,
+        }
+        buckets = InspectionBucket.objects.select_for_update()
+        if create:
+            bucket, _ = buckets.get_or_create(**lookup, defaults={'resolution_histogram': [0] * RESOLUTION_BINS})
+        else:
+            bucket = buckets.filter(**lookup).first()
+            if bucket is None:
+                continue
+        histogram = bucket.resolution_histogram or [0] * RESOLUTION_BINS
+        for index, count in delta['bins'].items():
+            histogram[index] += count
+        bucket.inspections += delta['inspections']
+        bucket.resolved += delta['resolved']
+        bucket.resolution_histogram = histogram
+        bucket.save(update_fields=['inspections', 'resolved', 'resolution_histogram'])
+
+
+def record_trend_change(layout_id, previous_state, state):
+    """
+    Move one inspection between buckets: ``previous_state`` and ``state``
+    are Inspection.trend_state() values, None when it did not exist. Run it
+    in the transaction that saved or deleted the inspection.
+    """
+    deltas = _new_deltas()
+    if previous_state is not None:
+        _add_state(deltas, layout_id, previous_state, -1)
+    if state is not None:
+        _add_state(deltas, layout_id, state, 1)
+    # A deletion never needs a new bucket, and must not create one for a
+    # layout that the same cascade is deleting
+    _apply_deltas(deltas, create=state is not None)
+
+
+def record_new_inspections(inspections, layout_ids):
+    """Count newly created inspections; ``layout_ids`` maps component to layout IDs."""
+    deltas = _new_deltas()
+    for inspection in inspections:
+        _add_state(deltas, layout_ids[inspection.component_id], inspection.trend_state(), 1)
+    _apply_deltas(deltas)
+
+
+def backfill_trend_buckets(date_from, date_to, layout_id=None, batch_size=1000):
+    """
+    Recompute the buckets of the weeks overlapping [date_from, date_to] from
+    the inspections, with one GROUP BY query per granularity. Returns the
+    number of buckets written.
+    """
+    date_from -= timedelta(days=date_from.weekday())
+    date_to += timedelta(days=6 - date_to.weekday())
+    start = timezone.make_aware(datetime.combine(date_from, time.min))
+    end = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min))
+
+    inspections = Inspection.objects.filter(inspection_date__gte=start, inspection_date__lt=end)
+    buckets = InspectionBucket.objects.filter(start__gte=date_from, start__lte=date_to)
+    if layout_id:
+        inspections = inspections.filter(component__layout_id=layout_id)
+        buckets = buckets.filter(layout_id=layout_id)
+
+    resolved = Q(is_resolved=True, resolved_date__isnull=False)
+    # No lower edge on the first bin: inspections resolved before they were
+    # recorded count as resolved instantly, as in Inspection.trend_state
+    lower_edges = (None, *RESOLUTION_BIN_EDGES)
+    upper_edges = (*RESOLUTION_BIN_EDGES, None)
+    bin_counts = {}
+    for index, (lower, upper) in enumerate(zip(lower_edges, upper_edges)):
+        condition = resolved
+        if lower is not None:
+            condition &= Q(resolution__gte=timedelta(hours=lower))
+        if upper is not None:
+            condition &= Q(resolution__lt=timedelta(hours=upper))
+        bin_counts[f'bin_{index}'] = Count('id', filter=condition)
+
+    truncations = {
+        TrendGranularity.DAY: TruncDay('inspection_date', output_field=DateField()),
+        TrendGranularity.WEEK: TruncWeek('inspection_date', output_field=DateField()),
+    }
+
+    written = 0
+    with transaction.atomic():
+        buckets.delete()
+        for granularity, truncation in truncations.items():
+            rows = (
+                inspections
+                .annotate(
+                    bucket_start=truncation,
+                    resolution=ExpressionWrapper(
+                        F('resolved_date') - F('inspection_date'), output_field=DurationField()
+                    ),
+                )
+                .values('bucket_start', 'component__layout_id', 'defect_type', 'severity')
+                .annotate(inspections=Count('id'), resolved=Count('id', filter=resolved), **bin_counts)
+                .order_by()
+            )
+            batch = []
+            for row in rows.iterator():
+                batch.append(InspectionBucket(
+                    granularity=granularity,
+                    start=row['bucket_start'],
+                    layout_id=row['component__layout_id'],
+                    defect_type=row['defect_type'],
+                    severity=row['severity'],
+                    inspections=row['inspections'],
+                    resolved=row['resolved'],
+                    resolution_histogram=[
+                        row[f'bin_{index}'] for index in range(RESOLUTION_BINS)
+                    ],
+                ))
+                if len(batch) >= batch_size:
+                    written += len(InspectionBucket.objects.bulk_create(batch))
+                    batch = []
+            written += len(InspectionBucket.objects.bulk_create(batch))
+    return written
+
+
+def histogram_percentiles(histograms, percentiles):
+    """
+    Percentiles of the resolution times summarised by each row of a
+    (rows, RESOLUTION_BINS) histogram array, interpolated linearly within
+    bins. Returns a (len(percentiles), rows) array; NaN for empty rows.
+    """
+    import numpy as np
+
+    histograms = np.asarray(histograms, dtype=float)
+    cumulative = np.cumsum(histograms, axis=1)
+    totals = cumulative[:, -1]
+    lower = np.array((0, *RESOLUTION_BIN_EDGES), dtype=float)
+    # The open last bin is treated as one more year wide
+    upper = np.array((*RESOLUTION_BIN_EDGES, RESOLUTION_BIN_EDGES[-1] * 2), dtype=float)
+
+    results = np.full((len(percentiles), len(histograms)), np.nan)
+    rows = np.arange(len(histograms))
+    for position, percentile in enumerate(percentiles):
+        target = totals * percentile / 100
+        # First bin whose cumulative count reaches the target
+        index = np.minimum((cumulative < target[:, None]).sum(axis=1), RESOLUTION_BINS - 1)
+        before = np.where(index > 0, cumulative[rows, index - 1], 0)
+        in_bin = histograms[rows, index]
+        fraction = np.divide(target - before, in_bin, out=np.zeros_like(target), where=in_bin > 0)
+        values = lower[index] + fraction * (upper[index] - lower[index])
+        results[position] = np.where(totals > 0, values, np.nan)
+    return results
+
+
+def moving_average(values, window):
+    """Trailing moving average over the last ``window`` periods of each row."""
+    import numpy as np
+
+    values = np.asarray(values, dtype=float)
+    cumulative = np.cumsum(values, axis=-1)
+    shifted = np.zeros_like(cumulative)
+    shifted[..., window:] = cumulative[..., :-window]
+    counts = np.minimum(np.arange(1, values.shape[-1] + 1), window)
+    return (cumulative - shifted) / counts
+
+
+def _rounded(array):
+    """A NumPy array as a JSON-friendly list, NaN as None."""
+    import numpy as np
+
+    return [None if np.isnan(value) else round(float(value), 2) for value in array]
+
+
+def inspection_trends(granularity, date_from, date_to, layout_id=None, group_by=None,
+                      window=4, percentiles=DEFAULT_PERCENTILES):
+    """
+    Inspection counts per period between two dates from the buckets, in
+    total and per ``group_by`` value (see GROUP_FIELDS), with their trailing
+    moving averages and resolution-time percentiles in hours. Raises
+    ValueError when the range spans more than MAX_PERIODS[granularity].
+    """
+    import numpy as np
+
+    if period_count(granularity, date_from, date_to) > MAX_PERIODS[granularity]:
+        raise ValueError(f'At most {MAX_PERIODS[granularity]} periods per {granularity}')
+
+    first = bucket_start(granularity, timezone.make_aware(datetime.combine(date_from, time.min)))
+    step = 7 if granularity == TrendGranularity.WEEK else 1
+    periods = [first + timedelta(days=offset) for offset in range(0, (date_to - first).days + 1, step)]
+    period_index = {start: index for index, start in enumerate(periods)}
+
+    buckets = InspectionBucket.objects.filter(granularity=granularity, start__gte=first, start__lte=date_to)
+    if layout_id:
+        buckets = buckets.filter(layout_id=layout_id)
+    group_field = GROUP_FIELDS.get(group_by)
+    rows = list(buckets.order_by().values_list(
+        'start', group_field or 'granularity', 'inspections', 'resolved', 'resolution_histogram'
+    ))
+
+    group_keys = sorted({str(row[1]) for row in rows}) if group_field else []
+    group_index = {key: index for index, key in enumerate(group_keys)}
+
+    # (groups, periods) counts and (groups, periods, bins) histograms; group
+    # -1 is the total
+    shape = (len(group_keys) + 1, len(periods))
+    inspections = np.zeros(shape)
+    resolved = np.zeros(shape)
+    histograms = np.zeros((*shape, RESOLUTION_BINS))
+    if rows:
+        period_column = np.array([period_index[row[0]] for row in rows])
+        group_column = np.array([group_index.get(str(row[1]), 0) for row in rows])
+        inspection_column = np.array([row[2] for row in rows], dtype=float)
+        resolved_column = np.array([row[3] for row in rows], dtype=float)
+        histogram_rows = np.array([row[4] or [0] * RESOLUTION_BINS for row in rows], dtype=float)
+
+        targets = [np.full(len(rows), -1)]
+        if group_field:
+            targets.append(group_column)
+        for target in targets:
+            np.add.at(inspections, (target, period_column), inspection_column)
+            np.add.at(resolved, (target, period_column), resolved_column)
+            np.add.at(histograms, (target, period_column), histogram_rows)
+
+    averages = moving_average(inspections, window)
+    overall_percentiles = histogram_percentiles(histograms.sum(axis=1), percentiles)
+    total_by_period = histogram_percentiles(histograms[-1], percentiles)
+
+    def series(index):
+        resolution_hours = _rounded(overall_percentiles[:, index])
+        return {
+            'inspections': inspections[index].astype(int).tolist(),
+            'resolved': resolved[index].astype(int).tolist(),
+            'moving_average': _rounded(averages[index]),
+            'resolution_hours': {
+                f'p{percentile}': resolution_hours[position]
+                for position, percentile in enumerate(percentiles)
+            },
+        }
+
+    return {
+        'granularity': granularity,
+        'periods': [start.isoformat() for start in periods],
+        'window': window,
+        'group_by': group_field and group_by,
+        'total': {
+            **series(-1),
+            'resolution_hours_by_period': {
+                f'p{percentile}': _rounded(total_by_period[position])
+                for position, percentile in enumerate(percentiles)
+            },
+        },
+        'groups': {key: series(index) for key, index in group_index.items()},
+    }
@@ -0,0 +1,196 @@
+"""
+Chunked, resumable photo uploads.
+
+A client opens an upload with the file's size and SHA-256, then PUTs the
+bytes in order with ``Content-Range: bytes start-end/total`` headers. Each
+chunk is streamed from the request to disk and appended to a part file
+under MEDIA_ROOT, so no upload is ever held in memory. After a dropped
+connection the client asks for the upload's ``received`` offset and carries
+on from there. Completing the upload verifies the size and checksum, moves the part
+file into photo storage and attaches it to the inspection.
+"""
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .models import InspectionPhoto, PhotoUpload
+
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+# Size of the reads used to stream chunks to disk and to hash part files
+COPY_BUFFER_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """A chunk or completion that cannot be applied, with its HTTP status."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class _PartFile(File):
+    """A finished part file, which FileSystemStorage moves instead of copying."""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def part_path(upload):
+    return os.path.join(settings.MEDIA_ROOT, settings.PHOTO_UPLOAD_DIR, f'{upload.id}.part')
+
+
+def parse_content_range(header):
+    """Parse a Content-Range header into (start, end, total), end exclusive."""
+    match = CONTENT_RANGE_RE.match(header or '')
+    if match is None:
+        raise UploadError('Content-Range header must look like "bytes start-end/total"')
+
+    start, last, total = (int(value) for value in match.groups())
+    if last < start or last >= total:
+        raise UploadError(f'Invalid range {header!r}', status=416)
+    return start, last + 1, total
+
+
+def _check_chunk(upload, start, total):
+    if upload.is_complete:
+        raise UploadError('Upload is already complete', status=409)
+    if total != upload.size:
+        raise UploadError(f'Upload size is {upload.size} bytes, not {total}')
+    if start > upload.received:
+        raise UploadError(f'Next chunk must start at byte {upload.received}', status=409)
+
+
+def append_chunk(upload_id, stream, start, end, total):
+    """
+    Append the bytes ``start``..``end`` read from ``stream`` to an upload.
+
+    Chunks must arrive in order. A chunk that overlaps data already received
+    (a retry after a lost response) only contributes its new bytes. If the
+    stream ends early, whatever arrived is kept, so the returned upload's
+    ``received`` may be short of ``end``.
+
+    The request is read into a chunk file of its own before the upload row
+    is locked, so a slow client never holds the lock; under the lock the
+    chunk is only checked again and copied onto the part file.
+    """
+    upload = PhotoUpload.objects.get(pk=upload_id)
+    _check_chunk(upload, start, total)
+    if end <= upload.received:
+        return upload
+
+    offset = max(start, upload.received)
+    directory = os.path.dirname(part_path(upload))
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=directory, suffix='.chunk') as chunk:
+        skip = offset - start
+        remaining = end - start
+        while remaining:
+            data = stream.read(min(COPY_BUFFER_SIZE, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            if skip >= len(data):
+                skip -= len(data)
+                continue
+            chunk.write(data[skip:])
+            skip = 0
+        chunk_end = end - remaining
+        chunk.flush()
+
+        with transaction.atomic():
+            upload = PhotoUpload.objects.select_for_update().get(pk=upload_id)
+            # Another request may have completed, restarted or extended the upload meanwhile
+            _check_chunk(upload, offset, total)
+            if chunk_end <= upload.received:
+                return upload
+
+            path = part_path(upload)
+            with open(path, 'r+b' if os.path.exists(path) else 'wb') as part:
+                # Drop bytes an interrupted copy wrote past the recorded offset
+                part.seek(upload.received)
+                part.truncate()
+                chunk.seek(upload.received - offset)
+                shutil.copyfileobj(chunk, part, COPY_BUFFER_SIZE)
+
+            upload.received = chunk_end
+            upload.save(update_fields=['received', 'updated_at'])
+    return upload
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(COPY_BUFFER_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _is_image(path):
+    from PIL import Image
+
+    try:
+        with Image.open(path) as image:
+            image.verify()
+    except Exception:
+        return False
+    return True
+
+
+def complete_upload(upload_id):
+    """
+    Turn a fully received upload into an InspectionPhoto. Completing twice
+    returns the same photo. On a checksum mismatch the received data is
+    discarded so the client uploads the file again; an upload that is not
+    an image is deleted.
+    """
+    with transaction.atomic():
+        upload = PhotoUpload.objects.select_for_update().get(pk=upload_id)
+        if upload.is_complete:
+            return upload
+        if upload.received != upload.size:
+            raise UploadError(f'Received {upload.received} of {upload.size} bytes', status=409)
+
+        path = part_path(upload)
+        if _file_sha256(path) != upload.checksum:
+            error = UploadError('Checksum mismatch, upload the file again', status=422)
+            upload.received = 0
+            upload.save(update_fields=['received', 'updated_at'])
+        elif not _is_image(path):
+            error = UploadError('Uploaded file is not an image', status=422)
+            upload.delete()
+        else:
+            photo = InspectionPhoto(inspection_id=upload.inspection_id, caption=upload.caption)
+            with _PartFile(open(path, 'rb')) as part:
+                photo.image.save(upload.filename, part, save=False)
+            photo.save()
+
+            upload.photo = photo
+            upload.save(update_fields=['photo', 'updated_at'])
+            return upload
+
+        os.remove(path)
+
+    raise error
+
+
+def delete_stale_uploads(max_age):
+    """Delete uploads (and their part files) not touched for ``max_age`` seconds."""
+    cutoff = timezone.now() - timezone.timedelta(seconds=max_age)
+    stale = PhotoUpload.objects.filter(updated_at__lt=cutoff)
+
+    for upload in stale.filter(photo__isnull=True).only('id').iterator():
+        try:
+            os.remove(part_path(upload))
+        except FileNotFoundError:
+            pass
+
+    deleted, _ = stale.delete()
+    return deleted
@@ -11,7 +11,28 @@ urlpatterns = [
     # HTMX endpoints
     path('api/save-layout/', views.save_layout, name='save_layout'),
     path('api/create-inspection/', views.create_inspection, name='create_inspection'),
+    path('api/inspections/batch/', views.create_inspections_batch, name='create_inspections_batch'),
+    path('api/reports/<uuid:report_id>/status/', views.report_status, name='report_status'),
     path('api/component/<str:component_id>/', views.get_component_data, name='get_component_data'),
+    path('api/component/<str:component_id>/history/', views.component_history, name='component_history'),
+    path('api/layout/<uuid:layout_id>/components/', views.layout_components, name='layout_components'),
+    path('api/layout/<uuid:layout_id>/snapshot/', views.layout_snapshot, name='layout_snapshot'),
+    path('api/layout/<uuid:layout_id>/events/', views.layout_events, name='layout_events'),
+    path('api/layout/<uuid:layout_id>/components/at/', views.layout_components_at, name='layout_components_at'),
+    path('api/layout/<uuid:layout_id>/components/in-rect/', views.layout_components_in_rect, name='layout_components_in_rect'),
+    path('api/layout/<uuid:layout_id>/components/near/', views.layout_components_near, name='layout_components_near'),
+    path('api/trends/', views.inspection_trends, name='inspection_trends'),
+    path('api/layout/<uuid:layout_id>/zones/', views.layout_zones, name='layout_zones'),
+    path('api/layout/<uuid:layout_id>/versions/', views.layout_versions, name='layout_versions'),
+    path('api/layout/<uuid:layout_id>/versions/<int:number>/', views.layout_version, name='layout_version'),
+    path('api/layout/<uuid:layout_id>/versions/<int:number>/restore/', views.restore_layout_version, name='restore_layout_version'),
+    path('api/profiling/', views.profiling_stats, name='profiling_stats'),
+    path('photos/<int:photo_id>/<str:name>/', views.photo_rendition, name='photo_rendition'),
+    
+    # Chunked photo uploads
+    path('api/inspections/<uuid:inspection_id>/photos/uploads/', views.start_photo_upload, name='start_photo_upload'),
+    path('api/photo-uploads/<uuid:upload_id>/', views.photo_upload, name='photo_upload'),
+    path('api/photo-uploads/<uuid:upload_id>/complete/', views.complete_photo_upload, name='complete_photo_upload'),
     
     # CSV endpoints
     path('api/export-layout/<uuid:layout_id>/', views.export_layout_csv, name='export_layout_csv'),
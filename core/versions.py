@@ -0,0 +1,83 @@
+"""
+Layout version history.
+
+Every save that changes component geometry records a LayoutVersion. Most
+versions store only the delta from the previous version:
+
+    {"added": {id: row}, "updated": {id: row}, "removed": [id, ...]}
+
+Every LAYOUT_VERSION_SNAPSHOT_INTERVAL-th version is instead a snapshot of
+all components, ``{"components": {id: row}}``. A row is
+``[component_type, x, y, width, height]``. Materialising a version loads the
+nearest snapshot at or before it and replays at most interval - 1 deltas.
+
+Versions cover geometry only; component status follows inspections.
+"""
+from django.conf import settings
+from django.db.models import Max
+
+from .models import LayoutVersion
+
+VERSION_FIELDS = ('component_type', 'x_position', 'y_position', 'width', 'height')
+
+
+def _row(component):
+    return [getattr(component, field) for field in VERSION_FIELDS]
+
+
+def record_layout_version(layout, user=None, added=(), updated=(), removed=()):
+    """
+    Record the version following a change to ``layout``: ``added`` and
+    ``updated`` are the written components, ``removed`` the deleted ids.
+    Call it inside the transaction that made the change, after the layout
+    row was updated (bump_revision), which serialises concurrent saves.
+    """
+    number = (LayoutVersion.objects.filter(layout=layout).aggregate(last=Max('number'))['last'] or 0) + 1
+    version = LayoutVersion(
+        layout=layout,
+        number=number,
+        added=len(added),
+        updated=len(updated),
+        removed=len(removed),
+        created_by=user,
+    )
+
+    if (number - 1) % settings.LAYOUT_VERSION_SNAPSHOT_INTERVAL == 0:
+        version.is_snapshot = True
+        version.data = {'components': {
+            row[0]: list(row[1:])
+            for row in layout.components.values_list('id', *VERSION_FIELDS).iterator()
+        }}
+    else:
+        version.data = {
+            'added': {component.id: _row(component) for component in added},
+            'updated': {component.id: _row(component) for component in updated},
+            'removed': list(removed),
+        }
+
+    version.save()
+    return version
+
+
+def materialize_layout_version(layout_id, number):
+    """
+    The components of a layout at a version as ``{id: row}``. Raises
+    LayoutVersion.DoesNotExist for an unknown version.
+    """
+    versions = LayoutVersion.objects.filter(layout_id=layout_id)
+    if not versions.filter(number=number).exists():
+        raise LayoutVersion.DoesNotExist(f'Version {number} does not exist')
+
+    snapshot_number, snapshot = versions.filter(is_snapshot=True, number__lte=number).order_by(
+        '-number'
+    ).values_list('number', 'data').first()
+    components = snapshot['components']
+
+    deltas = versions.filter(number__gt=snapshot_number, number__lte=number).order_by('number')
+    for delta in deltas.values_list('data', flat=True):
+        for component_id in delta['removed']:
+            components.pop(component_id, None)
+        components.update(delta['added'])
+        components.update(delta['updated'])
+
+    return components
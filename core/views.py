@@ -1,51 +1,104 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.http import JsonResponse, HttpResponse
-from django.views.decorators.http import require_http_methods
+from django.http import (
+    JsonResponse, HttpResponse, HttpResponseBadRequest, StreamingHttpResponse, FileResponse, Http404,
+)
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import condition, require_http_methods
 from django.views.decorators.csrf import csrf_exempt
+from django.core.cache import cache
 from django.core.paginator import Paginator
-from django.db.models import Q, Count
+from django.db import IntegrityError, transaction
+from django.db.models import Q, Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib import messages
 from django.utils import timezone
-from datetime import datetime, timedelta
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import MAXYEAR, MINYEAR, datetime, timedelta
+import asyncio
+import codecs
+import csv
 import json
+import math
+import os
+import re
+import time
+import uuid
 
 from .models import (
-    WarehouseLayout, WarehouseComponent, Inspection, UserProfile, 
-    Report, Notification, ComponentStatus, SeverityLevel, DefectType
+    WarehouseLayout, LayoutVersion, WarehouseComponent, Inspection, InspectionPhoto, PhotoUpload, UserProfile, 
+    Report, Notification, ComponentType, ComponentStatus, SeverityLevel, DefectType, TrendGranularity
 )
 from .forms import InspectionForm, ComponentForm, ReportForm
+from .events import get_broker
+from .inspections import create_inspections
+from .profiling import query_budget, stats as profile_stats
+from .renditions import RENDITIONS
+from .signals import components_changed
+from .snapshots import encode_layout_snapshot, layout_snapshot_rows
+from .spatial import components_in_bbox, layout_index
+from .stats import get_dashboard_stats
+from .trends import (
+    GROUP_FIELDS, MAX_PERIODS as MAX_TREND_PERIODS, inspection_trends as build_inspection_trends, period_count
+)
+from .uploads import UploadError, append_chunk, complete_upload, parse_content_range
+from .versions import materialize_layout_version, record_layout_version
+from .zones import apply_zone_status_changes, rebuild_zone_rollup, zone_rollups
+
+# Trend analytics: default range in days and the longest moving-average window
+TRENDS_DEFAULT_DAYS = 365
+TRENDS_MAX_WINDOW = 52
+
+# Number of skipped-row messages shown back to the user after a CSV import
+LAYOUT_IMPORT_MAX_REPORTED_ERRORS = 20
+
+# Largest batch accepted from an offline tablet sync
+INSPECTION_BATCH_MAX_ITEMS = 500
+# Longest notes accepted on an inspection from a batch
+INSPECTION_NOTES_MAX_LENGTH = 10000
+
+# Inspections per page of a component's history, by default and at most
+COMPONENT_HISTORY_PAGE_SIZE = 20
+COMPONENT_HISTORY_MAX_PAGE_SIZE = 100
 
 
 @login_required
+@query_budget(13)
 def dashboard(request):
-    # Get statistics
-    total_components = WarehouseComponent.objects.count()
-    immediate_threats = WarehouseComponent.objects.filter(status=ComponentStatus.IMMEDIATE).count()
-    fix_4_weeks = WarehouseComponent.objects.filter(status=ComponentStatus.FIX_4_WEEKS).count()
-    monitor_only = WarehouseComponent.objects.filter(
-        status__in=[ComponentStatus.GOOD, ComponentStatus.MONITOR]
-    ).count()
+    layout_id = request.GET.get('layout') or None
+    if layout_id:
+        try:
+            layout_id = uuid.UUID(layout_id)
+        except ValueError:
+            return HttpResponseBadRequest('Invalid layout')
+    
+    # Get statistics (one aggregate query, cached per layout)
+    stats = get_dashboard_stats(layout_id)
     
     # Get urgent items
     urgent_inspections = Inspection.objects.filter(
         Q(severity=SeverityLevel.RED) | Q(severity=SeverityLevel.AMBER),
         is_resolved=False
-    ).select_related('component', 'inspector').order_by('inspection_date')[:10]
+    ).select_related('component', 'inspector').order_by('inspection_date')
     
     # Get recent activity
     recent_activity = Inspection.objects.select_related(
         'component', 'inspector'
-    ).order_by('-inspection_date')[:5]
+    ).order_by('-inspection_date')
+    
+    if layout_id:
+        urgent_inspections = urgent_inspections.filter(component__layout_id=layout_id)
+        recent_activity = recent_activity.filter(component__layout_id=layout_id)
     
     context = {
-        'total_components': total_components,
-        'immediate_threats': immediate_threats,
-        'fix_4_weeks': fix_4_weeks,
-        'monitor_only': monitor_only,
-        'urgent_inspections': urgent_inspections,
-        'recent_activity': recent_activity,
+        **stats,
+        'urgent_inspections': urgent_inspections[:10],
+        'recent_activity': recent_activity[:5],
+        # Aisle heat-map of the selected layout, one roll-up row per aisle
+        'zones': zone_rollups(layout_id) if layout_id else None,
     }
     
     if request.htmx:
@@ -55,18 +108,16 @@ def dashboard(request):
 
 
 @login_required
+@query_budget(8)
 def layout_editor(request):
     layouts = WarehouseLayout.objects.filter(is_active=True)
-    active_layout = layouts.first() if layouts.exists() else None
-    components = []
-    
-    if active_layout:
-        components = active_layout.components.all()
+    active_layout = layouts.first()
     
+    # Components are not embedded in the page; the canvas fetches the tiles
+    # in view from layout_components
     context = {
         'layouts': layouts,
         'active_layout': active_layout,
-        'components': components,
     }
     
     if request.htmx:
@@ -75,13 +126,142 @@ def layout_editor(request):
     return render(request, 'layout_editor.html', context)
 
 
+LAYOUT_COMPONENT_FIELDS = (
+    'component_type', 'x_position', 'y_position', 'width', 'height'
+)
+
+
+def _component_fields(comp_data, with_status=True):
+    """
+    Map a client component payload onto WarehouseComponent field values.
+    Edits to existing components leave out ``status``: inspections own it, and
+    an editor tab opened before an inspection would write the old one back.
+    """
+    fields = {}
+    if 'type' in comp_data:
+        fields['component_type'] = comp_data['type']
+    if 'x' in comp_data:
+        fields['x_position'] = float(comp_data['x'])
+    if 'y' in comp_data:
+        fields['y_position'] = float(comp_data['y'])
+    if 'width' in comp_data:
+        fields['width'] = float(comp_data['width'])
+    if 'height' in comp_data:
+        fields['height'] = float(comp_data['height'])
+    if with_status and 'status' in comp_data:
+        fields['status'] = comp_data['status']
+    return fields
+
+
+def _apply_layout_changes(layout, added, updated, removed, user=None):
+    """
+    Apply component additions, updates and removals to a layout with one
+    bulk INSERT, one bulk UPDATE and one filtered DELETE. Components that are
+    not touched keep their rows, so their inspection history survives.
+    Geometry changes are recorded as a new layout version, and the zone
+    roll-up is adjusted by the components added. The status of existing
+    components is left to their inspections.
+    """
+    now = timezone.now()
+
+    new_components = [
+        WarehouseComponent(
+            id=comp['id'],
+            layout=layout,
+            **{'status': ComponentStatus.GOOD, **_component_fields(comp)}
+        )
+        for comp in added
+    ]
+
+    with transaction.atomic():
+        deleted = 0
+        removed_ids = []
+        zone_changes = [(component.id, None, component.status) for component in new_components]
+        if removed:
+            # The component post_delete receiver takes removed components out of the roll-up
+            removed_ids = list(layout.components.filter(id__in=removed).values_list('id', flat=True))
+            _, deleted_per_model = layout.components.filter(id__in=removed_ids).delete()
+            deleted = deleted_per_model.get(WarehouseComponent._meta.label, 0)
+
+        if new_components:
+            WarehouseComponent.objects.bulk_create(new_components, batch_size=1000)
+
+        changed_components = []
+        update_fields = {'updated_at'}
+        if updated:
+            existing = layout.components.in_bulk([comp['id'] for comp in updated])
+            for comp in updated:
+                component = existing.get(comp['id'])
+                if component is None:
+                    raise WarehouseComponent.DoesNotExist(
+                        f"Component {comp['id']} does not exist in this layout"
+                    )
+                fields = _component_fields(comp, with_status=False)
+                if not fields:
+                    continue
+                for name, value in fields.items():
+                    setattr(component, name, value)
+                component.updated_at = now
+                update_fields.update(fields)
+                changed_components.append(component)
+            WarehouseComponent.objects.bulk_update(
+                changed_components, sorted(update_fields), batch_size=1000
+            )
+
+        if deleted or new_components or changed_components:
+            WarehouseLayout.bump_revision(pk=layout.id)
+        if zone_changes:
+            apply_zone_status_changes(layout.id, zone_changes)
+        if removed_ids or new_components or changed_components:
+            record_layout_version(
+                layout, user, added=new_components, updated=changed_components, removed=removed_ids
+            )
+        transaction.on_commit(lambda: components_changed.send(
+            sender=WarehouseLayout, layout_id=layout.id, removed=bool(deleted)
+        ))
+
+    return {
+        'created': len(new_components),
+        'updated': len(changed_components),
+        'deleted': deleted,
+    }
+
+
+def _diff_layout_components(layout, components_data):
+    """
+    Diff a full component set sent by the client against the stored rows and
+    return the (added, updated, removed) changes needed to reach it.
+    """
+    stored = {
+        row[0]: dict(zip(LAYOUT_COMPONENT_FIELDS, row[1:]))
+        for row in layout.components.values_list('id', *LAYOUT_COMPONENT_FIELDS)
+    }
+
+    added, updated = [], []
+    for comp_data in components_data:
+        current = stored.pop(comp_data['id'], None)
+        if current is None:
+            added.append(comp_data)
+            continue
+
+        fields = _component_fields(comp_data, with_status=False)
+        if any(current[name] != value for name, value in fields.items()):
+            updated.append(comp_data)
+
+    return added, updated, list(stored)
+
+
 @login_required
 @require_http_methods(["POST"])
 def save_layout(request):
+    """
+    Save layout changes. The client either sends the full component set under
+    ``components`` (diffed against the stored rows) or only the changes under
+    ``added``, ``updated`` and ``removed``.
+    """
     try:
         data = json.loads(request.body)
         layout_id = data.get('layout_id')
-        components_data = data.get('components', [])
         
         if layout_id:
             layout = get_object_or_404(WarehouseLayout, id=layout_id)
@@ -91,42 +271,31 @@ def save_layout(request):
                 created_by=request.user
             )
         
-        # Clear existing components
-        layout.components.all().delete()
+        if 'components' in data:
+            added, updated, removed = _diff_layout_components(layout, data['components'])
+        else:
+            added = data.get('added', [])
+            updated = data.get('updated', [])
+            removed = data.get('removed', [])
         
-        # Create new components
-        for comp_data in components_data:
-            WarehouseComponent.objects.create(
-                id=comp_data['id'],
-                layout=layout,
-                component_type=comp_data['type'],
-                x_position=comp_data['x'],
-                y_position=comp_data['y'],
-                width=comp_data['width'],
-                height=comp_data['height'],
-                status=comp_data.get('status', ComponentStatus.GOOD)
-            )
+        changes = _apply_layout_changes(layout, added, updated, removed, user=request.user)
         
-        return JsonResponse({'success': True, 'layout_id': str(layout.id)})
+        return JsonResponse({'success': True, 'layout_id': str(layout.id), **changes})
     
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)})
 
 
 @login_required
+@query_budget(8)
 def inspection(request):
     layouts = WarehouseLayout.objects.filter(is_active=True)
-    active_layout = layouts.first() if layouts.exists() else None
-    components = []
+    active_layout = layouts.first()
     recent_inspections = Inspection.objects.select_related('component', 'inspector').order_by('-inspection_date')[:10]
     
-    if active_layout:
-        components = active_layout.components.all()
-    
     context = {
         'layouts': layouts,
         'active_layout': active_layout,
-        'components': components,
         'recent_inspections': recent_inspections,
         'defect_types': DefectType.choices,
         'severity_levels': SeverityLevel.choices,
@@ -177,7 +346,119 @@ def create_inspection(request):
         return redirect('inspection')
 
 
+def _inspection_from_payload(item, components, inspector):
+    """Build an unsaved Inspection from one item of a batch submission."""
+    inspection_id = uuid.UUID(str(item['id']))
+    
+    component = components.get(item.get('component_id'))
+    if component is None:
+        raise ValueError(f"unknown component {item.get('component_id')!r}")
+    
+    defect_type = item.get('defect_type')
+    if defect_type not in DefectType.values:
+        raise ValueError(f'unknown defect type {defect_type!r}')
+    
+    severity = item.get('severity')
+    if severity not in SeverityLevel.values:
+        raise ValueError(f'unknown severity {severity!r}')
+    
+    custom_defect = item.get('custom_defect', '')
+    custom_defect_max_length = Inspection._meta.get_field('custom_defect').max_length
+    if not isinstance(custom_defect, str) or len(custom_defect) > custom_defect_max_length:
+        raise ValueError(f'custom_defect must be a string of at most {custom_defect_max_length} characters')
+    
+    notes = item.get('notes', '')
+    if not isinstance(notes, str) or len(notes) > INSPECTION_NOTES_MAX_LENGTH:
+        raise ValueError(f'notes must be a string of at most {INSPECTION_NOTES_MAX_LENGTH} characters')
+    
+    inspection = Inspection(
+        id=inspection_id,
+        component=component,
+        inspector=inspector,
+        defect_type=defect_type,
+        custom_defect=custom_defect,
+        severity=severity,
+        notes=notes
+    )
+    if item.get('inspection_date'):
+        inspection_date = parse_datetime(item['inspection_date'])
+        if inspection_date is None:
+            raise ValueError(f"invalid inspection_date {item['inspection_date']!r}")
+        if timezone.is_naive(inspection_date):
+            inspection_date = timezone.make_aware(inspection_date)
+        inspection.inspection_date = inspection_date
+    return inspection
+
+
+@login_required
+@require_http_methods(["POST"])
+def create_inspections_batch(request):
+    """
+    Create a batch of inspections queued offline by a tablet. Each item
+    carries a client-generated UUID, so replaying a batch is idempotent:
+    inspections that already exist are reported as duplicates, not re-created.
+    """
+    try:
+        items = json.loads(request.body).get('inspections', [])
+    except (ValueError, AttributeError) as e:
+        return JsonResponse({'success': False, 'error': f'Invalid JSON: {e}'}, status=400)
+    
+    if not isinstance(items, list):
+        return JsonResponse({'success': False, 'error': 'inspections must be a list.'}, status=400)
+    
+    if len(items) > INSPECTION_BATCH_MAX_ITEMS:
+        return JsonResponse({
+            'success': False,
+            'error': f'At most {INSPECTION_BATCH_MAX_ITEMS} inspections per batch.'
+        }, status=400)
+    
+    component_ids = {
+        item.get('component_id') for item in items
+        if isinstance(item, dict) and isinstance(item.get('component_id'), str)
+    }
+    components = WarehouseComponent.objects.only('id', 'layout', 'status').in_bulk(component_ids)
+    
+    item_ids = []
+    for item in items:
+        try:
+            item_ids.append(uuid.UUID(str(item['id'])))
+        except (KeyError, TypeError, ValueError):
+            pass
+    existing_ids = set(Inspection.objects.filter(id__in=item_ids).values_list('id', flat=True))
+    
+    results = []
+    new_inspections = []
+    seen_ids = set()
+    for item in items:
+        try:
+            if not isinstance(item, dict):
+                raise ValueError('inspection must be an object')
+            inspection = _inspection_from_payload(item, components, request.user)
+        except (KeyError, TypeError, ValueError) as e:
+            item_id = item.get('id') if isinstance(item, dict) else None
+            results.append({'id': item_id, 'status': 'error', 'error': str(e)})
+            continue
+        
+        if inspection.id in existing_ids or inspection.id in seen_ids:
+            results.append({'id': str(inspection.id), 'status': 'duplicate'})
+            continue
+        
+        seen_ids.add(inspection.id)
+        new_inspections.append(inspection)
+        results.append({'id': str(inspection.id), 'status': 'created'})
+    
+    try:
+        create_inspections(new_inspections)
+    except IntegrityError as e:
+        # A concurrent replay of the same batch won the race; the client
+        # retries and gets per-item duplicates back
+        return JsonResponse({'success': False, 'error': str(e)}, status=409)
+    
+    return JsonResponse({'success': True, 'results': results})
+
+
 @login_required
+@query_budget(15)
 def reports(request):
     if request.method == 'POST':
         form = ReportForm(request.POST)
@@ -185,7 +466,8 @@ def reports(request):
             report = form.save(commit=False)
             report.generated_by = request.user
             report.save()
-            # TODO: Generate PDF asynchronously
+            # Queued; the run_report_worker command renders the PDF, or hands
+            # out the PDF of an identical earlier report if the data is unchanged
             messages.success(request, 'Report generation started.')
     else:
         form = ReportForm()
@@ -206,6 +488,14 @@ def reports(request):
     return render(request, 'reports.html', context)
 
 
+@login_required
+@query_budget(5)
+def report_status(request, report_id):
+    """HTMX endpoint polled while a report is being generated"""
+    report = get_object_or_404(Report, id=report_id)
+    return render(request, 'components/report_status.html', {'report': report})
+
+
 @login_required
 def users(request):
     # Check if user is admin
@@ -233,7 +523,341 @@ def users(request):
     return render(request, 'users.html', context)
 
 
+@staff_member_required
+def profiling_stats(request):
+    """
+    Per-view SQL count, SQL time, template time and latency percentiles of
+    the requests sampled by ProfilingMiddleware in this process
+    """
+    if request.method == 'POST' and request.POST.get('reset'):
+        profile_stats.reset()
+    
+    return JsonResponse({
+        'success': True,
+        'sample_rate': settings.PROFILING_SAMPLE_RATE,
+        'views': profile_stats.summary(),
+    })
+
+
+def _query_numbers(request, name, count):
+    """Parse ?name=a,b,... into ``count`` finite floats, or None when malformed."""
+    try:
+        values = [float(value) for value in request.GET[name].split(',')]
+    except (KeyError, ValueError):
+        return None
+    if len(values) != count or not all(math.isfinite(value) for value in values):
+        return None
+    return values
+
+
+@login_required
+@query_budget(6)
+def layout_components(request, layout_id):
+    """
+    JSON endpoint returning the components of a layout that intersect the
+    viewport box given as ?bbox=x1,y1,x2,y2
+    """
+    layout = get_object_or_404(WarehouseLayout, id=layout_id)
+    
+    bbox = _query_numbers(request, 'bbox', 4)
+    if bbox is None:
+        return JsonResponse({'error': 'bbox=x1,y1,x2,y2 is required'}, status=400)
+    x1, y1, x2, y2 = bbox
+    
+    components = [
+        dict(zip(('id', 'type', 'x', 'y', 'width', 'height', 'status'), row))
+        for row in components_in_bbox(layout.id, x1, y1, x2, y2)
+    ]
+    
+    return JsonResponse({'bbox': [x1, y1, x2, y2], 'components': components})
+
+
+def _spatial_response(request, layout_id, query):
+    """
+    Run ``query`` against the spatial index of a layout and return the
+    matching components, optionally limited to ?type=<component type>.
+    """
+    layout = get_object_or_404(WarehouseLayout.objects.only('id', 'revision'), id=layout_id)
+    index = layout_index(layout.id, layout.revision)
+    
+    component_type = request.GET.get('type')
+    components = []
+    for row, extra in query(index):
+        if component_type and row[1] != component_type:
+            continue
+        components.append({**dict(zip(('id', 'type', 'x', 'y', 'width', 'height', 'status'), row)), **extra})
+    
+    return JsonResponse({'revision': layout.revision, 'components': components})
+
+
 @login_required
+@query_budget(6)
+def layout_components_at(request, layout_id):
+    """Components of a layout whose rectangle contains ?point=x,y"""
+    point = _query_numbers(request, 'point', 2)
+    if point is None:
+        return JsonResponse({'error': 'point=x,y is required'}, status=400)
+    
+    return _spatial_response(
+        request, layout_id, lambda index: ((row, {}) for row in index.at_point(*point))
+    )
+
+
+@login_required
+@query_budget(6)
+def layout_components_in_rect(request, layout_id):
+    """Components of a layout intersecting ?rect=x1,y1,x2,y2"""
+    rect = _query_numbers(request, 'rect', 4)
+    if rect is None:
+        return JsonResponse({'error': 'rect=x1,y1,x2,y2 is required'}, status=400)
+    x1, y1, x2, y2 = rect
+    
+    return _spatial_response(
+        request, layout_id,
+        lambda index: ((row, {}) for row in index.in_rect(min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)))
+    )
+
+
+@login_required
+@query_budget(6)
+def layout_components_near(request, layout_id):
+    """
+    Components of a layout within ?radius= of ?point=x,y, nearest first,
+    each with its distance from the point
+    """
+    point = _query_numbers(request, 'point', 2)
+    radius = _query_numbers(request, 'radius', 1)
+    if point is None or radius is None or radius[0] < 0:
+        return JsonResponse({'error': 'point=x,y and a non-negative radius are required'}, status=400)
+    
+    return _spatial_response(
+        request, layout_id,
+        lambda index: (
+            (row, {'distance': round(distance, 3)})
+            for distance, row in index.within_radius(*point, radius[0])
+        )
+    )
+
+
+@login_required
+@query_budget(6)
+def layout_zones(request, layout_id):
+    """
+    Status counts per zone of a layout for heat-maps: the aisles, or the bays
+    of ?parent=<aisle>. Each zone is one pre-computed roll-up row.
+    """
+    layout = get_object_or_404(WarehouseLayout.objects.only('id'), id=layout_id)
+    parent = request.GET.get('parent', '')
+    
+    zones = [{
+        'zone': rollup.zone,
+        'counts': {status: getattr(rollup, status) for status in ComponentStatus.values},
+        'total': rollup.total,
+        'worst_status': rollup.worst_status,
+    } for rollup in zone_rollups(layout.id, parent)]
+    
+    return JsonResponse({'layout_id': str(layout.id), 'parent': parent, 'zones': zones})
+
+
+@login_required
+@query_budget(5)
+@gzip_page
+def inspection_trends(request):
+    """
+    Inspection trends from the pre-aggregated buckets: counts per day or
+    week between ?from= and ?to= (ISO dates), optionally for one ?layout=
+    and split by ?group_by=defect_type|severity|layout, with a trailing
+    moving average over ?window= periods and resolution-time percentiles.
+    """
+    granularity = request.GET.get('granularity', TrendGranularity.WEEK)
+    if granularity not in TrendGranularity.values:
+        return JsonResponse({'error': 'granularity must be day or week'}, status=400)
+    group_by = request.GET.get('group_by') or None
+    if group_by is not None and group_by not in GROUP_FIELDS:
+        return JsonResponse({'error': f"group_by must be one of {', '.join(GROUP_FIELDS)}"}, status=400)
+    
+    try:
+        date_to = parse_date(request.GET['to']) if request.GET.get('to') else timezone.localdate()
+        date_from = (
+            parse_date(request.GET['from']) if request.GET.get('from')
+            else date_to - timedelta(days=TRENDS_DEFAULT_DAYS)
+        )
+        window = int(request.GET.get('window', 4))
+    except (ValueError, OverflowError):
+        return JsonResponse({'error': 'Invalid from, to or window'}, status=400)
+    if date_from is None or date_to is None or date_from > date_to:
+        return JsonResponse({'error': 'from and to must be ISO dates, from before to'}, status=400)
+    # The first and last years cannot be shifted to week starts or time zones
+    if date_from.year <= MINYEAR or date_to.year >= MAXYEAR:
+        return JsonResponse({'error': 'from and to are out of range'}, status=400)
+    if period_count(granularity, date_from, date_to) > MAX_TREND_PERIODS[granularity]:
+        return JsonResponse({
+            'error': f'At most {MAX_TREND_PERIODS[granularity]} {granularity} periods per request'
+        }, status=400)
+    if not 1 <= window <= TRENDS_MAX_WINDOW:
+        return JsonResponse({'error': f'window must be between 1 and {TRENDS_MAX_WINDOW}'}, status=400)
+    
+    layout_id = request.GET.get('layout') or None
+    if layout_id:
+        try:
+            layout_id = uuid.UUID(layout_id)
+        except ValueError:
+            return JsonResponse({'error': 'Invalid layout'}, status=400)
+        get_object_or_404(WarehouseLayout.objects.only('id'), id=layout_id)
+    
+    trends = build_inspection_trends(granularity, date_from, date_to, layout_id, group_by, window)
+    return JsonResponse({'from': date_from.isoformat(), 'to': date_to.isoformat(), **trends})
+
+
+def _layout_snapshot_etag(request, layout_id):
+    revision = WarehouseLayout.objects.filter(id=layout_id).values_list('revision', flat=True).first()
+    if revision is None:
+        return None
+    return f'{layout_id}-{revision}'
+
+
+@login_required
+@query_budget(6)
+@gzip_page
+@condition(etag_func=_layout_snapshot_etag)
+def layout_snapshot(request, layout_id):
+    """
+    Columnar JSON snapshot of all components of a layout, stamped with the
+    layout revision. Clients revalidate with If-None-Match and get a 304
+    while the layout is unchanged.
+    """
+    layout = get_object_or_404(WarehouseLayout.objects.only('id', 'revision'), id=layout_id)
+    
+    key = f'layout_snapshot:{layout.id}:{layout.revision}'
+    body = cache.get(key)
+    if body is None:
+        snapshot = encode_layout_snapshot(layout, layout_snapshot_rows(layout))
+        body = json.dumps(snapshot, separators=(',', ':'))
+        cache.set(key, body, settings.LAYOUT_SNAPSHOT_CACHE_TIMEOUT)
+    
+    response = HttpResponse(body, content_type='application/json')
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@login_required
+def layout_versions(request, layout_id):
+    """JSON list of a layout's saved versions, newest first"""
+    layout = get_object_or_404(WarehouseLayout.objects.only('id'), id=layout_id)
+    
+    versions = (
+        LayoutVersion.objects.filter(layout=layout)
+        .select_related('created_by')
+        .defer('data')
+    )
+    before = request.GET.get('before')
+    if before and before.isdigit():
+        versions = versions.filter(number__lt=int(before))
+    
+    return JsonResponse({
+        'layout_id': str(layout.id),
+        'versions': [{
+            'number': version.number,
+            'created_at': version.created_at.isoformat(),
+            'created_by': version.created_by.username if version.created_by else None,
+            'is_snapshot': version.is_snapshot,
+            'added': version.added,
+            'updated': version.updated,
+            'removed': version.removed,
+        } for version in versions[:50]],
+    })
+
+
+def _version_components(layout, number):
+    """Components of a layout version, or a 404 for an unknown version."""
+    try:
+        return materialize_layout_version(layout.id, number)
+    except LayoutVersion.DoesNotExist:
+        raise Http404('Unknown layout version')
+
+
+@login_required
+@gzip_page
+def layout_version(request, layout_id, number):
+    """The components of a layout as they were at a saved version"""
+    layout = get_object_or_404(WarehouseLayout.objects.only('id'), id=layout_id)
+    components = _version_components(layout, number)
+    
+    return JsonResponse({
+        'layout_id': str(layout.id),
+        'number': number,
+        'components': [
+            dict(zip(('id', 'type', 'x', 'y', 'width', 'height'), (component_id, *row)))
+            for component_id, row in components.items()
+        ],
+    })
+
+
+@login_required
+@require_http_methods(["POST"])
+def restore_layout_version(request, layout_id, number):
+    """
+    Bring a layout's geometry back to a saved version by applying only the
+    differences from its current state. The restore is itself recorded as a
+    new version, so it can be undone the same way.
+    """
+    layout = get_object_or_404(WarehouseLayout, id=layout_id)
+    components = _version_components(layout, number)
+    
+    try:
+        components_data = [
+            {'id': component_id, **dict(zip(('type', 'x', 'y', 'width', 'height'), row))}
+            for component_id, row in components.items()
+        ]
+        added, updated, removed = _diff_layout_components(layout, components_data)
+        changes = _apply_layout_changes(layout, added, updated, removed, user=request.user)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)})
+    
+    return JsonResponse({'success': True, 'layout_id': str(layout.id), 'restored': number, **changes})
+
+
+def _sse_message(event):
+    return f"event: {event['type']}\nid: {event['revision']}\ndata: {json.dumps(event)}\n\n"
+
+
+async def layout_events(request, layout_id):
+    """
+    Server-sent event stream of status and geometry changes of a layout, see
+    core.events. Served by the ASGI application; the first event carries the
+    current revision so clients can tell whether their snapshot is stale.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+    
+    revision = await WarehouseLayout.objects.filter(id=layout_id).values_list(
+        'revision', flat=True
+    ).afirst()
+    if revision is None:
+        return JsonResponse({'error': 'Layout not found'}, status=404)
+    
+    async def stream():
+        async with get_broker().subscribe(layout_id) as queue:
+            yield f'retry: {settings.STATUS_EVENTS_RETRY_MS}\n\n'
+            yield _sse_message({'type': 'hello', 'revision': revision})
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), settings.STATUS_EVENTS_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    # Comment line; keeps proxies from closing an idle stream
+                    yield ': keep-alive\n\n'
+                    continue
+                yield _sse_message(event)
+    
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@login_required
+@query_budget(6)
 def get_component_data(request, component_id):
     """HTMX endpoint to get component data for inspection panel"""
     component = get_object_or_404(WarehouseComponent, id=component_id)
@@ -249,70 +873,380 @@ def get_component_data(request, component_id):
     return render(request, 'components/inspection_panel.html', context)
 
 
+def _history_cursor(inspection):
+    """Opaque position after ``inspection`` in a component's history."""
+    return f'{inspection.inspection_date.isoformat()}_{inspection.id}'
+
+
+def _parse_history_cursor(cursor):
+    inspection_date, _, inspection_id = cursor.rpartition('_')
+    inspection_date = parse_datetime(inspection_date)
+    if inspection_date is None:
+        raise ValueError(f'invalid cursor {cursor!r}')
+    return inspection_date, uuid.UUID(inspection_id)
+
+
 @login_required
+@query_budget(6)
+def component_history(request, component_id):
+    """
+    A component's inspections, newest first, one page at a time. Pages are
+    addressed by a cursor on (inspection_date, id) instead of an offset, so
+    deep pages cost the same as the first one. HTMX requests get rows for the
+    inspection panel, which fetches the next page when the last row scrolls
+    into view; other clients get JSON with the next cursor.
+    """
+    component = get_object_or_404(WarehouseComponent.objects.only('id'), id=component_id)
+    
+    try:
+        limit = min(int(request.GET.get('limit', COMPONENT_HISTORY_PAGE_SIZE)), COMPONENT_HISTORY_MAX_PAGE_SIZE)
+        if limit < 1:
+            raise ValueError('limit must be positive')
+        cursor = request.GET.get('after')
+        position = _parse_history_cursor(cursor) if cursor else None
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    history = (
+        Inspection.objects.filter(component=component)
+        .select_related('inspector', 'resolved_by')
+        # A correlated subquery rather than a join and GROUP BY, so only the
+        # rows under the LIMIT are counted and the index scan stays ordered
+        .annotate(photo_count=Coalesce(Subquery(
+            InspectionPhoto.objects.filter(inspection=OuterRef('pk'))
+            .order_by()
+            .values('inspection')
+            .annotate(count=Count('id'))
+            .values('count')
+        ), 0))
+        .with_overdue()
+        .order_by('-inspection_date', '-id')
+    )
+    if position is not None:
+        inspection_date, inspection_id = position
+        history = history.filter(
+            Q(inspection_date__lt=inspection_date)
+            | Q(inspection_date=inspection_date, id__lt=inspection_id)
+        )
+    
+    # One extra row tells whether there is a next page
+    page = list(history[:limit + 1])
+    next_cursor = _history_cursor(page[limit - 1]) if len(page) > limit else None
+    page = page[:limit]
+    
+    if request.htmx:
+        return render(request, 'components/inspection_history.html', {
+            'component': component,
+            'inspections': page,
+            'next_cursor': next_cursor,
+            'limit': limit,
+            'first_page': position is None,
+        })
+    
+    return JsonResponse({
+        'success': True,
+        'component_id': component.id,
+        'inspections': [{
+            'id': str(inspection.id),
+            'inspection_date': inspection.inspection_date.isoformat(),
+            'defect_type': inspection.defect_type,
+            'custom_defect': inspection.custom_defect,
+            'severity': inspection.severity,
+            'notes': inspection.notes,
+            'inspector': inspection.inspector.get_full_name() or inspection.inspector.username,
+            'due_date': inspection.due_date.isoformat() if inspection.due_date else None,
+            'is_overdue': inspection.is_overdue,
+            'is_resolved': inspection.is_resolved,
+            'resolved_date': inspection.resolved_date.isoformat() if inspection.resolved_date else None,
+            'resolved_by': (
+                inspection.resolved_by.get_full_name() or inspection.resolved_by.username
+                if inspection.resolved_by else None
+            ),
+            'photo_count': inspection.photo_count,
+        } for inspection in page],
+        'next_cursor': next_cursor,
+    })
+
+
+@login_required
+@query_budget(5)
+def photo_rendition(request, photo_id, name):
+    """Serve a downscaled copy of an inspection photo, or the original until it exists"""
+    if name not in RENDITIONS:
+        raise Http404('Unknown rendition')
+    
+    photo = get_object_or_404(
+        InspectionPhoto.objects.only('image', 'renditions', 'rendition_status'), pk=photo_id
+    )
+    path = photo.rendition_name(name)
+    
+    response = FileResponse(photo.image.storage.open(path, 'rb'))
+    if path != photo.image.name and 'v' in request.GET:
+        # Versioned URL of a generated rendition: the content never changes
+        response['Cache-Control'] = f'private, max-age={settings.PHOTO_RENDITION_MAX_AGE}, immutable'
+    else:
+        response['Cache-Control'] = 'private, no-cache'
+    
+    return response
+
+
+def _photo_upload_state(upload):
+    return {
+        'upload_id': str(upload.id),
+        'size': upload.size,
+        'received': upload.received,
+        'chunk_size': settings.PHOTO_UPLOAD_CHUNK_SIZE,
+        'photo_id': upload.photo_id,
+    }
+
+
+@login_required
+@require_http_methods(["POST"])
+def start_photo_upload(request, inspection_id):
+    """
+    Open a chunked upload for a photo of an inspection. The client sends the
+    file name, size in bytes and SHA-256 (hex), then PUTs the chunks.
+    """
+    inspection = get_object_or_404(Inspection.objects.only('id'), id=inspection_id)
+    
+    try:
+        data = json.loads(request.body)
+        filename = os.path.basename(str(data['filename']))
+        size = int(data['size'])
+        checksum = str(data['checksum']).lower()
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        return JsonResponse({'success': False, 'error': f'Invalid upload request: {e}'}, status=400)
+    
+    if not filename:
+        return JsonResponse({'success': False, 'error': 'A file name is required.'}, status=400)
+    if not 0 < size <= settings.PHOTO_UPLOAD_MAX_SIZE:
+        return JsonResponse({
+            'success': False,
+            'error': f'Photos must be between 1 and {settings.PHOTO_UPLOAD_MAX_SIZE} bytes.'
+        }, status=413)
+    if not re.fullmatch(r'[0-9a-f]{64}', checksum):
+        return JsonResponse({'success': False, 'error': 'checksum must be a hex SHA-256.'}, status=400)
+    
+    upload = PhotoUpload.objects.create(
+        inspection=inspection,
+        uploaded_by=request.user,
+        filename=filename,
+        caption=str(data.get('caption', ''))[:255],
+        size=size,
+        checksum=checksum,
+    )
+    
+    return JsonResponse({'success': True, **_photo_upload_state(upload)}, status=201)
+
+
+@login_required
+@require_http_methods(["GET", "PUT"])
+def photo_upload(request, upload_id):
+    """
+    GET reports how many bytes of an upload were received, which is where a
+    resumed upload continues. PUT appends the chunk named by Content-Range.
+    """
+    upload = get_object_or_404(PhotoUpload, id=upload_id, uploaded_by=request.user)
+    
+    if request.method == 'GET':
+        return JsonResponse({'success': True, **_photo_upload_state(upload)})
+    
+    try:
+        start, end, total = parse_content_range(request.headers.get('Content-Range'))
+        if end - start > settings.PHOTO_UPLOAD_MAX_CHUNK_SIZE:
+            raise UploadError(
+                f'Chunks may be at most {settings.PHOTO_UPLOAD_MAX_CHUNK_SIZE} bytes', status=413
+            )
+        upload = append_chunk(upload.id, request, start, end, total)
+    except UploadError as e:
+        return JsonResponse({'success': False, 'error': str(e), **_photo_upload_state(upload)}, status=e.status)
+    
+    if upload.received < end:
+        return JsonResponse({
+            'success': False, 'error': 'Incomplete chunk', **_photo_upload_state(upload)
+        }, status=400)
+    
+    return JsonResponse({'success': True, **_photo_upload_state(upload)})
+
+
+@login_required
+@require_http_methods(["POST"])
+def complete_photo_upload(request, upload_id):
+    """Verify a fully received upload and attach it to its inspection"""
+    upload = get_object_or_404(PhotoUpload, id=upload_id, uploaded_by=request.user)
+    
+    try:
+        upload = complete_upload(upload.id)
+    except UploadError as e:
+        # Uploads that are not images are deleted, and have no state left
+        upload = PhotoUpload.objects.filter(pk=upload.id).first()
+        state = _photo_upload_state(upload) if upload else {}
+        return JsonResponse({'success': False, 'error': str(e), **state}, status=e.status)
+    
+    return JsonResponse({
+        'success': True,
+        **_photo_upload_state(upload),
+        'thumbnail_url': upload.photo.rendition_url('thumb'),
+    })
+
+
+class _Echo:
+    """Pseudo-buffer whose write() hands the row back instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def _layout_csv_rows(layout):
+    """Yield encoded CSV lines for a layout, reading components with a cursor."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(['component_id', 'type', 'x', 'y', 'width', 'height', 'status'])
+    
+    rows = layout.components.values_list(
+        'id', 'component_type', 'x_position', 'y_position', 'width', 'height', 'status'
+    ).iterator(chunk_size=settings.LAYOUT_EXPORT_CHUNK_SIZE)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+@login_required
+@query_budget(5)
 def export_layout_csv(request, layout_id):
-    """Export warehouse layout as CSV"""
+    """Export warehouse layout as CSV, streamed row by row"""
     layout = get_object_or_404(WarehouseLayout, id=layout_id)
     
-    response = HttpResponse(content_type='text/csv')
+    response = StreamingHttpResponse(_layout_csv_rows(layout), content_type='text/csv')
     response['Content-Disposition'] = f'attachment; filename="{layout.name}_layout.csv"'
     
-    import csv
-    writer = csv.writer(response)
-    writer.writerow(['component_id', 'type', 'x', 'y', 'width', 'height', 'status'])
-    
-    for component in layout.components.all():
-        writer.writerow([
-            component.id,
-            component.component_type,
-            component.x_position,
-            component.y_position,
-            component.width,
-            component.height,
-            component.status
-        ])
-    
     return response
 
 
+def _decoded_csv_lines(uploaded_file, encoding='utf-8-sig'):
+    """Decode an uploaded file line by line without reading it into memory."""
+    return codecs.iterdecode(uploaded_file, encoding)
+
+
+def _validated_csv_components(rows, layout):
+    """
+    Yield (line_number, component, error) for each CSV row. Exactly one of
+    component and error is set, so invalid rows can be reported without
+    aborting the import.
+    """
+    component_types = set(ComponentType.values)
+    statuses = set(ComponentStatus.values)
+    seen_ids = set()
+
+    for line_number, row in enumerate(rows, start=2):
+        try:
+            component_id = (row.get('component_id') or '').strip()
+            if not component_id:
+                raise ValueError('missing component_id')
+            if len(component_id) > WarehouseComponent._meta.get_field('id').max_length:
+                raise ValueError(f'component_id "{component_id}" is too long')
+            if component_id in seen_ids:
+                raise ValueError(f'duplicate component_id "{component_id}"')
+
+            component_type = (row.get('type') or '').strip()
+            if component_type not in component_types:
+                raise ValueError(f'unknown type "{component_type}"')
+
+            status = (row.get('status') or '').strip() or ComponentStatus.GOOD
+            if status not in statuses:
+                raise ValueError(f'unknown status "{status}"')
+
+            component = WarehouseComponent(
+                id=component_id,
+                layout=layout,
+                component_type=component_type,
+                x_position=float(row['x']),
+                y_position=float(row['y']),
+                width=float(row['width']),
+                height=float(row['height']),
+                status=status
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            yield line_number, None, str(e)
+            continue
+
+        seen_ids.add(component_id)
+        yield line_number, component, None
+
+
+def _batched(iterable, size):
+    """Yield lists of at most ``size`` items from ``iterable``."""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
 @login_required
 @require_http_methods(["POST"])
 def import_layout_csv(request):
-    """Import warehouse layout from CSV"""
+    """
+    Import warehouse layout from CSV. The upload is decoded and validated as a
+    stream and inserted in bulk batches inside one transaction, so a failed
+    import never leaves a partial layout behind.
+    """
     if 'csv_file' not in request.FILES:
         messages.error(request, 'No CSV file uploaded.')
         return redirect('layout_editor')
     
     csv_file = request.FILES['csv_file']
+    batch_size = settings.LAYOUT_IMPORT_BATCH_SIZE
+    errors = []
+    error_count = 0
+    imported = 0
+    started = time.monotonic()
+    
+    def valid_components(results):
+        nonlocal error_count
+        for line_number, component, error in results:
+            if error is None:
+                yield component
+                continue
+            error_count += 1
+            if len(errors) < LAYOUT_IMPORT_MAX_REPORTED_ERRORS:
+                errors.append(f'Row {line_number}: {error}')
     
     try:
-        import csv
-        import io
+        with transaction.atomic():
+            layout = WarehouseLayout.objects.create(
+                name=f"Imported Layout {timezone.now().strftime('%Y-%m-%d %H:%M')}",
+                created_by=request.user
+            )
+            
+            csv_reader = csv.DictReader(_decoded_csv_lines(csv_file))
+            results = _validated_csv_components(csv_reader, layout)
+            for batch in _batched(valid_components(results), batch_size):
+                WarehouseComponent.objects.bulk_create(batch)
+                imported += len(batch)
+            
+            WarehouseLayout.bump_revision(pk=layout.id)
+            rebuild_zone_rollup(layout.id)
+            record_layout_version(layout, request.user)
+            transaction.on_commit(lambda: components_changed.send(
+                sender=WarehouseLayout, layout_id=layout.id
+            ))
         
-        # Create new layout
-        layout = WarehouseLayout.objects.create(
-            name=f"Imported Layout {timezone.now().strftime('%Y-%m-%d %H:%M')}",
-            created_by=request.user
+        elapsed = time.monotonic() - started
+        rate = imported / elapsed if elapsed else imported
+        messages.success(
+            request,
+            f'Layout imported successfully as "{layout.name}": {imported} components '
+            f'in {elapsed:.1f}s ({rate:.0f} rows/s).'
         )
-        
-        # Parse CSV
-        csv_data = csv_file.read().decode('utf-8')
-        csv_reader = csv.DictReader(io.StringIO(csv_data))
-        
-        for row in csv_reader:
-            WarehouseComponent.objects.create(
-                id=row['component_id'],
-                layout=layout,
-                component_type=row['type'],
-                x_position=float(row['x']),
-                y_position=float(row['y']),
-                width=float(row['width']),
-                height=float(row['height']),
-                status=row.get('status', ComponentStatus.GOOD)
+        if error_count:
+            messages.warning(
+                request,
+                f'{error_count} rows were skipped: ' + '; '.join(errors)
+                + (' ...' if error_count > len(errors) else '')
             )
         
-        messages.success(request, f'Layout imported successfully as "{layout.name}"')
-        
     except Exception as e:
         messages.error(request, f'Error importing CSV: {str(e)}')
     
@@ -0,0 +1,27 @@
+"""
+Entry points for background worker processes.
+
+Pools are started with the ``spawn`` method so children never share the
+parent's database connections. A spawned child imports this module before
+Django is configured, so it must not import models at module level.
+"""
+import os
+
+
+def init_process():
+    import django
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'warehouse_inspection.settings')
+    django.setup()
+
+
+def run_report(report_id):
+    from .reports import generate_report
+
+    return generate_report(report_id)
+
+
+def run_renditions(photo_id):
+    from .renditions import generate_renditions
+
+    return generate_renditions(photo_id)
@@ -0,0 +1,149 @@
+"""
+Zone roll-ups: component counts per status for every zone of a layout.
+
+Zones are derived from the component ID scheme ``<type>-<aisle>-<bay>``, e.g.
+``RK-A1-B1`` or ``SYN1-RK-B2-U1``: each component counts towards the whole
+layout (zone ``''``), its aisle (``A1``) and its bay (``A1-B1``). Components
+whose ID does not follow the scheme only count towards the whole layout.
+
+Status changes made by inspections, and components added to or removed
+from a layout, adjust the ZoneRollup rows of the components' zones in place,
+inside the transaction that changes them. CSV imports and the
+rebuild_zone_rollups command recount the layout from its components.
+Readers (the dashboard, zone heat-maps) therefore touch one row per zone and
+never build roll-ups themselves: new layouts start with an empty roll-up,
+and layouts created before roll-ups existed are built once with
+``manage.py rebuild_zone_rollups --missing``.
+"""
+from collections import Counter, defaultdict
+import re
+
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Sum
+
+from .models import WarehouseLayout, WarehouseComponent, ZoneRollup, ComponentStatus
+
+ZONE_ID_PATTERN = re.compile(r'(?:^|-)([A-Z]+\d+)-([A-Z]+\d+)$', re.IGNORECASE)
+# Changes touching more zones than this recount the layout instead
+MAX_INCREMENTAL_ZONES = 200
+
+
+def component_zones(component_id):
+    """(zone, parent) pairs a component counts towards, outermost first."""
+    zones = [('', None)]
+    match = ZONE_ID_PATTERN.search(component_id)
+    if match:
+        aisle = match.group(1).upper()
+        zones.append((aisle, ''))
+        zones.append((f'{aisle}-{match.group(2).upper()}', aisle))
+    return zones
+
+
+def rebuild_zone_rollup(layout_id):
+    """
+    Recount the roll-up of a layout from its components. Existing rows are
+    locked first and overwritten in place, so concurrent status changes wait
+    and then apply their delta on top of the new counts.
+    """
+    with transaction.atomic():
+        rows = ZoneRollup.objects.filter(layout_id=layout_id)
+        list(rows.select_for_update().order_by('zone').values_list('pk'))
+
+        # The whole-layout row exists even for an empty layout
+        parents = {'': None}
+        counts = defaultdict(Counter, {'': Counter()})
+        components = WarehouseComponent.objects.filter(layout_id=layout_id).order_by().values_list('id', 'status')
+        for component_id, status in components.iterator(chunk_size=10000):
+            for zone, parent in component_zones(component_id):
+                parents[zone] = parent
+                counts[zone][status] += 1
+
+        ZoneRollup.objects.bulk_create(
+            [
+                ZoneRollup(
+                    layout_id=layout_id, zone=zone, parent=parents[zone],
+                    **{status: zone_counts[status] for status in ComponentStatus.values},
+                )
+                for zone, zone_counts in counts.items()
+            ],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['layout', 'zone'],
+            update_fields=['parent', *ComponentStatus.values],
+        )
+        rows.exclude(zone__in=list(counts)).delete()
+
+
+def apply_zone_status_changes(layout_id, changes):
+    """
+    Move components between status columns of their zones' roll-up rows.
+    ``changes`` are (component_id, previous_status, new_status); a previous
+    status of None adds the component and a new status of None removes it.
+    Run it in the transaction that changed the components. Zones that gain
+    their first component get a row, zones that lose their last one lose
+    it. Layouts whose roll-up was never built are left alone until
+    rebuild_zone_rollups builds it.
+    """
+    deltas = defaultdict(Counter)
+    parents = {}
+    for component_id, previous_status, status in changes:
+        for zone, parent in component_zones(component_id):
+            parents[zone] = parent
+            if previous_status is not None:
+                deltas[zone][previous_status] -= 1
+            if status is not None:
+                deltas[zone][status] += 1
+
+    with transaction.atomic():
+        if len(deltas) > MAX_INCREMENTAL_ZONES:
+            if ZoneRollup.objects.filter(layout_id=layout_id, zone='').exists():
+                rebuild_zone_rollup(layout_id)
+            return
+
+        rows = ZoneRollup.objects.filter(layout_id=layout_id, zone__in=list(deltas))
+        # Lock in a fixed order so concurrent changes to shared zones cannot
+        # deadlock; the whole-layout row sorts first and serialises the rest
+        locked = set(rows.select_for_update().order_by('zone').values_list('zone', flat=True))
+        if '' not in locked:
+            return
+
+        missing = [zone for zone in deltas if zone not in locked]
+        if missing:
+            ZoneRollup.objects.bulk_create(
+                [ZoneRollup(layout_id=layout_id, zone=zone, parent=parents[zone]) for zone in missing],
+                ignore_conflicts=True,
+            )
+
+        emptied = []
+        for zone, zone_deltas in deltas.items():
+            columns = {status: F(status) + delta for status, delta in zone_deltas.items() if delta}
+            if columns:
+                ZoneRollup.objects.filter(layout_id=layout_id, zone=zone).update(**columns)
+            if zone and any(delta < 0 for delta in zone_deltas.values()):
+                emptied.append(zone)
+        if emptied:
+            rows.filter(zone__in=emptied, **{status: 0 for status in ComponentStatus.values}).delete()
+
+
+def start_zone_rollup(layout_id):
+    """Create the empty whole-layout row of a new layout, so changes to it are counted."""
+    ZoneRollup.objects.get_or_create(layout_id=layout_id, zone='')
+
+
+def layouts_without_rollup():
+    """Layouts whose roll-up was never built, e.g. created before roll-ups existed."""
+    return WarehouseLayout.objects.filter(~Exists(ZoneRollup.objects.filter(layout=OuterRef('pk'), zone='')))
+
+
+def layout_status_counts(layout_id=None):
+    """Status counts over a layout, or all layouts, from the whole-layout rows."""
+    rows = ZoneRollup.objects.filter(zone='')
+    if layout_id:
+        rows = rows.filter(layout_id=layout_id)
+    counts = rows.aggregate(**{status: Sum(status) for status in ComponentStatus.values})
+    return {status: counts[status] or 0 for status in ComponentStatus.values}
+
+
+def zone_rollups(layout_id, parent=''):
+    """The roll-up rows of the zones directly below ``parent`` (aisles by default)."""
+    return list(ZoneRollup.objects.filter(layout_id=layout_id, parent=parent))
@@ -25,35 +25,62 @@ class InspectionManager {
             container: 'inspection-canvas',
             width: container.offsetWidth,
             height: 500,
-            draggable: false
+            draggable: true
         });
         
         this.layer = new Konva.Layer();
         this.stage.add(this.layer);
         
+        // Load the tiles that come into view after panning
+        this.stage.on('dragend', (e) => {
+            if (e.target === this.stage) {
+                this.loadVisibleComponents();
+            }
+        });
+        
         // Handle window resize
         window.addEventListener('resize', () => {
             if (container) {
                 this.stage.width(container.offsetWidth);
                 this.stage.draw();
+                this.loadVisibleComponents();
             }
         });
     }
     
     loadComponents() {
-        // This would typically load from backend
-        const sampleComponents = [
-            { id: 'A1', type: 'rack', x: 50, y: 50, width: 80, height: 60, status: 'good' },
-            { id: 'A2', type: 'rack', x: 150, y: 50, width: 80, height: 60, status: 'fix_4_weeks' },
-            { id: 'A3', type: 'rack', x: 250, y: 50, width: 80, height: 60, status: 'immediate' },
-            { id: 'B1', type: 'rack', x: 50, y: 130, width: 80, height: 60, status: 'good' },
-            { id: 'B2', type: 'rack', x: 150, y: 130, width: 80, height: 60, status: 'good' },
-            { id: 'B3', type: 'rack', x: 250, y: 130, width: 80, height: 60, status: 'fix_4_weeks' }
-        ];
-        
-        sampleComponents.forEach(component => {
-            this.addComponentToCanvas(component);
+        const layoutId = document.querySelector('[data-layout-id]')?.dataset.layoutId;
+        if (!layoutId || !this.stage) return;
+        
+        this.tileLoader = new ComponentTileLoader(layoutId, (components) => {
+            components.forEach(component => {
+                if (!this.components.has(component.id)) {
+                    this.addComponentToCanvas(component);
+                }
+            });
+        });
+        this.loadVisibleComponents();
+        
+        // Apply other inspectors' changes without re-fetching the layout
+        this.events = subscribeLayoutEvents(layoutId, {
+            onStatus: (event) => this.updateComponentStatus(event.component_id, event.status),
+            onLayout: () => this.reloadComponents()
+        });
+    }
+    
+    reloadComponents() {
+        this.components.forEach((component) => {
+            component.group.destroy();
         });
+        this.components.clear();
+        this.tileLoader.invalidate();
+        this.loadVisibleComponents();
+    }
+    
+    loadVisibleComponents() {
+        if (this.tileLoader) {
+            this.tileLoader.loadViewport(this.stage);
+        }
     }
     
     addComponentToCanvas(componentData) {
@@ -123,7 +150,7 @@ class InspectionManager {
         
         this.layer.add(group);
         this.components.set(id, { group, data: componentData });
-        this.layer.draw();
+        this.layer.batchDraw();
     }
     
     selectComponentForInspection(componentData) {
@@ -160,6 +187,20 @@ class InspectionManager {
             inspectionForm.style.display = 'block';
             document.getElementById('selected-component').value = componentData.id;
         }
+        
+        this.loadComponentHistory(componentData.id);
+    }
+    
+    loadComponentHistory(id) {
+        const section = document.getElementById('component-history-section');
+        if (!section) return;
+        
+        // First page only; further pages load as the list is scrolled
+        section.style.display = 'block';
+        htmx.ajax('GET', `/api/component/${encodeURIComponent(id)}/history/`, {
+            target: '#component-history',
+            swap: 'innerHTML'
+        });
     }
     
     hideInspectionPanel() {
@@ -169,6 +210,9 @@ class InspectionManager {
         if (noSelection) noSelection.style.display = 'block';
         if (inspectionForm) inspectionForm.style.display = 'none';
         
+        const historySection = document.getElementById('component-history-section');
+        if (historySection) historySection.style.display = 'none';
+        
         this.selectedComponent = null;
         
         // Reset component highlighting
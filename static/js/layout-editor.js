@@ -9,6 +9,9 @@ class WarehouseLayoutEditor {
         this.isEditing = false;
         this.scale = 1;
         this.gridSize = 20;
+        this.tileLoader = null;
+        // Unsaved edits, sent to the server as a diff on save
+        this.changes = { added: new Set(), updated: new Set(), removed: new Set() };
         
         this.init();
         this.setupEventListeners();
@@ -26,7 +29,7 @@ class WarehouseLayoutEditor {
             container: this.containerId,
             width: container.offsetWidth,
             height: 600,
-            draggable: false
+            draggable: true
         });
         
         // Create main layer
@@ -152,7 +155,7 @@ class WarehouseLayoutEditor {
         
         this.layer.add(group);
         this.components.set(id, { group, data: componentData });
-        this.layer.draw();
+        this.layer.batchDraw();
         
         return group;
     }
@@ -295,8 +298,75 @@ class WarehouseLayoutEditor {
     }
     
     saveComponentPosition(id, x, y) {
-        // This would typically save to backend via HTMX
-        console.log(`Saving component ${id} position: ${x}, ${y}`);
+        this.markUpdated(id);
+    }
+    
+    markAdded(id) {
+        this.changes.removed.delete(id);
+        this.changes.added.add(id);
+    }
+    
+    markUpdated(id) {
+        if (!this.changes.added.has(id)) {
+            this.changes.updated.add(id);
+        }
+    }
+    
+    markRemoved(id) {
+        if (this.changes.added.has(id)) {
+            this.changes.added.delete(id);
+        } else {
+            this.changes.updated.delete(id);
+            this.changes.removed.add(id);
+        }
+    }
+    
+    setLayout(layoutId) {
+        this.tileLoader = new ComponentTileLoader(layoutId, (components) => {
+            components.forEach(component => {
+                if (this.components.has(component.id) || this.changes.removed.has(component.id)) {
+                    return;
+                }
+                this.addComponent({
+                    id: component.id,
+                    componentType: component.type,
+                    xPosition: component.x,
+                    yPosition: component.y,
+                    width: component.width,
+                    height: component.height,
+                    status: component.status
+                });
+            });
+        });
+        this.loadVisibleComponents();
+        
+        // Recolour components inspected elsewhere; reload after geometry
+        // changes unless there are local edits the next save will diff
+        this.events?.close();
+        this.events = subscribeLayoutEvents(layoutId, {
+            onStatus: (event) => {
+                if (this.components.has(event.component_id)) {
+                    this.updateComponent(event.component_id, { status: event.status });
+                }
+            },
+            onLayout: () => {
+                if (!this.hasUnsavedChanges()) {
+                    this.clearComponents();
+                    this.tileLoader.invalidate();
+                    this.loadVisibleComponents();
+                }
+            }
+        });
+    }
+    
+    hasUnsavedChanges() {
+        return this.changes.added.size > 0 || this.changes.updated.size > 0 || this.changes.removed.size > 0;
+    }
+    
+    loadVisibleComponents() {
+        if (this.tileLoader) {
+            this.tileLoader.loadViewport(this.stage);
+        }
     }
     
     loadComponents(componentsData) {
@@ -340,6 +410,7 @@ class WarehouseLayoutEditor {
         this.stage.scale({ x: this.scale, y: this.scale });
         this.stage.draw();
         this.updateZoomDisplay();
+        this.loadVisibleComponents();
     }
     
     resetZoom() {
@@ -401,6 +472,13 @@ class WarehouseLayoutEditor {
             }
         });
         
+        // Load the tiles that come into view after panning
+        this.stage.on('dragend', (e) => {
+            if (e.target === this.stage) {
+                this.loadVisibleComponents();
+            }
+        });
+        
         // Click outside to deselect
         this.stage.on('click tap', (e) => {
             if (e.target === this.stage) {
@@ -422,6 +500,7 @@ class WarehouseLayoutEditor {
         };
         
         this.addComponent(newComponent);
+        this.markAdded(id);
     }
     
     updateSelectedComponent() {
@@ -437,28 +516,69 @@ class WarehouseLayoutEditor {
             componentType: type,
             status: status
         });
+        
+        if (newId !== id) {
+            // The id is the primary key, so a rename replaces the component
+            this.markRemoved(id);
+            this.markAdded(newId);
+        } else {
+            this.markUpdated(id);
+        }
     }
     
     deleteSelectedComponent() {
         if (this.selectedComponent) {
             const id = this.selectedComponent.id();
             this.removeComponent(id);
+            this.markRemoved(id);
         }
     }
     
+    toPayload(id) {
+        const component = this.components.get(id);
+        return {
+            id: id,
+            type: component.data.componentType,
+            x: component.group.x(),
+            y: component.group.y(),
+            width: component.data.width,
+            height: component.data.height,
+            status: component.data.status
+        };
+    }
+    
     saveLayout() {
-        const layoutData = this.exportLayout();
+        // Only the edited components are sent; the canvas may hold just the
+        // tiles in view, so a full set would delete everything else
+        const payload = {
+            layout_id: this.getCurrentLayoutId(),
+            added: Array.from(this.changes.added, id => this.toPayload(id)),
+            updated: Array.from(this.changes.updated, id => this.toPayload(id)),
+            removed: Array.from(this.changes.removed)
+        };
         
-        // Send to backend via HTMX
-        htmx.ajax('POST', '/api/save-layout/', {
-            values: {
-                layout_id: this.getCurrentLayoutId(),
-                components: JSON.stringify(layoutData)
-            },
+        fetch('/api/save-layout/', {
+            method: 'POST',
             headers: {
+                'Content-Type': 'application/json',
                 'X-CSRFToken': document.querySelector('[name=csrfmiddlewaretoken]').value
-            }
-        });
+            },
+            body: JSON.stringify(payload)
+        })
+            .then(response => response.json())
+            .then(result => {
+                if (!result.success) {
+                    console.error('Error saving layout:', result.error);
+                    return;
+                }
+                
+                this.changes = { added: new Set(), updated: new Set(), removed: new Set() };
+                const container = document.querySelector('[data-layout-id]');
+                if (container && !container.dataset.layoutId) {
+                    container.dataset.layoutId = result.layout_id;
+                    this.setLayout(result.layout_id);
+                }
+            });
     }
     
     getCurrentLayoutId() {
@@ -472,10 +592,10 @@ document.addEventListener('DOMContentLoaded', function() {
     if (document.getElementById('canvas-container')) {
         window.layoutEditor = new WarehouseLayoutEditor('canvas-container');
         
-        // Load existing components if available
-        const componentsData = window.initialComponents || [];
-        if (componentsData.length > 0) {
-            window.layoutEditor.loadComponents(componentsData);
+        // Load the components in view of the current layout
+        const layoutId = window.layoutEditor.getCurrentLayoutId();
+        if (layoutId) {
+            window.layoutEditor.setLayout(layoutId);
         }
     }
 });
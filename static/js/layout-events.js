@@ -0,0 +1,22 @@
+// Live layout changes pushed by the server (see core/events.py)
+//
+// "status" events carry { component_id, status, revision } and only need the
+// one shape recoloured; "layout" events mean geometry changed and the canvas
+// should reload its tiles. EventSource reconnects on its own.
+function subscribeLayoutEvents(layoutId, handlers) {
+    if (!window.EventSource) return null;
+    
+    const source = new EventSource(`/api/layout/${layoutId}/events/`);
+    
+    source.addEventListener('status', (e) => {
+        if (handlers.onStatus) handlers.onStatus(JSON.parse(e.data));
+    });
+    
+    source.addEventListener('layout', (e) => {
+        if (handlers.onLayout) handlers.onLayout(JSON.parse(e.data));
+    });
+    
+    return source;
+}
+
+window.subscribeLayoutEvents = subscribeLayoutEvents;
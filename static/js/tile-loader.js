@@ -0,0 +1,66 @@
+// Viewport tile loading for the warehouse canvases
+//
+// The layout is split into square tiles in layout coordinates. Tiles in view
+// are fetched from /api/layout/<id>/components/ once and cached, so panning
+// back over an area costs nothing. Components spanning several tiles are
+// returned by each of them; callers skip ids they already draw.
+class ComponentTileLoader {
+    constructor(layoutId, onComponents, options = {}) {
+        this.layoutId = layoutId;
+        this.onComponents = onComponents;
+        this.tileSize = options.tileSize || 1000;
+        this.tiles = new Map();
+    }
+
+    loadViewport(stage) {
+        const scale = stage.scaleX();
+        const x1 = -stage.x() / scale;
+        const y1 = -stage.y() / scale;
+        return this.loadBox(x1, y1, x1 + stage.width() / scale, y1 + stage.height() / scale);
+    }
+
+    loadBox(x1, y1, x2, y2) {
+        const requests = [];
+
+        for (let tx = Math.floor(x1 / this.tileSize); tx <= Math.floor(x2 / this.tileSize); tx++) {
+            for (let ty = Math.floor(y1 / this.tileSize); ty <= Math.floor(y2 / this.tileSize); ty++) {
+                const key = `${tx}:${ty}`;
+                if (this.tiles.has(key)) continue;
+
+                const request = this.fetchTile(tx, ty)
+                    .then(components => this.onComponents(components))
+                    .catch(error => {
+                        // Forget the tile so the next viewport change retries it
+                        this.tiles.delete(key);
+                        console.error(`Error loading tile ${key}:`, error);
+                    });
+                this.tiles.set(key, request);
+                requests.push(request);
+            }
+        }
+
+        return Promise.all(requests);
+    }
+
+    fetchTile(tx, ty) {
+        const size = this.tileSize;
+        const bbox = [tx * size, ty * size, (tx + 1) * size, (ty + 1) * size].join(',');
+
+        return fetch(`/api/layout/${this.layoutId}/components/?bbox=${bbox}`, {
+            credentials: 'same-origin'
+        })
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(`HTTP ${response.status}`);
+                }
+                return response.json();
+            })
+            .then(data => data.components);
+    }
+
+    invalidate() {
+        this.tiles.clear();
+    }
+}
+
+window.ComponentTileLoader = ComponentTileLoader;
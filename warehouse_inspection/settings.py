@@ -48,6 +48,7 @@ LOCAL_APPS = [
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
+    'core.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -127,6 +128,42 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Request profiling (core.profiling). Sampled requests record SQL count and
+# time, template time and latency per view; set PROFILING_ENFORCE_BUDGETS in
+# tests to turn exceeded @query_budget limits into failures
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=1.0 if DEBUG else 0.05, cast=float)
+PROFILING_WINDOW = config('PROFILING_WINDOW', default=1000, cast=int)
+PROFILING_ENFORCE_BUDGETS = config('PROFILING_ENFORCE_BUDGETS', default=False, cast=bool)
+PROFILING_SERVER_TIMING = config('PROFILING_SERVER_TIMING', default=DEBUG, cast=bool)
+
+# Layout CSV import/export
+LAYOUT_IMPORT_BATCH_SIZE = config('LAYOUT_IMPORT_BATCH_SIZE', default=2000, cast=int)
+LAYOUT_EXPORT_CHUNK_SIZE = config('LAYOUT_EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# Layout versions (core.versions): every Nth version stores all components,
+# the others only their delta from the previous version
+LAYOUT_VERSION_SNAPSHOT_INTERVAL = config('LAYOUT_VERSION_SNAPSHOT_INTERVAL', default=20, cast=int)
+
+# Cache (use e.g. django.core.cache.backends.redis.RedisCache with REDIS_URL
+# in production so invalidation is shared between workers)
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='warehouse-inspection'),
+    }
+}
+
+# Dashboard status counts and header urgent item counters are cached per
+# layout and kept current on change; the timeouts bound staleness for writes
+# that bypass the model save path
+DASHBOARD_STATS_CACHE_TIMEOUT = config('DASHBOARD_STATS_CACHE_TIMEOUT', default=60, cast=int)
+URGENT_ITEMS_CACHE_TIMEOUT = config('URGENT_ITEMS_CACHE_TIMEOUT', default=600, cast=int)
+LAYOUT_EXTENT_CACHE_TIMEOUT = config('LAYOUT_EXTENT_CACHE_TIMEOUT', default=600, cast=int)
+# Spatial query endpoints: layouts whose component grid each process keeps
+SPATIAL_INDEX_MAX_LAYOUTS = config('SPATIAL_INDEX_MAX_LAYOUTS', default=8, cast=int)
+# Encoded layout snapshots are keyed by revision and never go stale
+LAYOUT_SNAPSHOT_CACHE_TIMEOUT = config('LAYOUT_SNAPSHOT_CACHE_TIMEOUT', default=3600, cast=int)
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -151,10 +188,49 @@ DJANGO_VITE_DEV_MODE = DEBUG
 # Email settings
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
+# Notification scheduler (core.notifications, schedule_notifications)
+NOTIFICATION_AMBER_REMINDER_DAYS = config('NOTIFICATION_AMBER_REMINDER_DAYS', default=7, cast=int)
+NOTIFICATION_BATCH_SIZE = config('NOTIFICATION_BATCH_SIZE', default=1000, cast=int)
+NOTIFICATION_SCHEDULER_INTERVAL = config('NOTIFICATION_SCHEDULER_INTERVAL', default=300, cast=float)
+
 # Celery Configuration
 CELERY_BROKER_URL = config('REDIS_URL', default='redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = config('REDIS_URL', default='redis://localhost:6379/0')
 
+# Layout change feed (core.events). LocalBroker only reaches clients connected
+# to the same process; use core.events.RedisBroker with several workers.
+STATUS_EVENTS_BROKER = config('STATUS_EVENTS_BROKER', default='core.events.LocalBroker')
+STATUS_EVENTS_KEEPALIVE = config('STATUS_EVENTS_KEEPALIVE', default=15, cast=int)
+STATUS_EVENTS_RETRY_MS = config('STATUS_EVENTS_RETRY_MS', default=3000, cast=int)
+
+# Report generation queue (core.reports, run_report_worker)
+REPORT_WORKER_PROCESSES = config('REPORT_WORKER_PROCESSES', default=2, cast=int)
+REPORT_WORKER_POLL_INTERVAL = config('REPORT_WORKER_POLL_INTERVAL', default=2.0, cast=float)
+# Running reports older than this are assumed lost and requeued
+REPORT_JOB_TIMEOUT = config('REPORT_JOB_TIMEOUT', default=1800, cast=int)
+# Inspections per rendered report section (and per database chunk)
+REPORT_SECTION_SIZE = config('REPORT_SECTION_SIZE', default=500, cast=int)
+# Generated PDFs are reused for identical requests until evict_report_files
+# removes them by age or to keep their total size under the limit
+REPORT_FILE_MAX_AGE = config('REPORT_FILE_MAX_AGE', default=30 * 24 * 3600, cast=int)
+REPORT_FILE_MAX_TOTAL_SIZE = config('REPORT_FILE_MAX_TOTAL_SIZE', default=5 * 1024 ** 3, cast=int)
+
+# Photo rendition queue (core.renditions, run_rendition_worker)
+PHOTO_WORKER_PROCESSES = config('PHOTO_WORKER_PROCESSES', default=2, cast=int)
+PHOTO_WORKER_POLL_INTERVAL = config('PHOTO_WORKER_POLL_INTERVAL', default=2.0, cast=float)
+PHOTO_RENDITION_TIMEOUT = config('PHOTO_RENDITION_TIMEOUT', default=300, cast=int)
+# Rendition URLs are versioned, so browsers may keep them for a long time
+PHOTO_RENDITION_MAX_AGE = config('PHOTO_RENDITION_MAX_AGE', default=31536000, cast=int)
+
+# Chunked photo uploads (core.uploads); part files live under MEDIA_ROOT
+PHOTO_UPLOAD_DIR = 'photo_uploads'
+PHOTO_UPLOAD_MAX_SIZE = config('PHOTO_UPLOAD_MAX_SIZE', default=50 * 1024 * 1024, cast=int)
+# Chunk size suggested to clients, and the largest chunk accepted
+PHOTO_UPLOAD_CHUNK_SIZE = config('PHOTO_UPLOAD_CHUNK_SIZE', default=1024 * 1024, cast=int)
+PHOTO_UPLOAD_MAX_CHUNK_SIZE = config('PHOTO_UPLOAD_MAX_CHUNK_SIZE', default=8 * 1024 * 1024, cast=int)
+# Uploads untouched for this many seconds are removed by clear_stale_uploads
+PHOTO_UPLOAD_EXPIRY = config('PHOTO_UPLOAD_EXPIRY', default=7 * 24 * 3600, cast=int)
+
 # Django Unfold Admin
 UNFOLD = {
     "SITE_TITLE": "Warehouse Inspection Admin",